@@ -0,0 +1,50 @@
+# alembic/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+import main  # noqa: F401  (registers every model with SQLAlchemy)
+from core.database import Base, engine
+
+config = context.config
+
+# Programmatic upgrades (core.schema) pass their own connection and keep the app's logging
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL (alembic upgrade head --sql) instead of running it."""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run_migrations(connection) -> None:
+    # One transaction per migration, so a migration can use an autocommit block
+    # (CREATE INDEX CONCURRENTLY) without committing earlier ones half-way
+    context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_migrations(connection)
+        return
+    with engine.connect() as connection:
+        _run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,242 @@
+"""Baseline schema
+
+The tables Base.metadata.create_all created at startup before the project
+had migrations. core.schema stamps databases that already have them with
+this revision instead of running it.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 00:45:08.574153
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('categories',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('category_name', sa.String(length=100), nullable=True),
+    sa.PrimaryKeyConstraint('category_id'),
+    sa.UniqueConstraint('category_name')
+    )
+    op.create_table('tags',
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('tag_name', sa.String(length=100), nullable=True),
+    sa.PrimaryKeyConstraint('tag_id'),
+    sa.UniqueConstraint('tag_name')
+    )
+    op.create_table('users',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=True),
+    sa.Column('password_hash', sa.Text(), nullable=True),
+    sa.Column('email', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('is_deleted', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('audit_logs',
+    sa.Column('log_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(length=50), nullable=True),
+    sa.Column('table_name', sa.String(length=50), nullable=True),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.Column('old_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('new_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('log_id')
+    )
+    op.create_table('cards',
+    sa.Column('card_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('card_name', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('card_id')
+    )
+    op.create_table('expense_categories',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('parent_category', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['parent_category'], ['expense_categories.category_id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('category_id')
+    )
+    op.create_table('invoice_templates',
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('vendor', sa.String(length=100), nullable=True),
+    sa.Column('version', sa.String(length=20), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('template_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['created_by'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('template_id')
+    )
+    op.create_table('invoices',
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('file_name', sa.String(length=255), nullable=True),
+    sa.Column('merchant_name', sa.String(length=255), nullable=True),
+    sa.Column('order_number', sa.String(length=50), nullable=True),
+    sa.Column('purchase_date', sa.Date(), nullable=True),
+    sa.Column('payment_method', sa.String(length=50), nullable=True),
+    sa.Column('grand_total', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('shipping_handling', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('estimated_tax', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('total_before_tax', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('billing_address', sa.Text(), nullable=True),
+    sa.Column('credit_card_transactions', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('gift_card_amount', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('refunded_amount', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('credit_card', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('is_deleted', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('invoice_id'),
+    sa.UniqueConstraint('order_number')
+    )
+    op.create_table('wishlist',
+    sa.Column('wishlist_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('product_name', sa.String(length=255), nullable=True),
+    sa.Column('product_link', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('wishlist_id')
+    )
+    op.create_table('card_numbers',
+    sa.Column('card_number_id', sa.Integer(), nullable=False),
+    sa.Column('card_id', sa.Integer(), nullable=True),
+    sa.Column('last_four', sa.String(length=4), nullable=True),
+    sa.Column('expiration_date', sa.Date(), nullable=True),
+    sa.Column('added_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['card_id'], ['cards.card_id'], ),
+    sa.PrimaryKeyConstraint('card_number_id'),
+    sa.UniqueConstraint('last_four')
+    )
+    op.create_table('invoice_categories',
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.category_id'], ),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ),
+    sa.PrimaryKeyConstraint('invoice_id', 'category_id')
+    )
+    op.create_table('invoice_expense_categories',
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['expense_categories.category_id'], ),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ),
+    sa.PrimaryKeyConstraint('invoice_id', 'category_id')
+    )
+    op.create_table('invoice_files',
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('file_name', sa.String(length=255), nullable=True),
+    sa.Column('file_path', sa.Text(), nullable=True),
+    sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ),
+    sa.PrimaryKeyConstraint('file_id')
+    )
+    op.create_table('invoice_items',
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('product_name', sa.String(length=255), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=True),
+    sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('product_link', sa.Text(), nullable=True),
+    sa.Column('documentation', sa.Text(), nullable=True),
+    sa.Column('condition', sa.String(length=50), nullable=True),
+    sa.Column('paid_by', sa.String(length=50), nullable=True),
+    sa.Column('used_date', sa.Date(), nullable=True),
+    sa.Column('expiration_date', sa.Date(), nullable=True),
+    sa.Column('item_type', sa.String(length=100), nullable=True),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ),
+    sa.PrimaryKeyConstraint('item_id')
+    )
+    op.create_table('invoice_status_history',
+    sa.Column('status_id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ),
+    sa.PrimaryKeyConstraint('status_id')
+    )
+    op.create_table('invoice_tags',
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.tag_id'], ),
+    sa.PrimaryKeyConstraint('invoice_id', 'tag_id')
+    )
+    op.create_table('template_test_results',
+    sa.Column('result_id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=True),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('test_date', sa.DateTime(), nullable=True),
+    sa.Column('success', sa.Boolean(), nullable=True),
+    sa.Column('match_score', sa.Float(), nullable=True),
+    sa.Column('fields_matched', sa.Integer(), nullable=True),
+    sa.Column('fields_total', sa.Integer(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('extracted_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('field_results', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['invoice_templates.template_id'], ),
+    sa.PrimaryKeyConstraint('result_id')
+    )
+    op.create_table('payments',
+    sa.Column('payment_id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('card_number_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('transaction_id', sa.String(length=100), nullable=True),
+    sa.Column('payment_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['card_number_id'], ['card_numbers.card_number_id'], ),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ),
+    sa.PrimaryKeyConstraint('payment_id'),
+    sa.UniqueConstraint('transaction_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('payments')
+    op.drop_table('template_test_results')
+    op.drop_table('invoice_tags')
+    op.drop_table('invoice_status_history')
+    op.drop_table('invoice_items')
+    op.drop_table('invoice_files')
+    op.drop_table('invoice_expense_categories')
+    op.drop_table('invoice_categories')
+    op.drop_table('card_numbers')
+    op.drop_table('wishlist')
+    op.drop_table('invoices')
+    op.drop_table('invoice_templates')
+    op.drop_table('expense_categories')
+    op.drop_table('cards')
+    op.drop_table('audit_logs')
+    op.drop_table('users')
+    op.drop_table('tags')
+    op.drop_table('categories')
@@ -0,0 +1,47 @@
+"""Indexes for the invoice list filters, sort keys and facets
+
+Built CONCURRENTLY, outside the migration transaction, so writes to the
+existing tables are not blocked while they build.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 01:01:19.310250
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_invoices_user_deleted_date', 'invoices', ['user_id', 'is_deleted', 'purchase_date'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_invoices_user_status', 'invoices', ['user_id', 'status'], postgresql_concurrently=True)
+        op.create_index('ix_invoices_user_merchant', 'invoices', ['user_id', 'merchant_name'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_invoices_user_payment_method', 'invoices', ['user_id', 'payment_method'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_invoices_user_grand_total', 'invoices', ['user_id', 'grand_total'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_invoice_tags_tag_invoice', 'invoice_tags', ['tag_id', 'invoice_id'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_invoice_categories_category_invoice', 'invoice_categories', ['category_id', 'invoice_id'],
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_invoice_categories_category_invoice', table_name='invoice_categories',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_invoice_tags_tag_invoice', table_name='invoice_tags', postgresql_concurrently=True)
+        op.drop_index('ix_invoices_user_grand_total', table_name='invoices', postgresql_concurrently=True)
+        op.drop_index('ix_invoices_user_payment_method', table_name='invoices', postgresql_concurrently=True)
+        op.drop_index('ix_invoices_user_merchant', table_name='invoices', postgresql_concurrently=True)
+        op.drop_index('ix_invoices_user_status', table_name='invoices', postgresql_concurrently=True)
+        op.drop_index('ix_invoices_user_deleted_date', table_name='invoices', postgresql_concurrently=True)
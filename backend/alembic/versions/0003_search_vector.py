@@ -0,0 +1,34 @@
+"""Full-text search vector on invoices and raw OCR text on invoice files
+
+Existing invoices get their vectors from `utils/maintenance.py
+reindex-search`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 01:24:37.540112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('invoice_files', sa.Column('ocr_text', sa.Text(), nullable=True))
+    op.add_column('invoices', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_invoices_search_vector', 'invoices', ['search_vector'], postgresql_using='gin',
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_invoices_search_vector', table_name='invoices', postgresql_concurrently=True)
+    op.drop_column('invoices', 'search_vector')
+    op.drop_column('invoice_files', 'ocr_text')
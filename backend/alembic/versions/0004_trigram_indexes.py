@@ -0,0 +1,32 @@
+"""pg_trgm and trigram indexes for duplicate detection
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 01:29:02.866415
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # similarity() and the % operator used by features.duplicates
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.create_index('ix_invoices_merchant_trgm', 'invoices', ['merchant_name'], postgresql_using='gin',
+                        postgresql_ops={'merchant_name': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_invoices_order_number_trgm', 'invoices', ['order_number'], postgresql_using='gin',
+                        postgresql_ops={'order_number': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    # The extension stays; other database objects may use it
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_invoices_order_number_trgm', table_name='invoices', postgresql_concurrently=True)
+        op.drop_index('ix_invoices_merchant_trgm', table_name='invoices', postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""Perceptual hash of invoice files, with indexed 16-bit bands
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 01:33:48.102937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+BANDS = ['phash_band_0', 'phash_band_1', 'phash_band_2', 'phash_band_3']
+
+
+def upgrade() -> None:
+    op.add_column('invoice_files', sa.Column('phash', sa.BigInteger(), nullable=True))
+    for band in BANDS:
+        op.add_column('invoice_files', sa.Column(band, sa.Integer(), nullable=True))
+    with op.get_context().autocommit_block():
+        for band in BANDS:
+            op.create_index(f'ix_invoice_files_{band}', 'invoice_files', [band], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for band in BANDS:
+            op.drop_index(f'ix_invoice_files_{band}', table_name='invoice_files', postgresql_concurrently=True)
+    for band in BANDS:
+        op.drop_column('invoice_files', band)
+    op.drop_column('invoice_files', 'phash')
@@ -0,0 +1,46 @@
+"""Content-addressed file blobs referenced by invoice files
+
+Files uploaded before this keep sha256 NULL and are served from their
+file_path.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 01:38:15.694021
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('file_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('storage_path', sa.Text(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.add_column('invoice_files', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.create_foreign_key('invoice_files_sha256_fkey', 'invoice_files', 'file_blobs', ['sha256'], ['sha256'])
+    with op.get_context().autocommit_block():
+        op.create_index('ix_invoice_files_sha256', 'invoice_files', ['sha256'], postgresql_concurrently=True)
+        op.create_index('ix_invoice_files_file_name', 'invoice_files', ['file_name'], postgresql_concurrently=True)
+        op.create_index('ix_invoice_files_invoice_id', 'invoice_files', ['invoice_id'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_invoice_files_invoice_id', table_name='invoice_files', postgresql_concurrently=True)
+        op.drop_index('ix_invoice_files_file_name', table_name='invoice_files', postgresql_concurrently=True)
+        op.drop_index('ix_invoice_files_sha256', table_name='invoice_files', postgresql_concurrently=True)
+    op.drop_constraint('invoice_files_sha256_fkey', 'invoice_files', type_='foreignkey')
+    op.drop_column('invoice_files', 'sha256')
+    op.drop_table('file_blobs')
@@ -0,0 +1,42 @@
+"""Sessions of resumable (tus) uploads
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 01:07:10.499089
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('upload_sessions',
+    sa.Column('upload_id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('file_name', sa.String(length=255), nullable=False),
+    sa.Column('upload_length', sa.BigInteger(), nullable=False),
+    sa.Column('upload_offset', sa.BigInteger(), nullable=False),
+    sa.Column('category', sa.String(length=255), nullable=True),
+    sa.Column('tags', sa.Text(), nullable=True),
+    sa.Column('use_templates', sa.Boolean(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('upload_id')
+    )
+    op.create_index('ix_upload_sessions_updated_at', 'upload_sessions', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_upload_sessions_updated_at', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
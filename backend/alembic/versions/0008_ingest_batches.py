@@ -0,0 +1,54 @@
+"""Bulk ingest batches and their per-file status
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 01:07:54.755738
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ingest_batches',
+    sa.Column('batch_id', sa.String(length=32), nullable=False),
+    sa.Column('source', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('category', sa.String(length=255), nullable=True),
+    sa.Column('tags', sa.Text(), nullable=True),
+    sa.Column('use_templates', sa.Boolean(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('batch_id')
+    )
+    op.create_table('ingest_batch_files',
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('batch_id', sa.String(length=32), nullable=False),
+    sa.Column('file_name', sa.String(length=255), nullable=False),
+    sa.Column('staged_path', sa.Text(), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['batch_id'], ['ingest_batches.batch_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.invoice_id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('file_id')
+    )
+    op.create_index(op.f('ix_ingest_batch_files_batch_id'), 'ingest_batch_files', ['batch_id'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ingest_batch_files_batch_id'), table_name='ingest_batch_files')
+    op.drop_table('ingest_batch_files')
+    op.drop_table('ingest_batches')
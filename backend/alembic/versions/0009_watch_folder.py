@@ -0,0 +1,31 @@
+"""High-water marks of watched ingest folders
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 01:09:04.829078
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('watch_folder_states',
+    sa.Column('directory', sa.Text(), nullable=False),
+    sa.Column('high_water_mark', sa.Float(), nullable=False),
+    sa.Column('files_ingested', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('directory')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('watch_folder_states')
@@ -0,0 +1,33 @@
+"""IMAP mailbox sync state (UIDVALIDITY and last seen UID)
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 01:09:33.417293
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('imap_mailbox_states',
+    sa.Column('account', sa.String(length=255), nullable=False),
+    sa.Column('mailbox', sa.String(length=255), nullable=False),
+    sa.Column('uid_validity', sa.BigInteger(), nullable=True),
+    sa.Column('last_uid', sa.BigInteger(), nullable=False),
+    sa.Column('messages_seen', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('account', 'mailbox')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('imap_mailbox_states')
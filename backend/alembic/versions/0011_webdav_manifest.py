@@ -0,0 +1,34 @@
+"""Manifest of files seen on WebDAV remotes
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 01:10:01.547066
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('webdav_manifest',
+    sa.Column('source', sa.String(length=255), nullable=False),
+    sa.Column('path', sa.Text(), nullable=False),
+    sa.Column('is_collection', sa.Boolean(), nullable=False),
+    sa.Column('etag', sa.String(length=255), nullable=True),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('source', 'path')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('webdav_manifest')
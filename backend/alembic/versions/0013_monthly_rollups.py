@@ -0,0 +1,61 @@
+"""Monthly spend rollups per user, merchant, category and item type
+
+The tables start empty; existing invoices are rolled up by
+`utils/maintenance.py rebuild-rollups`.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 01:11:36.706271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('monthly_category_spend',
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'month', 'category')
+    )
+    op.create_table('monthly_item_type_spend',
+    sa.Column('item_type', sa.String(length=100), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'month', 'item_type')
+    )
+    op.create_table('monthly_merchant_spend',
+    sa.Column('merchant', sa.String(length=255), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'month', 'merchant')
+    )
+    op.create_table('monthly_payment_method_spend',
+    sa.Column('payment_method', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'month', 'payment_method')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('monthly_payment_method_spend')
+    op.drop_table('monthly_merchant_spend')
+    op.drop_table('monthly_item_type_spend')
+    op.drop_table('monthly_category_spend')
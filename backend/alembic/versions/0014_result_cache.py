@@ -0,0 +1,37 @@
+"""Per-user data generations and the expense result cache
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 01:13:03.786694
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('expense_result_cache',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=255), nullable=False),
+    sa.Column('generation', sa.BigInteger(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'cache_key')
+    )
+    op.create_table('user_data_generations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('generation', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_data_generations')
+    op.drop_table('expense_result_cache')
@@ -0,0 +1,26 @@
+"""Index of invoice items by item type
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 01:13:02.481736
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_invoice_items_item_type_invoice', 'invoice_items', ['item_type', 'invoice_id'],
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_invoice_items_item_type_invoice', table_name='invoice_items', postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""Covering partial (user_id, purchase_date) index for spend analytics
+
+Replaces ix_invoices_user_deleted_date. The INCLUDE list makes range
+aggregates index-only scans, and since every read filters out
+soft-deleted invoices the index is partial (WHERE is_deleted = false)
+rather than keyed on is_deleted. The new index is built CONCURRENTLY
+before the old one is dropped, so reads keep an index throughout.
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19 01:14:27.913064
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0016'
+down_revision = '0015'
+branch_labels = None
+depends_on = None
+
+INCLUDE = ['invoice_id', 'grand_total', 'merchant_name', 'payment_method']
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_invoices_active_user_date', 'invoices', ['user_id', 'purchase_date'],
+                        postgresql_include=INCLUDE, postgresql_where=sa.text('is_deleted = false'),
+                        postgresql_concurrently=True)
+        op.drop_index('ix_invoices_user_deleted_date', table_name='invoices', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_invoices_user_deleted_date', 'invoices', ['user_id', 'is_deleted', 'purchase_date'],
+                        postgresql_concurrently=True)
+        op.drop_index('ix_invoices_active_user_date', table_name='invoices', postgresql_concurrently=True)
@@ -0,0 +1,57 @@
+"""Partial invoice indexes, and indexes of invoice items and payments
+
+Every read of invoices filters out soft-deleted ones, so the invoice list
+indexes become partial (WHERE is_deleted = false) like the date index of
+0016: those rows are left out and the planner doesn't need to check
+is_deleted. Items and payments get an invoice_id index; their primary
+keys only start with their own id.
+
+All indexes are built and dropped CONCURRENTLY, the new ones before the
+ones they replace, so reads keep an index throughout.
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-19 01:15:51.207389
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0017'
+down_revision = '0016'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text('is_deleted = false')
+
+# Replaced full index -> (partial index, columns)
+REPLACED = {
+    'ix_invoices_user_status': ('ix_invoices_active_user_status', ['user_id', 'status']),
+    'ix_invoices_user_merchant': ('ix_invoices_active_user_merchant', ['user_id', 'merchant_name']),
+    'ix_invoices_user_payment_method': ('ix_invoices_active_user_payment_method', ['user_id', 'payment_method']),
+    'ix_invoices_user_grand_total': ('ix_invoices_active_user_grand_total', ['user_id', 'grand_total']),
+}
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in REPLACED.values():
+            op.create_index(name, 'invoices', columns, postgresql_where=ACTIVE, postgresql_concurrently=True)
+        op.create_index('ix_invoice_items_invoice', 'invoice_items', ['invoice_id'], postgresql_concurrently=True)
+        op.create_index('ix_payments_invoice', 'payments', ['invoice_id'], postgresql_concurrently=True)
+
+        for old in REPLACED:
+            op.drop_index(old, table_name='invoices', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for old, (_, columns) in REPLACED.items():
+            op.create_index(old, 'invoices', columns, postgresql_concurrently=True)
+
+        op.drop_index('ix_payments_invoice', table_name='payments', postgresql_concurrently=True)
+        op.drop_index('ix_invoice_items_invoice', table_name='invoice_items', postgresql_concurrently=True)
+        for name, _ in REPLACED.values():
+            op.drop_index(name, table_name='invoices', postgresql_concurrently=True)
@@ -0,0 +1,29 @@
+"""Trigram index on invoice notes for the invoice list's q search
+
+q matches merchant_name, order_number and notes with ILIKE '%...%'; the
+first two already have trigram indexes (0004).
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-19 02:04:12.550813
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0018'
+down_revision = '0017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_invoices_notes_trgm', 'invoices', ['notes'], postgresql_using='gin',
+                        postgresql_ops={'notes': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_invoices_notes_trgm', table_name='invoices', postgresql_concurrently=True)
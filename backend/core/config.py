@@ -17,9 +17,59 @@ DB_USER = os.environ.get("DB_USER", "postgres")
 DB_PASSWORD = os.environ.get("DB_PASSWORD", "secret")
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 
+# File upload limits
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))  # 10MB per file by default
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Uploads are streamed to disk 1MB at a time
+MAX_TEMPLATE_IMPORT_SIZE = 1024 * 1024  # Template JSON files are small
+
+# Bulk ingestion (many files or ZIP archives per request)
+MAX_BULK_UPLOAD_SIZE = int(os.environ.get("MAX_BULK_UPLOAD_SIZE", 512 * 1024 * 1024))  # 512MB per request
+MAX_ZIP_ENTRIES = int(os.environ.get("MAX_ZIP_ENTRIES", 5000))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 2))  # Parallel OCR/template workers
+INGEST_COMMIT_BATCH_SIZE = int(os.environ.get("INGEST_COMMIT_BATCH_SIZE", 25))  # Invoices per transaction
+
+# Watched-folder ingestion (os.pathsep-separated list of directories)
+WATCH_FOLDERS = [path for path in os.environ.get("WATCH_FOLDERS", "").split(os.pathsep) if path]
+WATCH_SETTLE_SECONDS = float(os.environ.get("WATCH_SETTLE_SECONDS", 5))  # File must be unchanged this long before ingest
+WATCH_FORCE_POLLING = os.environ.get("WATCH_FORCE_POLLING", "false").lower() in ("1", "true", "yes")  # Network shares don't emit inotify events
+WATCH_POLL_INTERVAL_MS = int(os.environ.get("WATCH_POLL_INTERVAL_MS", 2000))
+
+# IMAP order-email ingestion
+IMAP_HOST = os.environ.get("IMAP_HOST", "")
+IMAP_PORT = int(os.environ.get("IMAP_PORT", 0)) or None  # Default: 993 with SSL, 143 without
+IMAP_USERNAME = os.environ.get("IMAP_USERNAME", "")
+IMAP_PASSWORD = os.environ.get("IMAP_PASSWORD", "")
+IMAP_MAILBOXES = [name.strip() for name in os.environ.get("IMAP_MAILBOXES", "INBOX").split(",") if name.strip()]
+IMAP_SSL = os.environ.get("IMAP_SSL", "true").lower() in ("1", "true", "yes")
+IMAP_FETCH_BATCH = int(os.environ.get("IMAP_FETCH_BATCH", 200))  # Messages per BODYSTRUCTURE fetch and ingest batch
+IMAP_POLL_INTERVAL = int(os.environ.get("IMAP_POLL_INTERVAL", 300))  # Seconds between polls
+
+# WebDAV / Nextcloud sync
+WEBDAV_URL = os.environ.get("WEBDAV_URL", "")  # e.g. https://cloud.example.com/remote.php/dav/files/alice/Receipts/
+WEBDAV_USERNAME = os.environ.get("WEBDAV_USERNAME", "")
+WEBDAV_PASSWORD = os.environ.get("WEBDAV_PASSWORD", "")
+WEBDAV_MAX_CONNECTIONS = int(os.environ.get("WEBDAV_MAX_CONNECTIONS", 8))  # Bounds PROPFIND and download concurrency
+WEBDAV_TIMEOUT = float(os.environ.get("WEBDAV_TIMEOUT", 30))
+WEBDAV_SYNC_BATCH = int(os.environ.get("WEBDAV_SYNC_BATCH", 200))  # Files downloaded and ingested per batch
+WEBDAV_SYNC_INTERVAL = int(os.environ.get("WEBDAV_SYNC_INTERVAL", 900))  # Seconds between syncs
+
+# Resumable uploads (large scanner batches sent in chunks)
+MAX_RESUMABLE_UPLOAD_SIZE = int(os.environ.get("MAX_RESUMABLE_UPLOAD_SIZE", 1024 * 1024 * 1024))  # 1GB
+RESUMABLE_UPLOAD_TTL_HOURS = int(os.environ.get("RESUMABLE_UPLOAD_TTL_HOURS", 24))  # Idle sessions are purged after this
+
+# Idempotency keys
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", 24))  # Retries after this run again
+
+# Expense result cache (invalidated by per-user generation counters)
+EXPENSE_CACHE_ENABLED = os.environ.get("EXPENSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# In-memory pivot cubes (features.expenses.cube) kept per worker, least recently used evicted first
+ANALYTICS_CUBE_MAX_USERS = int(os.environ.get("ANALYTICS_CUBE_MAX_USERS", 8))
+
 # API Settings
 API_TITLE = "Invoice Management System"
-API_MAX_REQUEST_SIZE = 10 * 1024 * 1024  # 10MB in bytes
+API_MAX_REQUEST_SIZE = MAX_UPLOAD_SIZE + 1024 * 1024  # One file plus room for form fields
+API_REQUEST_SIZE_OVERRIDES = {"/ingest/bulk": MAX_BULK_UPLOAD_SIZE}  # Path prefixes with their own limit
 
 # CORS Settings
 CORS_ORIGINS = [
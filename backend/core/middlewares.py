@@ -1,9 +1,10 @@
 # backend/core/middlewares.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from core.config import CORS_ORIGINS
+from core.config import CORS_ORIGINS, API_MAX_REQUEST_SIZE, API_REQUEST_SIZE_OVERRIDES
+from fastapi.responses import JSONResponse
 import time
-from typing import Callable
+from typing import Callable, Dict, Optional
 from fastapi import Request, Response
 import logging
 
@@ -31,6 +32,33 @@ class RequestLoggingMiddleware:
         
         return response
 
+class RequestSizeLimitMiddleware:
+    """Reject requests whose declared body size exceeds the limit before any of it is read.
+    
+    ``path_limits`` maps path prefixes (e.g. bulk ingest) to their own limit.
+    Bodies without a Content-Length (chunked) are still bounded per file
+    by the streaming upload helpers in utils/storage.py.
+    """
+    def __init__(self, max_request_size: int = API_MAX_REQUEST_SIZE, path_limits: Optional[Dict[str, int]] = None):
+        self.max_request_size = max_request_size
+        self.path_limits = path_limits or API_REQUEST_SIZE_OVERRIDES
+    
+    def limit_for(self, path: str) -> int:
+        for prefix, limit in self.path_limits.items():
+            if path.startswith(prefix):
+                return limit
+        return self.max_request_size
+    
+    async def __call__(self, request: Request, call_next: Callable) -> Response:
+        content_length = request.headers.get("content-length")
+        limit = self.limit_for(request.url.path)
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Request body exceeds the {limit} byte limit"}
+            )
+        return await call_next(request)
+
 def setup_middlewares(app: FastAPI) -> None:
     """Configure middleware for the application."""
     # Add CORS middleware
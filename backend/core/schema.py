@@ -0,0 +1,49 @@
+# core/schema.py
+import os
+
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+
+from core.database import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Revision matching the schema Base.metadata.create_all built before migrations
+BASELINE_REVISION = "0001"
+
+# Any 64-bit key; serializes upgrades started by several workers at once
+MIGRATION_LOCK_ID = 7_146_531_022
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_database() -> None:
+    """Bring the database schema to the latest migration.
+
+    A database created by create_all before migrations existed (tables but
+    no alembic_version) is stamped with the baseline revision first. Each
+    migration commits on its own, so ones that build indexes CONCURRENTLY
+    can leave the transaction; a session-level advisory lock makes workers
+    starting together upgrade once.
+    """
+    with engine.connect() as connection:
+        connection.execute(sa.select(sa.func.pg_advisory_lock(MIGRATION_LOCK_ID)))
+        connection.commit()
+        try:
+            config = alembic_config(connection)
+            inspector = sa.inspect(connection)
+            if not inspector.has_table("alembic_version") and inspector.has_table("invoices"):
+                command.stamp(config, BASELINE_REVISION)
+            connection.commit()
+            command.upgrade(config, "head")
+        finally:
+            connection.rollback()
+            connection.execute(sa.select(sa.func.pg_advisory_unlock(MIGRATION_LOCK_ID)))
+            connection.commit()
@@ -0,0 +1,82 @@
+# core/serialization.py
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional
+
+import hashlib
+
+import orjson
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+# ─────────────────────────────────────────────────────────
+# FAST JSON SERIALIZATION
+# ─────────────────────────────────────────────────────────
+# Heavy list endpoints build plain dicts (or pull row tuples) and encode them
+# once with orjson, instead of building Pydantic models and letting FastAPI
+# validate and re-encode them through jsonable_encoder and the stdlib encoder.
+# orjson handles date/datetime natively; Decimal columns are emitted as floats.
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Encode types orjson doesn't support natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content straight to JSON bytes."""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson.
+
+    Returning this from a route bypasses response_model validation, so the
+    route is responsible for producing data in the documented shape.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def etag_json_response(content: Any, if_none_match: Optional[str] = None, max_age: int = 0) -> Response:
+    """JSON response (content, or an already encoded body) with an ETag; 304 Not Modified when the client has it.
+
+    Lets browsers and proxies cache read-only aggregates: with max_age=0 they
+    revalidate every time and only download the body when it changed.
+    """
+    body = content if isinstance(content, bytes) else dumps(content)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}"}
+    if if_none_match and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def rows_to_dicts(rows: Iterable) -> List[dict]:
+    """Map SQLAlchemy result rows (named tuples) to dicts keyed by column label."""
+    return [dict(row._mapping) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def get_adapter(response_type: Any) -> TypeAdapter:
+    """Return a cached TypeAdapter for a response type such as List[Model]."""
+    return TypeAdapter(response_type)
+
+
+def model_response(response_type: Any, obj: Any) -> Response:
+    """Validate ORM objects with from_attributes and dump them to JSON in pydantic-core.
+
+    This is a single validate + serialize pass, replacing FastAPI's
+    response_model validation followed by jsonable_encoder and json.dumps.
+    """
+    adapter = get_adapter(response_type)
+    value = adapter.validate_python(obj, from_attributes=True)
+    return Response(content=adapter.dump_json(value), media_type="application/json")
@@ -0,0 +1 @@
+"""Spend analytics computed in Postgres (replacement intervals, top-N groups, percentiles, largest purchases)."""
\ No newline at end of file
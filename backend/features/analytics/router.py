@@ -0,0 +1,124 @@
+# features/analytics/router.py
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from core.serialization import FastJSONResponse
+from features.analytics.schemas import ReplacementInterval, TopGroup, SpendPercentiles, LargestPurchaseGroup
+from features.analytics.services import (
+    get_replacement_intervals, spend_conditions, parse_percentiles, get_top_groups, get_spend_percentiles,
+    get_largest_purchases
+)
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/replacements", response_model=List[ReplacementInterval])
+async def get_replacements(
+    db: Session = Depends(get_db),
+    user_id: int = 1,
+    group_by: str = "item_type",
+    key: Optional[str] = None,
+    min_purchases: int = Query(2, ge=2)
+):
+    """Purchase count, mean and median interval, last and predicted next purchase per item type or product.
+    
+    ``group_by`` is item_type or product; ``key`` restricts the result to one
+    item type or product name. Items bought on fewer than ``min_purchases``
+    days are left out.
+    """
+    try:
+        return FastJSONResponse(get_replacement_intervals(db, user_id, group_by, key, min_purchases))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def period_conditions(
+    user_id: int,
+    year: Optional[int],
+    start: Optional[date],
+    end: Optional[date],
+    category: Optional[str]
+) -> List:
+    """Filters of the spend analytics: ``year`` is shorthand for its first to last day."""
+    if year is not None:
+        start, end = date(year, 1, 1), date(year, 12, 31)
+    return spend_conditions(user_id, start, end, category)
+
+
+@router.get("/top", response_model=List[TopGroup])
+async def get_top(
+    db: Session = Depends(get_db),
+    dimension: str = "merchant",
+    limit: int = Query(20, ge=1, le=100),
+    user_id: int = 1,
+    year: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[str] = None
+):
+    """The groups (merchants, categories, cards, item types, ...) with the highest spend.
+    
+    ``year`` or ``start``/``end`` (YYYY-MM-DD, inclusive) restrict the
+    purchases, e.g. ?dimension=merchant&year=2024&limit=20.
+    """
+    try:
+        conditions = period_conditions(user_id, year, start, end, category)
+        return FastJSONResponse(get_top_groups(db, dimension, conditions, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/percentiles", response_model=List[SpendPercentiles])
+async def get_percentiles(
+    db: Session = Depends(get_db),
+    percentiles: Optional[str] = None,
+    group_by: Optional[str] = None,
+    user_id: int = 1,
+    year: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[str] = None
+):
+    """Order value percentiles (default 0.5,0.9,0.95,0.99) with count, min, mean and max.
+    
+    One "All" row, or one row per group with ``group_by``.
+    """
+    try:
+        conditions = period_conditions(user_id, year, start, end, category)
+        return FastJSONResponse(get_spend_percentiles(db, conditions, parse_percentiles(percentiles), group_by))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/largest", response_model=List[LargestPurchaseGroup])
+async def get_largest(
+    db: Session = Depends(get_db),
+    per: Optional[str] = None,
+    limit: int = Query(5, ge=1, le=100),
+    user_id: int = 1,
+    year: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[str] = None
+):
+    """The largest single purchases, overall or ``per`` group (e.g. per=category)."""
+    try:
+        conditions = period_conditions(user_id, year, start, end, category)
+        return FastJSONResponse(get_largest_purchases(db, conditions, per, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,48 @@
+# features/analytics/schemas.py
+from datetime import date
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class ReplacementInterval(BaseModel):
+    key: str  # Item type or product name
+    purchases: int  # Distinct days it was bought
+    first_purchase: date
+    last_purchase: date
+    mean_interval_days: float
+    median_interval_days: float
+    next_purchase: date  # Last purchase plus the median interval
+    days_until_next: int  # Negative when overdue
+
+
+class TopGroup(BaseModel):
+    name: str
+    key: str  # As in /expenses/summary/ drill-downs
+    count: int
+    total: float
+    share: float  # Of the total spend in the period
+
+
+class SpendPercentiles(BaseModel):
+    name: str
+    key: str
+    count: int
+    min: float
+    mean: float
+    max: float
+    percentiles: Dict[str, float]  # e.g. {"p50": 42.0, "p95": 310.5}
+
+
+class LargestPurchase(BaseModel):
+    rank: int
+    invoice_id: int
+    merchant_name: Optional[str] = None
+    order_number: Optional[str] = None
+    purchase_date: Optional[date] = None
+    total: float
+
+
+class LargestPurchaseGroup(BaseModel):
+    name: str
+    key: str
+    purchases: List[LargestPurchase]
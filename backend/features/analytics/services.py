@@ -0,0 +1,313 @@
+# features/analytics/services.py
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from sqlalchemy.orm import Session
+
+from features.expenses.services import (
+    UNKNOWN_LABELS, expense_filter_conditions, expense_group_memberships, format_group_key, group_url_key,
+    resolve_dimension
+)
+from features.invoices.models import Invoice, InvoiceItem
+
+# What replacement intervals can be computed per: item column, by name
+REPLACEMENT_KEYS = {
+    "item_type": InvoiceItem.item_type,
+    "product": InvoiceItem.product_name,
+}
+
+
+def get_replacement_intervals(
+    db: Session,
+    user_id: int,
+    group_by: str = "item_type",
+    key: Optional[str] = None,
+    min_purchases: int = 2,
+    today: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """How often each item type (or product) is bought again, and when the next purchase is due.
+
+    A purchase is a day on which the item was bought (several invoices or
+    lines on the same day count once). LAG over each item's purchases,
+    ordered by date, gives the days since the previous one; Postgres then
+    aggregates count, mean and median interval per item. The next purchase
+    is predicted as the last one plus the median interval, which one early
+    or late replacement doesn't skew. Soonest due first.
+    """
+    if group_by not in REPLACEMENT_KEYS:
+        raise ValueError(f"Unknown group_by '{group_by}'; expected one of {', '.join(REPLACEMENT_KEYS)}")
+    today = today or date.today()
+    item_key = sa.func.nullif(sa.func.trim(REPLACEMENT_KEYS[group_by]), "")
+
+    purchases = (
+        sa.select(item_key.label("item_key"), Invoice.purchase_date.label("purchase_date"))
+        .join(Invoice, Invoice.invoice_id == InvoiceItem.invoice_id)
+        .where(
+            Invoice.user_id == user_id,
+            Invoice.is_deleted == False,
+            Invoice.purchase_date.isnot(None),
+            item_key.isnot(None)
+        )
+        .distinct()
+    )
+    if key is not None:
+        purchases = purchases.where(item_key == key)
+    purchases = purchases.subquery()
+
+    # date - date is a whole number of days in Postgres
+    intervals = sa.select(
+        purchases.c.item_key,
+        purchases.c.purchase_date,
+        (
+            purchases.c.purchase_date
+            - sa.func.lag(purchases.c.purchase_date).over(
+                partition_by=purchases.c.item_key, order_by=purchases.c.purchase_date
+            )
+        ).label("interval_days"),
+    ).subquery()
+
+    median = sa.func.percentile_cont(0.5).within_group(intervals.c.interval_days)
+    rows = db.execute(
+        sa.select(
+            intervals.c.item_key,
+            sa.func.count().label("purchases"),
+            sa.func.min(intervals.c.purchase_date).label("first_purchase"),
+            sa.func.max(intervals.c.purchase_date).label("last_purchase"),
+            sa.func.avg(intervals.c.interval_days).label("mean_interval_days"),
+            median.label("median_interval_days"),
+            # percentile_cont returns float8; round to whole days before adding to a date
+            (sa.func.max(intervals.c.purchase_date) + sa.cast(sa.func.round(median), sa.Integer)).label("next_purchase"),
+        )
+        .group_by(intervals.c.item_key)
+        .having(sa.func.count() >= max(min_purchases, 2))
+        .order_by(sa.literal_column("next_purchase"), intervals.c.item_key)
+    ).all()
+
+    return [
+        {
+            "key": row.item_key,
+            "purchases": row.purchases,
+            "first_purchase": row.first_purchase,
+            "last_purchase": row.last_purchase,
+            "mean_interval_days": round(float(row.mean_interval_days), 1),
+            "median_interval_days": float(row.median_interval_days),
+            "next_purchase": row.next_purchase,
+            "days_until_next": (row.next_purchase - today).days,
+        }
+        for row in rows
+    ]
+
+
+# ─────────────────────────────────────────────────────────
+# TOP-N AND PERCENTILES
+# ─────────────────────────────────────────────────────────
+# Ranked and distribution queries over invoice totals. Groups come from the
+# expense membership CTE (features.expenses.services), so counts and totals
+# agree with /expenses/summary/; only the ranked or aggregated rows leave
+# Postgres.
+
+DEFAULT_PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def spend_conditions(
+    user_id: Optional[int],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[str] = None
+) -> List:
+    """Summary filters plus an inclusive purchase date range."""
+    conditions = expense_filter_conditions(user_id, category)
+    if start is not None:
+        conditions.append(Invoice.purchase_date >= start)
+    if end is not None:
+        conditions.append(Invoice.purchase_date <= end)
+    return conditions
+
+
+def parse_percentiles(value: Optional[str]) -> List[float]:
+    """Parse comma-separated fractions such as "0.5,0.95"."""
+    if not value:
+        return list(DEFAULT_PERCENTILES)
+    try:
+        percentiles = sorted({float(part) for part in value.split(",") if part.strip()})
+    except ValueError:
+        raise ValueError(f"Percentiles look like 0.5,0.95, not '{value}'")
+    if not percentiles or not all(0 <= percentile <= 1 for percentile in percentiles):
+        raise ValueError("Percentiles must be fractions between 0 and 1")
+    return percentiles
+
+
+def _percentile_label(percentile: float) -> str:
+    return f"p{percentile * 100:g}"
+
+
+def _grouped(dimension: str, conditions: List, name: str):
+    """(membership CTE, group key) with missing values and the "Unknown" label in one group, as in the summary."""
+    groups = expense_group_memberships([dimension], conditions, name=name)
+    key = groups.c.key_0
+    if dimension not in ("month", "year"):
+        key = sa.func.coalesce(key, UNKNOWN_LABELS[dimension])
+    return groups, key
+
+
+def _group_fields(dimension: Optional[str], key: Any) -> Dict[str, str]:
+    if dimension is None:
+        return {"name": "All", "key": "All"}
+    return {"name": format_group_key(dimension, key), "key": group_url_key(dimension, key)}
+
+
+def get_top_groups(db: Session, dimension: str, conditions: List, limit: int = 20) -> List[Dict[str, Any]]:
+    """The limit groups with the highest spend, with their share of the total spend.
+
+    Postgres sorts the aggregated groups under the LIMIT (a top-N heap
+    sort), so only limit rows are returned. Shares of categories or tags can
+    add up to more than 1, since an invoice counts in each of its groups.
+    """
+    dimension = resolve_dimension(dimension)
+    groups, key = _grouped(dimension, conditions, "top_groups")
+    overall = (
+        sa.select(sa.func.sum(sa.func.coalesce(Invoice.grand_total, 0)))
+        .where(*conditions)
+        .scalar_subquery()
+    )
+    total = sa.func.sum(groups.c.amount)
+    rows = db.execute(
+        sa.select(
+            key.label("group_key"),
+            sa.func.count().label("count"),
+            total.label("total"),
+            (total / sa.func.nullif(overall, 0)).label("share"),
+        )
+        .group_by(key)
+        .order_by(total.desc(), sa.func.count().desc(), key)
+        .limit(limit)
+    ).all()
+    return [
+        {
+            **_group_fields(dimension, row.group_key),
+            "count": row.count,
+            "total": float(row.total or 0),
+            "share": round(float(row.share or 0), 4),
+        }
+        for row in rows
+    ]
+
+
+def get_spend_percentiles(
+    db: Session,
+    conditions: List,
+    percentiles: List[float],
+    group_by: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Order value distribution (count, min, mean, max and percentiles of invoice totals), overall or per group.
+
+    One percentile_cont(ARRAY[...]) WITHIN GROUP aggregate computes every
+    requested percentile from a single sort of each group's totals.
+    Invoices without a total are left out. Largest groups first.
+    """
+    conditions = conditions + [Invoice.grand_total.isnot(None)]
+    if group_by:
+        dimension = resolve_dimension(group_by)
+        groups, key = _grouped(dimension, conditions, "percentile_groups")
+        amount = groups.c.amount
+        query = sa.select(key.label("group_key")).group_by(key).order_by(sa.func.count().desc(), key)
+    else:
+        dimension = None
+        amount = Invoice.grand_total
+        query = sa.select(sa.literal(None).label("group_key")).where(*conditions)
+
+    # percentile_cont over an array of fractions returns an array, in the same order
+    values = sa.type_coerce(sa.func.percentile_cont(array(percentiles)).within_group(amount), ARRAY(sa.Float))
+    rows = db.execute(
+        query.add_columns(
+            sa.func.count().label("count"),
+            sa.func.min(amount).label("min"),
+            sa.func.avg(amount).label("mean"),
+            sa.func.max(amount).label("max"),
+            values.label("percentiles"),
+        )
+    ).all()
+
+    return [
+        {
+            **_group_fields(dimension, row.group_key),
+            "count": row.count,
+            "min": float(row.min),
+            "mean": round(float(row.mean), 2),
+            "max": float(row.max),
+            "percentiles": {
+                _percentile_label(percentile): round(value, 2) for percentile, value in zip(percentiles, row.percentiles)
+            },
+        }
+        for row in rows
+        if row.count  # Without invoices the overall aggregate is a single row of NULLs
+    ]
+
+
+def _purchase(rank: int, row) -> Dict[str, Any]:
+    return {
+        "rank": rank,
+        "invoice_id": row.invoice_id,
+        "merchant_name": row.merchant_name,
+        "order_number": row.order_number,
+        "purchase_date": row.purchase_date,
+        "total": float(row.amount),
+    }
+
+
+def get_largest_purchases(
+    db: Session,
+    conditions: List,
+    per: Optional[str] = None,
+    limit: int = 5
+) -> List[Dict[str, Any]]:
+    """The limit largest invoices, overall or within each group (e.g. per category).
+
+    Overall this is ORDER BY grand_total DESC LIMIT, read backwards from the
+    (user_id, grand_total) index. Per group, ROW_NUMBER() OVER (PARTITION BY
+    group ORDER BY total DESC) ranks the invoices inside Postgres and only
+    ranks up to limit are joined back to the invoices for their details.
+    Groups are ordered by their largest purchase. Invoices without a total
+    are left out.
+    """
+    conditions = conditions + [Invoice.grand_total.isnot(None)]
+    details = (Invoice.invoice_id, Invoice.merchant_name, Invoice.order_number, Invoice.purchase_date)
+    if not per:
+        rows = db.execute(
+            sa.select(*details, Invoice.grand_total.label("amount"))
+            .where(*conditions)
+            .order_by(Invoice.grand_total.desc(), Invoice.invoice_id.desc())
+            .limit(limit)
+        ).all()
+        purchases = [_purchase(rank, row) for rank, row in enumerate(rows, 1)]
+        return [{**_group_fields(None, None), "purchases": purchases}] if purchases else []
+
+    dimension = resolve_dimension(per)
+    groups, key = _grouped(dimension, conditions, "largest_groups")
+    ranked = sa.select(
+        key.label("group_key"),
+        groups.c.invoice_id,
+        groups.c.amount,
+        sa.func.row_number().over(
+            partition_by=key, order_by=(groups.c.amount.desc(), groups.c.invoice_id.desc())
+        ).label("rank"),
+    ).subquery("ranked")
+    rows = db.execute(
+        sa.select(ranked.c.group_key, ranked.c.rank, ranked.c.amount, *details[1:], Invoice.invoice_id)
+        .join(Invoice, Invoice.invoice_id == ranked.c.invoice_id)
+        .where(ranked.c.rank <= limit)
+        .order_by(
+            sa.func.max(ranked.c.amount).over(partition_by=ranked.c.group_key).desc(),
+            ranked.c.group_key,
+            ranked.c.rank
+        )
+    ).all()
+
+    results: List[Dict[str, Any]] = []
+    for row in rows:
+        if row.rank == 1:
+            results.append({**_group_fields(dimension, row.group_key), "purchases": []})
+        results[-1]["purchases"].append(_purchase(row.rank, row))
+    return results
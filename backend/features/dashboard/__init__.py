@@ -0,0 +1 @@
+"""Dashboard feature: every dashboard widget evaluated in a single query."""
\ No newline at end of file
@@ -0,0 +1,34 @@
+# features/dashboard/router.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from core.serialization import FastJSONResponse
+from features.dashboard.schemas import DashboardRequest, DashboardResponse
+from features.dashboard.services import get_dashboard
+from features.expenses.services import expense_filter_conditions
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["dashboard"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.post("", response_model=DashboardResponse)
+async def get_dashboard_widgets(request: DashboardRequest, db: Session = Depends(get_db)):
+    """Evaluate several dashboard widgets in one round trip.
+    
+    Widget types: ``totals`` (count, total, average), ``groups`` (top groups
+    of ``dimension``), ``tags`` / ``categories`` (every name with its invoice
+    count) and ``recent`` (latest invoices). All widgets share the
+    user_id/category/date_filter filters and are answered by a single SQL
+    statement over one filtered scan of the invoices.
+    """
+    try:
+        conditions = expense_filter_conditions(request.user_id, request.category, request.date_filter)
+        return FastJSONResponse(get_dashboard(db, request.widgets, conditions))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,21 @@
+# features/dashboard/schemas.py
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class DashboardWidget(BaseModel):
+    id: str = Field(description="Key of this widget's result in the response")
+    type: str = Field(description="totals, groups, tags, categories or recent")
+    dimension: Optional[str] = Field(default=None, description="Grouping of a groups widget (category, merchant, month, ...)")
+    limit: int = Field(default=10, ge=1, le=100, description="Groups or invoices returned")
+
+
+class DashboardRequest(BaseModel):
+    user_id: Optional[int] = None
+    category: Optional[str] = None
+    date_filter: Optional[str] = None
+    widgets: List[DashboardWidget] = Field(min_length=1, max_length=20)
+
+
+class DashboardResponse(BaseModel):
+    widgets: Dict[str, Any]  # Widget id -> its result
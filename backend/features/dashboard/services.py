@@ -0,0 +1,146 @@
+# features/dashboard/services.py
+from datetime import datetime
+from typing import Any, Dict, List
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from features.dashboard.schemas import DashboardWidget
+from features.expenses.services import expense_group_memberships, format_group_key, group_url_key, resolve_dimension
+from features.invoices.models import Invoice, Category, InvoiceCategory, Tag, InvoiceTag
+
+# ─────────────────────────────────────────────────────────
+# DASHBOARD
+# ─────────────────────────────────────────────────────────
+# Every widget becomes one branch of a UNION ALL over a single filtered
+# invoices CTE, so the whole dashboard is one statement: Postgres scans the
+# matching invoices once and every aggregate reads that result. Branches
+# share the columns (widget, rank, name, count, total, detail); each widget
+# only fills the ones it needs.
+
+WIDGET_TYPES = ("totals", "groups", "tags", "categories", "recent")
+
+
+def _branch(index: int, rank=None, name=None, count=None, total=None, detail=None):
+    """Columns of one UNION ALL branch, with typed NULLs for the unused ones."""
+    return [
+        sa.literal(index, sa.Integer).label("widget"),
+        (rank if rank is not None else sa.cast(sa.null(), sa.BigInteger)).label("rank"),
+        sa.cast(name if name is not None else sa.null(), sa.Text).label("name"),
+        (count if count is not None else sa.cast(sa.null(), sa.BigInteger)).label("count"),
+        sa.cast(total if total is not None else sa.null(), sa.Numeric).label("total"),
+        (detail if detail is not None else sa.cast(sa.null(), JSONB)).label("detail"),
+    ]
+
+
+def _name_counts(index: int, invoices, model, junction, id_column: str, name_column):
+    """Every tag or category name with the number and total of filtered invoices carrying it (0 if none)."""
+    linked = junction.__table__.join(invoices, invoices.c.invoice_id == junction.invoice_id)
+    return (
+        sa.select(*_branch(
+            index,
+            name=name_column,
+            count=sa.func.count(invoices.c.invoice_id),
+            total=sa.func.coalesce(sa.func.sum(invoices.c.grand_total), 0),
+        ))
+        .select_from(model.__table__.outerjoin(linked, getattr(junction, id_column) == getattr(model, id_column)))
+        .group_by(name_column)
+    )
+
+
+def _widget_query(index: int, widget: DashboardWidget, invoices):
+    amount = sa.func.coalesce(invoices.c.grand_total, 0)
+    if widget.type == "totals":
+        return sa.select(*_branch(index, count=sa.func.count(), total=sa.func.coalesce(sa.func.sum(amount), 0)))
+    if widget.type == "groups":
+        groups = expense_group_memberships(
+            [resolve_dimension(widget.dimension or "category")], [], name=f"widget_{index}_groups", invoices=invoices
+        )
+        return (
+            sa.select(*_branch(index, name=groups.c.key_0, count=sa.func.count(), total=sa.func.sum(groups.c.amount)))
+            .group_by(groups.c.key_0)
+        )
+    if widget.type == "tags":
+        return _name_counts(index, invoices, Tag, InvoiceTag, "tag_id", Tag.tag_name)
+    if widget.type == "categories":
+        return _name_counts(index, invoices, Category, InvoiceCategory, "category_id", Category.category_name)
+    if widget.type == "recent":
+        order = (invoices.c.purchase_date.desc().nulls_last(), invoices.c.invoice_id.desc())
+        recent = (
+            sa.select(invoices, sa.func.row_number().over(order_by=order).label("rank"))
+            .order_by(*order)
+            .limit(widget.limit)
+            .subquery()
+        )
+        detail = sa.func.jsonb_build_object(
+            "invoice_id", recent.c.invoice_id,
+            "merchant_name", recent.c.merchant_name,
+            "order_number", recent.c.order_number,
+            "purchase_date", recent.c.purchase_date,
+            "payment_method", recent.c.payment_method,
+            "grand_total", recent.c.grand_total,
+            "status", recent.c.status,
+        )
+        return sa.select(*_branch(index, rank=recent.c.rank, detail=detail))
+    raise ValueError(f"Unknown widget type '{widget.type}'; expected one of {', '.join(WIDGET_TYPES)}")
+
+
+def _parse_group_key(dimension: str, key):
+    """Group keys come back as text from the shared name column."""
+    if key is None:
+        return None
+    if dimension == "month":
+        return datetime.fromisoformat(key)
+    if dimension == "year":
+        return int(key)
+    return key
+
+
+def get_dashboard(db: Session, widgets: List[DashboardWidget], conditions: List) -> Dict[str, Any]:
+    """Results of all widgets over the invoices matching conditions, computed in one query."""
+    ids = [widget.id for widget in widgets]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Widget ids must be unique")
+
+    invoices = (
+        sa.select(
+            Invoice.invoice_id, Invoice.merchant_name, Invoice.order_number, Invoice.purchase_date,
+            Invoice.payment_method, Invoice.grand_total, Invoice.status
+        )
+        .where(*conditions)
+        .cte("dashboard_invoices")
+    )
+    statement = sa.union_all(*[_widget_query(index, widget, invoices) for index, widget in enumerate(widgets)])
+
+    rows: Dict[int, List] = {index: [] for index in range(len(widgets))}
+    for row in db.execute(statement):
+        rows[row.widget].append(row)
+
+    results: Dict[str, Any] = {}
+    for index, widget in enumerate(widgets):
+        widget_rows = rows[index]
+        if widget.type == "totals":
+            row = widget_rows[0]
+            total = float(row.total)
+            results[widget.id] = {"count": row.count, "total": total, "average": total / row.count if row.count else 0.0}
+        elif widget.type == "groups":
+            dimension = resolve_dimension(widget.dimension or "category")
+            # Several raw keys (NULL and "") can share a display name
+            groups: Dict[str, Dict[str, Any]] = {}
+            for row in widget_rows:
+                key = _parse_group_key(dimension, row.name)
+                name = format_group_key(dimension, key)
+                group = groups.setdefault(name, {"name": name, "key": group_url_key(dimension, key), "count": 0, "total": 0.0})
+                group["count"] += row.count
+                group["total"] += float(row.total or 0)
+            results[widget.id] = sorted(groups.values(), key=lambda group: group["total"], reverse=True)[:widget.limit]
+        elif widget.type in ("tags", "categories"):
+            results[widget.id] = [
+                {"name": row.name, "count": row.count, "total": float(row.total)}
+                for row in sorted(widget_rows, key=lambda row: (-row.count, row.name or ""))
+            ][:widget.limit]
+        else:
+            results[widget.id] = [row.detail for row in sorted(widget_rows, key=lambda row: row.rank)]
+
+    return {"widgets": results}
@@ -0,0 +1 @@
+"""Duplicate invoice detection feature."""
\ No newline at end of file
@@ -0,0 +1,161 @@
+# features/duplicates/phash.py
+import logging
+from itertools import combinations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+BAND_COUNT = 4
+BAND_BITS = HASH_BITS // BAND_COUNT
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# DPI used to rasterize the first PDF page; dHash only needs a thumbnail
+PDF_HASH_DPI = 50
+
+
+def dhash(image: Image.Image) -> int:
+    """Compute a 64-bit difference hash of an image.
+
+    The image is reduced to a 9x8 grayscale thumbnail and each bit records
+    whether a pixel is brighter than its right-hand neighbour, which is
+    stable across rescans at different resolutions, contrast or compression.
+    """
+    thumbnail = image.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(thumbnail.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def compute_file_hash(file_path: str) -> Optional[int]:
+    """Return the dHash of a document's first page (PDF or image), or None if it can't be rendered."""
+    try:
+        if file_path.lower().endswith(".pdf"):
+            from pdf2image import convert_from_path
+            pages = convert_from_path(file_path, dpi=PDF_HASH_DPI, first_page=1, last_page=1)
+            if not pages:
+                return None
+            return dhash(pages[0])
+        if file_path.lower().endswith((".png", ".jpg", ".jpeg")):
+            with Image.open(file_path) as image:
+                return dhash(image)
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash for {file_path}: {e}")
+    return None
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def to_signed(value: int) -> int:
+    """Map an unsigned 64-bit hash onto the signed range of a BIGINT column."""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def hash_bands(value: int) -> List[int]:
+    """Split an unsigned hash into BAND_COUNT fixed-width substrings (most significant first)."""
+    return [(value >> (BAND_BITS * (BAND_COUNT - 1 - i))) & BAND_MASK for i in range(BAND_COUNT)]
+
+
+def band_neighbours(band: int, radius: int) -> List[int]:
+    """All band values within ``radius`` bit flips of ``band``."""
+    values = [band]
+    for distance in range(1, radius + 1):
+        for bits in combinations(range(BAND_BITS), distance):
+            flipped = band
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+
+def band_search_radius(max_distance: int) -> int:
+    """Per-band radius for multi-index hashing.
+
+    By the pigeonhole principle, two hashes within ``max_distance`` differ in
+    at most ``max_distance // BAND_COUNT`` bits in at least one band, so
+    probing each band within that radius finds every true match.
+    """
+    return max_distance // BAND_COUNT
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance for radius queries on hashes."""
+
+    def __init__(self):
+        self._root: Optional[Tuple[int, list, Dict[int, tuple]]] = None
+
+    def add(self, value: int, payload) -> None:
+        if self._root is None:
+            self._root = (value, [payload], {})
+            return
+        node = self._root
+        while True:
+            node_value, payloads, children = node
+            distance = hamming_distance(value, node_value)
+            if distance == 0:
+                payloads.append(payload)
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (value, [payload], {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> Iterator[Tuple[int, object]]:
+        """Yield (distance, payload) for every stored hash within max_distance."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node_value, payloads, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                for payload in payloads:
+                    yield distance, payload
+            # Triangle inequality: only subtrees at edge distance d ± max_distance can match
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+
+
+def group_near_duplicates(entries: Iterable[Tuple[int, object]], max_distance: int) -> List[List[object]]:
+    """Cluster (hash, payload) pairs whose hashes are within max_distance, transitively.
+
+    Returns only clusters with more than one member.
+    """
+    entries = list(entries)
+    tree = BKTree()
+    for index, (value, _) in enumerate(entries):
+        tree.add(value, index)
+
+    parent = list(range(len(entries)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for index, (value, _) in enumerate(entries):
+        for _, other in tree.search(value, max_distance):
+            root_a, root_b = find(index), find(other)
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+    clusters: Dict[int, List[object]] = {}
+    for index, (_, payload) in enumerate(entries):
+        clusters.setdefault(find(index), []).append(payload)
+    return [members for members in clusters.values() if len(members) > 1]
@@ -0,0 +1,102 @@
+# features/duplicates/router.py
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from core.serialization import FastJSONResponse
+from features.invoices.models import Invoice
+from features.invoices.models import InvoiceFile
+from features.duplicates.phash import to_unsigned
+from features.duplicates.schemas import (
+    DuplicateCheckRequest, DuplicateCheckResponse, SimilarFilesResponse, NearDuplicateReport
+)
+from features.duplicates.services import (
+    find_duplicate_candidates, find_duplicates_of_invoice, find_similar_files,
+    near_duplicate_report, PHASH_MAX_DISTANCE
+)
+from utils.helpers import parse_date
+
+router = APIRouter(
+    prefix="/duplicates",
+    tags=["duplicates"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.post("/check", response_model=DuplicateCheckResponse)
+async def check_duplicates(request: DuplicateCheckRequest, db: Session = Depends(get_db)):
+    """Return existing invoices that look like the described invoice."""
+    try:
+        candidates = find_duplicate_candidates(
+            db,
+            user_id=request.user_id,
+            merchant_name=request.merchant_name,
+            order_number=request.order_number,
+            purchase_date=parse_date(request.purchase_date),
+            grand_total=request.grand_total,
+            exclude_invoice_id=request.exclude_invoice_id,
+            limit=request.limit
+        )
+        return FastJSONResponse({"candidates": candidates})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/invoice/{invoice_id}", response_model=DuplicateCheckResponse)
+async def get_invoice_duplicates(invoice_id: int, limit: int = 5, db: Session = Depends(get_db)):
+    """Return likely duplicates of an existing invoice."""
+    try:
+        invoice = db.query(Invoice).filter(Invoice.invoice_id == invoice_id, Invoice.is_deleted == False).first()
+        if not invoice:
+            raise HTTPException(status_code=404, detail="Invoice not found")
+        
+        return FastJSONResponse({"candidates": find_duplicates_of_invoice(db, invoice, limit=limit)})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+@router.get("/invoice/{invoice_id}/similar-files", response_model=SimilarFilesResponse)
+async def get_similar_files(
+    invoice_id: int,
+    max_distance: int = Query(PHASH_MAX_DISTANCE, ge=0, le=15),
+    limit: int = 5,
+    db: Session = Depends(get_db)
+):
+    """Return files of other invoices that look like rescans of this invoice's documents."""
+    try:
+        invoice = db.query(Invoice).filter(Invoice.invoice_id == invoice_id, Invoice.is_deleted == False).first()
+        if not invoice:
+            raise HTTPException(status_code=404, detail="Invoice not found")
+        
+        files = db.query(InvoiceFile).filter(InvoiceFile.invoice_id == invoice_id, InvoiceFile.phash.isnot(None)).all()
+        matches = {}
+        for invoice_file in files:
+            for match in find_similar_files(db, to_unsigned(invoice_file.phash), max_distance,
+                                            user_id=invoice.user_id, exclude_invoice_id=invoice_id, limit=limit):
+                if match["file_id"] not in matches or match["distance"] < matches[match["file_id"]]["distance"]:
+                    matches[match["file_id"]] = match
+        
+        ranked = sorted(matches.values(), key=lambda match: match["distance"])[:limit]
+        return FastJSONResponse({"files": ranked})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/report", response_model=NearDuplicateReport)
+async def get_near_duplicate_report(
+    user_id: Optional[int] = None,
+    max_distance: int = Query(PHASH_MAX_DISTANCE, ge=0, le=15),
+    db: Session = Depends(get_db)
+):
+    """Group every scanned document in the archive into clusters of near-duplicates."""
+    try:
+        clusters = near_duplicate_report(db, user_id=user_id, max_distance=max_distance)
+        return FastJSONResponse({"max_distance": max_distance, "clusters": clusters})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
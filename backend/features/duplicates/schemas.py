@@ -0,0 +1,45 @@
+# features/duplicates/schemas.py
+from typing import List, Optional
+from datetime import date
+from pydantic import BaseModel, ConfigDict
+
+
+class DuplicateCheckRequest(BaseModel):
+    user_id: Optional[int] = None
+    merchant_name: Optional[str] = None
+    order_number: Optional[str] = None
+    purchase_date: Optional[str] = None
+    grand_total: Optional[float] = None
+    exclude_invoice_id: Optional[int] = None
+    limit: int = 5
+
+
+class DuplicateCandidate(BaseModel):
+    invoice_id: int
+    merchant_name: Optional[str] = None
+    order_number: Optional[str] = None
+    purchase_date: Optional[date] = None
+    grand_total: Optional[float] = None
+    score: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DuplicateCheckResponse(BaseModel):
+    candidates: List[DuplicateCandidate]
+
+
+class SimilarFile(BaseModel):
+    file_id: int
+    invoice_id: int
+    file_name: Optional[str] = None
+    distance: Optional[int] = None  # Hamming distance between perceptual hashes (0-64)
+
+
+class SimilarFilesResponse(BaseModel):
+    files: List[SimilarFile]
+
+
+class NearDuplicateReport(BaseModel):
+    max_distance: int
+    clusters: List[List[SimilarFile]]
@@ -0,0 +1,234 @@
+# features/duplicates/services.py
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from core.serialization import rows_to_dicts
+from features.invoices.models import Invoice, InvoiceFile
+from features.duplicates.phash import (
+    hash_bands, band_neighbours, band_search_radius, hamming_distance,
+    to_signed, to_unsigned, group_near_duplicates
+)
+
+# Days either side of the purchase date treated as "same purchase"
+DATE_BAND_DAYS = 3
+
+# Absolute difference in grand_total treated as "same amount"
+TOTAL_TOLERANCE = 0.01
+
+# Minimum combined score for a candidate to be reported
+MIN_SCORE = 0.5
+
+# Default Hamming distance (out of 64 bits) for two scans to count as the same document
+PHASH_MAX_DISTANCE = 6
+
+# Relative weight of each signal in the combined score
+WEIGHTS = {
+    "order_number": 0.4,
+    "merchant_name": 0.25,
+    "grand_total": 0.2,
+    "purchase_date": 0.15,
+}
+
+
+def find_duplicate_candidates(
+    db: Session,
+    user_id: Optional[int] = None,
+    merchant_name: Optional[str] = None,
+    order_number: Optional[str] = None,
+    purchase_date: Optional[date] = None,
+    grand_total: Optional[float] = None,
+    exclude_invoice_id: Optional[int] = None,
+    limit: int = 5,
+    min_score: float = MIN_SCORE
+) -> List[Dict]:
+    """Return existing invoices that look like the described one, best match first.
+
+    Candidates are gathered by OR-ing index-backed predicates (trigram match on
+    order number, purchase date band + total band, exact total + trigram match on
+    merchant), so Postgres can combine bitmap index scans instead of scanning
+    the table. Each candidate is then scored on the signals that were provided.
+    """
+    candidate_predicates = []
+    score_terms = []
+    weight_total = 0.0
+
+    if order_number:
+        candidate_predicates.append(Invoice.order_number.op("%")(order_number))
+        score_terms.append(WEIGHTS["order_number"] * sa.func.coalesce(sa.func.similarity(Invoice.order_number, order_number), 0))
+        weight_total += WEIGHTS["order_number"]
+
+    if merchant_name:
+        score_terms.append(WEIGHTS["merchant_name"] * sa.func.coalesce(sa.func.similarity(Invoice.merchant_name, merchant_name), 0))
+        weight_total += WEIGHTS["merchant_name"]
+
+    if grand_total is not None:
+        total_low, total_high = grand_total - TOTAL_TOLERANCE, grand_total + TOTAL_TOLERANCE
+        score_terms.append(WEIGHTS["grand_total"] * sa.case(
+            (Invoice.grand_total.between(total_low, total_high), 1.0),
+            else_=0.0
+        ))
+        weight_total += WEIGHTS["grand_total"]
+        if merchant_name:
+            candidate_predicates.append(sa.and_(
+                Invoice.grand_total.between(total_low, total_high),
+                Invoice.merchant_name.op("%")(merchant_name)
+            ))
+
+    if purchase_date is not None:
+        date_low = purchase_date - timedelta(days=DATE_BAND_DAYS)
+        date_high = purchase_date + timedelta(days=DATE_BAND_DAYS)
+        score_terms.append(WEIGHTS["purchase_date"] * sa.case(
+            (Invoice.purchase_date == purchase_date, 1.0),
+            (Invoice.purchase_date.between(date_low, date_high), 0.5),
+            else_=0.0
+        ))
+        weight_total += WEIGHTS["purchase_date"]
+        if grand_total is not None:
+            candidate_predicates.append(sa.and_(
+                Invoice.purchase_date.between(date_low, date_high),
+                Invoice.grand_total.between(grand_total - TOTAL_TOLERANCE, grand_total + TOTAL_TOLERANCE)
+            ))
+
+    if not candidate_predicates:
+        return []
+
+    score = (sum(score_terms[1:], score_terms[0]) / weight_total).label("score")
+
+    conditions = [Invoice.is_deleted == False, sa.or_(*candidate_predicates)]
+    if user_id:
+        conditions.append(Invoice.user_id == user_id)
+    if exclude_invoice_id:
+        conditions.append(Invoice.invoice_id != exclude_invoice_id)
+
+    candidates = (
+        sa.select(
+            Invoice.invoice_id,
+            Invoice.merchant_name,
+            Invoice.order_number,
+            Invoice.purchase_date,
+            Invoice.grand_total,
+            score,
+        )
+        .where(*conditions)
+        .subquery("candidates")
+    )
+
+    statement = (
+        sa.select(candidates)
+        .where(candidates.c.score >= min_score)
+        .order_by(candidates.c.score.desc(), candidates.c.invoice_id.desc())
+        .limit(limit)
+    )
+    return rows_to_dicts(db.execute(statement))
+
+
+def find_duplicates_of_invoice(db: Session, invoice: Invoice, limit: int = 5) -> List[Dict]:
+    """Return likely duplicates of an existing invoice."""
+    return find_duplicate_candidates(
+        db,
+        user_id=invoice.user_id,
+        merchant_name=invoice.merchant_name,
+        order_number=invoice.order_number,
+        purchase_date=invoice.purchase_date,
+        grand_total=float(invoice.grand_total) if invoice.grand_total is not None else None,
+        exclude_invoice_id=invoice.invoice_id,
+        limit=limit
+    )
+
+
+def get_invoice_by_order_number(db: Session, order_number: Optional[str], exclude_invoice_id: Optional[int] = None) -> Optional[Invoice]:
+    """Return the invoice already holding an order number (order_number is unique across invoices)."""
+    if not order_number:
+        return None
+    query = db.query(Invoice).filter(Invoice.order_number == order_number)
+    if exclude_invoice_id:
+        query = query.filter(Invoice.invoice_id != exclude_invoice_id)
+    return query.first()
+
+
+PHASH_BAND_COLUMNS = [
+    InvoiceFile.phash_band_0,
+    InvoiceFile.phash_band_1,
+    InvoiceFile.phash_band_2,
+    InvoiceFile.phash_band_3,
+]
+
+
+def set_file_phash(invoice_file: InvoiceFile, value: Optional[int]) -> None:
+    """Store an unsigned perceptual hash and its band columns on an invoice file."""
+    if value is None:
+        return
+    invoice_file.phash = to_signed(value)
+    for column, band in zip(PHASH_BAND_COLUMNS, hash_bands(value)):
+        setattr(invoice_file, column.key, band)
+
+
+def find_similar_files(
+    db: Session,
+    phash: int,
+    max_distance: int = PHASH_MAX_DISTANCE,
+    user_id: Optional[int] = None,
+    exclude_invoice_id: Optional[int] = None,
+    limit: int = 5
+) -> List[Dict]:
+    """Return invoice files whose perceptual hash is within max_distance of ``phash``.
+
+    Uses multi-index hashing: each indexed 16-bit band is probed with the
+    values within the per-band radius, and the few rows returned are then
+    checked against the exact Hamming distance.
+    """
+    radius = band_search_radius(max_distance)
+    band_predicates = [
+        column.in_(band_neighbours(band, radius))
+        for column, band in zip(PHASH_BAND_COLUMNS, hash_bands(phash))
+    ]
+
+    conditions = [Invoice.is_deleted == False, sa.or_(*band_predicates)]
+    if user_id:
+        conditions.append(Invoice.user_id == user_id)
+    if exclude_invoice_id:
+        conditions.append(InvoiceFile.invoice_id != exclude_invoice_id)
+
+    rows = db.execute(
+        sa.select(InvoiceFile.file_id, InvoiceFile.invoice_id, InvoiceFile.file_name, InvoiceFile.phash)
+        .join(Invoice, Invoice.invoice_id == InvoiceFile.invoice_id)
+        .where(*conditions)
+    )
+
+    matches = []
+    for file_id, invoice_id, file_name, stored_hash in rows:
+        distance = hamming_distance(phash, to_unsigned(stored_hash))
+        if distance <= max_distance:
+            matches.append({
+                "file_id": file_id,
+                "invoice_id": invoice_id,
+                "file_name": file_name,
+                "distance": distance,
+            })
+
+    matches.sort(key=lambda match: (match["distance"], -match["invoice_id"]))
+    return matches[:limit]
+
+
+def near_duplicate_report(db: Session, user_id: Optional[int] = None, max_distance: int = PHASH_MAX_DISTANCE) -> List[List[Dict]]:
+    """Group every hashed file in the archive into clusters of near-duplicate scans."""
+    conditions = [Invoice.is_deleted == False, InvoiceFile.phash.isnot(None)]
+    if user_id:
+        conditions.append(Invoice.user_id == user_id)
+
+    rows = db.execute(
+        sa.select(InvoiceFile.file_id, InvoiceFile.invoice_id, InvoiceFile.file_name, InvoiceFile.phash)
+        .join(Invoice, Invoice.invoice_id == InvoiceFile.invoice_id)
+        .where(*conditions)
+    )
+
+    entries = [
+        (to_unsigned(stored_hash), {"file_id": file_id, "invoice_id": invoice_id, "file_name": file_name})
+        for file_id, invoice_id, file_name, stored_hash in rows
+    ]
+    clusters = group_near_duplicates(entries, max_distance)
+
+    # Files of a single invoice aren't duplicates of each other
+    return [cluster for cluster in clusters if len({member["invoice_id"] for member in cluster}) > 1]
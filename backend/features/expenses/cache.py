@@ -0,0 +1,277 @@
+# features/expenses/cache.py
+import hashlib
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import EXPENSE_CACHE_ENABLED
+from core.serialization import dumps
+from features.expenses.models import UserDataGeneration, ExpenseResultCache
+from features.invoices.models import Invoice, InvoiceItem, Category, InvoiceCategory, Tag, InvoiceTag
+
+# ─────────────────────────────────────────────────────────
+# EXPENSE RESULT CACHE
+# ─────────────────────────────────────────────────────────
+# Results are stored in Postgres (shared by every worker) together with the
+# owning user's generation at the time they were computed. Session events
+# bump the generation of every user whose invoices, items, categories or tags
+# a transaction touched, right before it commits, so a cached result is
+# reused exactly until the next committed write. A hit is one indexed lookup
+# that compares the stored generation with the current one.
+
+ALL_USERS = 0  # Cache user_id of results that are not filtered by user
+
+# Entities whose writes change expense results
+WATCHED_ENTITIES = (Invoice, InvoiceItem, Category, InvoiceCategory, Tag, InvoiceTag)
+
+# session.info keys for the users touched by the current transaction
+_PENDING_USERS = "expense_cache_users"
+_PENDING_INVOICES = "expense_cache_invoices"
+_PENDING_ALL = "expense_cache_all_users"
+_COMMITTED = "expense_cache_committed"
+
+_commit_callbacks: List[Callable[[Set[int], Set[int], bool], None]] = []
+
+
+class CacheStats:
+    """Hit and miss counters of this worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "process_id": os.getpid(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+stats = CacheStats()
+
+
+def cache_key(name: str, **params: Any) -> str:
+    """Stable key for a result name and its parameters (hashed if it would not fit the column)."""
+    key = name + "?" + "&".join(f"{param}={params[param]}" for param in sorted(params) if params[param] is not None)
+    if len(key) > 255:
+        key = f"{name}#{hashlib.sha256(key.encode()).hexdigest()}"
+    return key
+
+
+def _current_generation(user_id: int):
+    """Scalar subquery of the user's current generation; for ALL_USERS the sum over users, which grows with every bump."""
+    if user_id == ALL_USERS:
+        return sa.select(sa.func.coalesce(sa.func.sum(UserDataGeneration.generation), 0)).scalar_subquery()
+    return sa.func.coalesce(
+        sa.select(UserDataGeneration.generation).where(UserDataGeneration.user_id == user_id).scalar_subquery(),
+        0
+    )
+
+
+def cached_json(db: Session, user_id: Optional[int], key: str, compute: Callable[[], Any]) -> bytes:
+    """JSON body for key: the cached one if the user's data is unchanged since it was stored, else compute() encoded.
+
+    compute() runs after the current generation was read, so a write
+    committed in between leaves the stored result already stale rather than
+    wrongly fresh. Commits the session when it stores a result.
+    """
+    if not EXPENSE_CACHE_ENABLED:
+        return dumps(compute())
+
+    user_id = user_id or ALL_USERS
+    payload = db.execute(
+        sa.select(ExpenseResultCache.payload).where(
+            ExpenseResultCache.user_id == user_id,
+            ExpenseResultCache.cache_key == key,
+            ExpenseResultCache.generation == _current_generation(user_id)
+        )
+    ).scalar()
+    stats.record(payload is not None)
+    if payload is not None:
+        return payload
+
+    generation = current_generation(db, user_id)
+    payload = dumps(compute())
+    statement = pg_insert(ExpenseResultCache).values(
+        user_id=user_id, cache_key=key, generation=generation, payload=payload, created_at=datetime.utcnow()
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[ExpenseResultCache.user_id, ExpenseResultCache.cache_key],
+        set_={
+            "generation": statement.excluded.generation,
+            "payload": statement.excluded.payload,
+            "created_at": statement.excluded.created_at,
+        },
+        # A slower request must not overwrite a result computed from newer data
+        where=ExpenseResultCache.generation <= statement.excluded.generation
+    ))
+    db.commit()
+    return payload
+
+
+def bump_generations(db: Session, user_ids: Iterable[int] = (), all_users: bool = False) -> None:
+    """Invalidate cached results of these users (or of everyone) as part of the caller's transaction.
+
+    Any bump also invalidates the ALL_USERS results, whose generation is the
+    sum over all rows.
+    """
+    if all_users:
+        # Also users (and ALL_USERS) that have cached results but no generation row yet
+        known = sa.union(
+            sa.select(UserDataGeneration.user_id),
+            sa.select(ExpenseResultCache.user_id)
+        ).subquery()
+        source = sa.select(known.c.user_id, sa.literal(1, sa.BigInteger))
+        statement = pg_insert(UserDataGeneration).from_select(["user_id", "generation"], source)
+    else:
+        # Invoices without a user only affect the all-users results. Sorted so
+        # concurrent transactions lock the rows in the same order.
+        user_ids = sorted({user_id or ALL_USERS for user_id in user_ids})
+        if not user_ids:
+            return
+        statement = pg_insert(UserDataGeneration).values([{"user_id": user_id, "generation": 1} for user_id in user_ids])
+    db.connection().execute(statement.on_conflict_do_update(
+        index_elements=[UserDataGeneration.user_id],
+        set_={"generation": UserDataGeneration.generation + 1}
+    ))
+
+
+def purge_stale_results(db: Session, older_than_days: int = 7) -> int:
+    """Delete results invalidated by later writes or stored more than older_than_days ago; returns how many."""
+    current = sa.case(
+        (ExpenseResultCache.user_id == ALL_USERS, _current_generation(ALL_USERS)),
+        else_=sa.func.coalesce(
+            sa.select(UserDataGeneration.generation)
+            .where(UserDataGeneration.user_id == ExpenseResultCache.user_id)
+            .scalar_subquery(),
+            0
+        )
+    )
+    removed = db.query(ExpenseResultCache).filter(sa.or_(
+        ExpenseResultCache.generation != current,
+        ExpenseResultCache.created_at < datetime.utcnow() - timedelta(days=older_than_days)
+    )).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def on_committed_writes(callback: Callable[[Set[int], Set[int], bool], None]) -> None:
+    """Call callback(user_ids, invoice_ids, all_users) after each commit in this process that bumped generations.
+
+    Lets in-process copies of invoice data (features.expenses.cube) patch
+    just the invoices a local write touched; writes by other workers only
+    show up as generation changes.
+    """
+    _commit_callbacks.append(callback)
+
+
+def current_generation(db: Session, user_id: int) -> int:
+    return db.execute(sa.select(_current_generation(user_id))).scalar()
+
+
+def cache_entry_count(db: Session) -> int:
+    return db.query(sa.func.count()).select_from(ExpenseResultCache).scalar()
+
+
+# ─────────────────────────────────────────────────────────
+# WRITE TRACKING
+# ─────────────────────────────────────────────────────────
+
+def _history_values(obj, attribute: str) -> Set[Any]:
+    """Current and previous values of an attribute (a moved invoice invalidates both users)."""
+    history = sa.inspect(obj).attrs[attribute].history
+    return {value for value in (*history.unchanged, *history.added, *history.deleted) if value is not None}
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_writes(session: Session, flush_context) -> None:
+    # After the flush new rows have their IDs, while new/dirty/deleted and
+    # attribute history still describe what was just written
+    users: Set[int] = session.info.setdefault(_PENDING_USERS, set())
+    invoices: Set[int] = session.info.setdefault(_PENDING_INVOICES, set())
+
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, WATCHED_ENTITIES):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, Invoice):
+            users.update(_history_values(obj, "user_id") or {ALL_USERS})
+            invoices.add(obj.invoice_id)
+        elif isinstance(obj, (Category, Tag)):
+            # New, still unused names change nothing; renames and deletes affect every user
+            if obj not in session.new:
+                session.info[_PENDING_ALL] = True
+        else:
+            invoices.update(_history_values(obj, "invoice_id"))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state) -> None:
+    """Bulk UPDATE/DELETE/INSERT statements don't say which users they touch: invalidate everyone."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    if orm_execute_state.execution_options.get("expense_cache_neutral"):
+        return
+    mappers = orm_execute_state.all_mappers
+    if any(mapper.class_ in WATCHED_ENTITIES for mapper in mappers):
+        orm_execute_state.session.info[_PENDING_ALL] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_on_commit(session: Session) -> None:
+    # Also fires when a savepoint is released; bump only for the outermost
+    # commit, so the generation row locks are held for the commit itself
+    if session.in_nested_transaction():
+        return
+    # Flush first so the final flush's writes are tracked
+    session.flush()
+    invoices = session.info.pop(_PENDING_INVOICES, set())
+    users = session.info.pop(_PENDING_USERS, set())
+    all_users = session.info.pop(_PENDING_ALL, False)
+    if not (invoices or users or all_users):
+        return
+    if invoices:
+        users |= set(session.connection().execute(
+            sa.select(Invoice.user_id).where(Invoice.invoice_id.in_(invoices)).distinct()
+        ).scalars())
+    bump_generations(session, users, all_users=all_users)
+    session.info[_COMMITTED] = (users, invoices, all_users)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed_writes(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    committed = session.info.pop(_COMMITTED, None)
+    if committed is not None:
+        for callback in _commit_callbacks:
+            callback(*committed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_writes(session: Session, previous_transaction) -> None:
+    # A rolled back savepoint doesn't undo writes flushed outside it; keeping
+    # its own writes pending only costs an extra invalidation
+    if session.in_transaction():
+        return
+    for key in (_PENDING_USERS, _PENDING_INVOICES, _PENDING_ALL, _COMMITTED):
+        session.info.pop(key, None)
@@ -0,0 +1,453 @@
+# features/expenses/cube.py
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from core.config import ANALYTICS_CUBE_MAX_USERS
+from features.expenses.cache import current_generation, on_committed_writes
+from features.expenses.services import UNKNOWN_LABELS, format_group_key, group_url_key, resolve_dimension
+from features.invoices.models import Invoice, InvoiceItem, Category, InvoiceCategory, Tag, InvoiceTag
+
+# ─────────────────────────────────────────────────────────
+# IN-MEMORY ANALYTICS CUBE
+# ─────────────────────────────────────────────────────────
+# A per-user columnar copy of the invoice facts for interactive pivots:
+# dictionary-encoded dimensions (int32 codes) and float64 amounts in NumPy
+# arrays, so a pivot is a few boolean masks and one np.bincount with no
+# database query beyond the generation check.
+#
+# Invoice-level dimensions (merchant, card, month, year) are one code per
+# invoice. Many-to-many dimensions (category, tag, and item_type for invoice
+# totals) are bridge arrays of (invoice position, code) pairs, so an invoice
+# is counted once per group as in /expenses/summary/. Line items keep their
+# own arrays for item-level spend.
+#
+# A cube is built on first use and kept valid with the generation counters
+# of features.expenses.cache: writes committed by this process are patched in
+# by reloading only the touched invoices (their old rows are masked out and
+# new rows appended); any other generation change rebuilds the cube.
+
+INVOICE_DIMENSIONS = ("merchant", "card", "month", "year")
+BRIDGE_DIMENSIONS = ("category", "tag", "item_type")
+MEASURES = ("spend", "item_spend")
+
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Compact once masked-out rows make up this share of the invoices
+COMPACT_RATIO = 0.25
+
+
+class _Dictionary:
+    """Codes for the distinct raw values of one dimension (None included)."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    def code(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        for value in set(values):
+            self.code(value)
+        return np.fromiter(map(self.codes.__getitem__, values), dtype=np.int32, count=len(values))
+
+    def encode_numbers(self, numbers: np.ndarray, value: Callable[[int], Any]) -> np.ndarray:
+        """Codes of integer keys (-1 for missing), converting only the distinct ones with value()."""
+        distinct, inverse = np.unique(numbers, return_inverse=True)
+        lookup = np.array([self.code(value(int(number)) if number >= 0 else None) for number in distinct], dtype=np.int32)
+        return lookup[inverse]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _columns(db: Session, statement, ordered: bool = False) -> List[list]:
+    """Result columns as lists, each aggregated into one array (no per-row Python objects to build).
+
+    With ordered, rows are in the order of the first column.
+    """
+    rows = statement.subquery()
+    order = rows.c[0] if ordered else None
+    arrays = db.execute(sa.select(*[
+        sa.func.array_agg(aggregate_order_by(column, order) if ordered else column) for column in rows.c
+    ])).one()
+    return [array or [] for array in arrays]
+
+
+class ExpenseCube:
+    """Columnar invoice, line item and bridge arrays of one user."""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.generation = -1
+        self.local_bumps = 0  # Generation bumps by commits in this process since the last refresh
+        self.pending: Set[int] = set()  # Invoices those commits touched
+        self.stale = True
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.dictionaries = {dimension: _Dictionary() for dimension in INVOICE_DIMENSIONS + BRIDGE_DIMENSIONS}
+        self.positions: Dict[int, int] = {}  # invoice_id -> row
+        self.invoice_ids = np.empty(0, dtype=np.int64)
+        self.alive = np.empty(0, dtype=bool)
+        self.dates = np.empty(0, dtype=np.int32)  # date.toordinal(), -1 when missing
+        self.totals = np.empty(0, dtype=np.float64)
+        self.invoice_codes = {dimension: np.empty(0, dtype=np.int32) for dimension in INVOICE_DIMENSIONS}
+        self.item_invoices = np.empty(0, dtype=np.int32)
+        self.item_types = np.empty(0, dtype=np.int32)
+        self.item_amounts = np.empty(0, dtype=np.float64)
+        self.bridges = {dimension: (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)) for dimension in BRIDGE_DIMENSIONS}
+
+    # ── Loading ───────────────────────────────────────────
+
+    def _load(self, db: Session, invoice_ids: Optional[Iterable[int]] = None) -> None:
+        """Append the current rows of the user's invoices (all, or just invoice_ids)."""
+        conditions = [Invoice.user_id == self.user_id, Invoice.is_deleted == False]
+        if invoice_ids is not None:
+            conditions.append(Invoice.invoice_id.in_(list(invoice_ids)))
+
+        # Amounts as float8 and dates as day ordinals, so no Decimal/date objects are built per row
+        ids, merchants, cards, ordinals, totals = _columns(db, sa.select(
+            Invoice.invoice_id,
+            sa.func.nullif(Invoice.merchant_name, ""),
+            sa.func.nullif(Invoice.payment_method, ""),
+            sa.func.coalesce(Invoice.purchase_date - sa.literal(date(1, 1, 1)) + 1, -1),
+            sa.cast(sa.func.coalesce(Invoice.grand_total, 0), sa.Float),
+        ).where(*conditions), ordered=True)
+        if not ids:
+            return
+
+        start = len(self.invoice_ids)
+        ids = np.array(ids, dtype=np.int64)
+        self.positions.update(zip(ids.tolist(), range(start, start + len(ids))))
+        dates = np.array(ordinals, dtype=np.int32)
+        days = (dates.astype(np.int64) - UNIX_EPOCH_ORDINAL).astype("datetime64[D]")
+        months = np.where(dates >= 0, days.astype("datetime64[M]").astype(np.int64), -1)
+        years = np.where(dates >= 0, days.astype("datetime64[Y]").astype(np.int64) + 1970, -1)
+
+        self.invoice_ids = np.concatenate([self.invoice_ids, ids])
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        self.dates = np.concatenate([self.dates, dates])
+        self.totals = np.concatenate([self.totals, np.array(totals, dtype=np.float64)])
+        new_codes = {
+            "merchant": self.dictionaries["merchant"].encode(merchants),
+            "card": self.dictionaries["card"].encode(cards),
+            "month": self.dictionaries["month"].encode_numbers(months, lambda month: datetime(1970 + month // 12, month % 12 + 1, 1)),
+            "year": self.dictionaries["year"].encode_numbers(years, int),
+        }
+        for dimension, codes in new_codes.items():
+            self.invoice_codes[dimension] = np.concatenate([self.invoice_codes[dimension], codes])
+
+        # Line items; item_type is also a bridge (distinct types per invoice, as in the summary)
+        item_ids, item_types, amounts = _columns(db, sa.select(
+            InvoiceItem.invoice_id,
+            sa.func.nullif(InvoiceItem.item_type, ""),
+            sa.cast(sa.func.coalesce(InvoiceItem.quantity, 0) * sa.func.coalesce(InvoiceItem.unit_price, 0), sa.Float),
+        ).join(Invoice, Invoice.invoice_id == InvoiceItem.invoice_id).where(*conditions))
+        item_positions = self._positions_of(ids, start, item_ids)
+        type_codes = self.dictionaries["item_type"].encode(item_types)
+        self.item_invoices = np.concatenate([self.item_invoices, item_positions])
+        self.item_types = np.concatenate([self.item_types, type_codes])
+        self.item_amounts = np.concatenate([self.item_amounts, np.array(amounts, dtype=np.float64)])
+        self._append_bridge("item_type", item_positions, type_codes)
+
+        for dimension, model, junction, id_column, name_column in (
+            ("category", Category, InvoiceCategory, "category_id", Category.category_name),
+            ("tag", Tag, InvoiceTag, "tag_id", Tag.tag_name),
+        ):
+            linked_ids, names = _columns(db, sa.select(junction.invoice_id, name_column)
+                .join(model, getattr(model, id_column) == getattr(junction, id_column))
+                .join(Invoice, Invoice.invoice_id == junction.invoice_id)
+                .where(*conditions))
+            self._append_bridge(
+                dimension,
+                self._positions_of(ids, start, linked_ids),
+                self.dictionaries[dimension].encode(names),
+                new_rows=(start, start + len(ids))
+            )
+
+    @staticmethod
+    def _positions_of(ids: np.ndarray, start: int, invoice_ids: Sequence[int]) -> np.ndarray:
+        """Rows of invoice_ids among the just loaded (sorted) ids, which start at row start."""
+        return (start + np.searchsorted(ids, np.array(invoice_ids, dtype=np.int64))).astype(np.int32)
+
+    def _append_bridge(
+        self,
+        dimension: str,
+        positions: np.ndarray,
+        codes: np.ndarray,
+        new_rows: Optional[Tuple[int, int]] = None
+    ) -> None:
+        """Append distinct (position, code) pairs; rows in new_rows without any pair get the None code."""
+        dictionary = self.dictionaries[dimension]
+        if new_rows is not None:
+            linked = np.zeros(new_rows[1] - new_rows[0], dtype=bool)
+            linked[positions - new_rows[0]] = True
+            missing = (new_rows[0] + np.flatnonzero(~linked)).astype(np.int32)
+            positions = np.concatenate([positions, missing])
+            codes = np.concatenate([codes, np.full(len(missing), dictionary.code(None), dtype=np.int32)])
+        # One sort both removes repeats (several items of a type) and orders the pairs by invoice
+        width = max(len(dictionary), 1)
+        pairs = np.unique(positions.astype(np.int64) * width + codes)
+        invoices, existing = self.bridges[dimension]
+        self.bridges[dimension] = (
+            np.concatenate([invoices, (pairs // width).astype(np.int32)]),
+            np.concatenate([existing, (pairs % width).astype(np.int32)]),
+        )
+
+    def rebuild(self, db: Session) -> None:
+        self._reset()
+        self._load(db)
+        self.stale = False
+
+    def patch(self, db: Session, invoice_ids: Set[int]) -> None:
+        """Mask out the touched invoices' rows and append their current state."""
+        for invoice_id in invoice_ids:
+            position = self.positions.pop(invoice_id, None)
+            if position is not None:
+                self.alive[position] = False
+        self._load(db, invoice_ids)
+        if len(self.alive) and np.count_nonzero(~self.alive) > COMPACT_RATIO * len(self.alive):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop masked-out rows and renumber invoice positions."""
+        keep = self.alive
+        new_positions = np.cumsum(keep, dtype=np.int32) - 1
+        self.invoice_ids = self.invoice_ids[keep]
+        self.dates = self.dates[keep]
+        self.totals = self.totals[keep]
+        for dimension in INVOICE_DIMENSIONS:
+            self.invoice_codes[dimension] = self.invoice_codes[dimension][keep]
+        items = keep[self.item_invoices]
+        self.item_invoices = new_positions[self.item_invoices[items]]
+        self.item_types = self.item_types[items]
+        self.item_amounts = self.item_amounts[items]
+        for dimension, (invoices, codes) in self.bridges.items():
+            linked = keep[invoices]
+            self.bridges[dimension] = (new_positions[invoices[linked]], codes[linked])
+        self.alive = np.ones(len(self.invoice_ids), dtype=bool)
+        self.positions = {int(invoice_id): position for position, invoice_id in enumerate(self.invoice_ids)}
+
+    # ── Pivots ────────────────────────────────────────────
+
+    def _codes_for_keys(self, dimension: str, keys: Iterable[str]) -> np.ndarray:
+        """Codes of the raw values whose drill-down key (as in /expenses/summary/) is one of keys."""
+        keys = set(keys)
+        values = self.dictionaries[dimension].values
+        return np.array(
+            [code for code, value in enumerate(values) if group_url_key(dimension, value) in keys],
+            dtype=np.int32
+        )
+
+    def _invoice_mask(self, start: Optional[date], end: Optional[date], filters: Dict[str, List[str]]) -> np.ndarray:
+        mask = self.alive.copy()
+        if start is not None:
+            mask &= self.dates >= start.toordinal()
+        if end is not None:
+            mask &= (self.dates <= end.toordinal()) & (self.dates >= 0)
+        for dimension, keys in filters.items():
+            codes = self._codes_for_keys(dimension, keys)
+            if dimension in INVOICE_DIMENSIONS:
+                mask &= np.isin(self.invoice_codes[dimension], codes)
+            else:
+                invoices, bridge_codes = self.bridges[dimension]
+                matches = np.zeros(len(mask), dtype=bool)
+                matches[invoices[np.isin(bridge_codes, codes)]] = True
+                mask &= matches
+        return mask
+
+    def _facts(self, dimensions: List[str], measure: str, mask: np.ndarray, filters: Dict[str, List[str]]):
+        """(codes per dimension, weights) of the fact rows a pivot aggregates."""
+        bridged = [dimension for dimension in dimensions if dimension in BRIDGE_DIMENSIONS]
+        if measure == "item_spend":
+            if set(bridged) - {"item_type"}:
+                raise ValueError("item_spend can only be pivoted by merchant, card, month, year and item_type")
+            if mask.all() and "item_type" not in filters:
+                invoices, types, weights = self.item_invoices, self.item_types, self.item_amounts
+            else:
+                keep = mask[self.item_invoices]
+                if "item_type" in filters:
+                    keep &= np.isin(self.item_types, self._codes_for_keys("item_type", filters["item_type"]))
+                invoices, types, weights = self.item_invoices[keep], self.item_types[keep], self.item_amounts[keep]
+            own_codes = {"item_type": types}
+        else:
+            if len(bridged) > 1:
+                raise ValueError(f"Only one of {', '.join(BRIDGE_DIMENSIONS)} can be pivoted at a time")
+            if bridged:
+                bridge_invoices, bridge_codes = self.bridges[bridged[0]]
+                keep = mask[bridge_invoices]
+                invoices = bridge_invoices[keep]
+                own_codes = {bridged[0]: bridge_codes[keep]}
+            else:
+                invoices = np.flatnonzero(mask)
+                own_codes = {}
+            weights = self.totals[invoices]
+
+        codes = [
+            own_codes[dimension] if dimension in own_codes else self.invoice_codes[dimension][invoices]
+            for dimension in dimensions
+        ]
+        return codes, weights
+
+    def _labels(self, dimension: str):
+        """Per code, the index of its display name (NULL and "Unknown" share one) and those names' raw values."""
+        values = self.dictionaries[dimension].values
+        names = [format_group_key(dimension, value) for value in values]
+        unique_names = sorted(set(names))
+        index = {name: position for position, name in enumerate(unique_names)}
+        # A representative raw value per name, preferring a real one over NULL for the key
+        representatives: Dict[str, Any] = {}
+        for name, value in zip(names, values):
+            if name not in representatives or representatives[name] is None:
+                representatives[name] = value
+        return (
+            np.array([index[name] for name in names], dtype=np.int64),
+            [(name, representatives[name]) for name in unique_names],
+        )
+
+    def pivot(
+        self,
+        rows: str,
+        columns: Optional[str] = None,
+        measure: str = "spend",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        filters: Optional[Dict[str, List[str]]] = None
+    ) -> Dict[str, Any]:
+        filters = filters or {}
+        dimensions = [rows] + ([columns] if columns else [])
+        mask = self._invoice_mask(start, end, filters)
+        codes, weights = self._facts(dimensions, measure, mask, filters)
+
+        labels = [self._labels(dimension) for dimension in dimensions]
+        sizes = [len(names) for _, names in labels]
+        flat = np.zeros(len(weights), dtype=np.int64)
+        for (name_index, _), dimension_codes, size in zip(labels, codes, sizes):
+            flat = flat * size + name_index[dimension_codes]
+        cells = int(np.prod(sizes))
+        totals = np.bincount(flat, weights=weights, minlength=cells).reshape(sizes)
+        counts = np.bincount(flat, minlength=cells).reshape(sizes)
+        if len(dimensions) == 1:
+            totals, counts = totals[:, None], counts[:, None]
+
+        # Drop empty rows/columns; order by total, or chronologically for months and years
+        axes = []
+        for axis, (dimension, (_, names)) in enumerate(zip(dimensions, labels)):
+            present = np.flatnonzero(counts.sum(axis=1 - axis))
+            if dimension in ("month", "year"):
+                order = sorted(present, key=lambda position: (names[position][1] is None, names[position][1] or 0))
+            else:
+                axis_totals = totals.sum(axis=1 - axis)
+                order = sorted(present, key=lambda position: -axis_totals[position])
+            axes.append(np.array(order, dtype=np.int64))
+        row_order = axes[0]
+        column_order = axes[1] if columns else np.zeros(1, dtype=np.int64)
+        totals = totals[np.ix_(row_order, column_order)]
+        counts = counts[np.ix_(row_order, column_order)]
+
+        def keys(dimension: str, names, order) -> List[Dict[str, str]]:
+            return [{"name": names[position][0], "key": group_url_key(dimension, names[position][1])} for position in order]
+
+        return {
+            "measure": measure,
+            "rows": {"dimension": rows, "keys": keys(rows, labels[0][1], row_order)},
+            "columns": {"dimension": columns, "keys": keys(columns, labels[1][1], column_order)} if columns else None,
+            "totals": np.round(totals, 2).tolist(),
+            "counts": counts.tolist(),
+        }
+
+
+# ─────────────────────────────────────────────────────────
+# CUBE REGISTRY
+# ─────────────────────────────────────────────────────────
+
+_cubes: "OrderedDict[int, ExpenseCube]" = OrderedDict()
+_cubes_lock = threading.Lock()
+
+
+def _record_local_writes(user_ids: Set[int], invoice_ids: Set[int], all_users: bool) -> None:
+    with _cubes_lock:
+        cubes = list(_cubes.values())
+    for cube in cubes:
+        if not (all_users or cube.user_id in user_ids):
+            continue
+        with cube.lock:
+            cube.local_bumps += 1
+            if all_users:
+                # Renamed or deleted categories/tags: codes are no longer valid
+                cube.stale = True
+            else:
+                cube.pending |= invoice_ids
+
+
+on_committed_writes(_record_local_writes)
+
+
+def get_cube(db: Session, user_id: int) -> ExpenseCube:
+    """The user's cube, built or brought up to date with the committed data."""
+    with _cubes_lock:
+        cube = _cubes.get(user_id)
+        if cube is None:
+            cube = _cubes[user_id] = ExpenseCube(user_id)
+        _cubes.move_to_end(user_id)
+        while len(_cubes) > ANALYTICS_CUBE_MAX_USERS:
+            _cubes.popitem(last=False)
+
+    with cube.lock:
+        generation = current_generation(db, user_id)
+        if cube.stale or generation != cube.generation + cube.local_bumps:
+            # First use, or another worker wrote: start over
+            cube.rebuild(db)
+        elif cube.pending:
+            cube.patch(db, cube.pending)
+        cube.generation = generation
+        cube.local_bumps = 0
+        cube.pending = set()
+    return cube
+
+
+def parse_pivot_filters(values: Iterable[str]) -> Dict[str, List[str]]:
+    """Parse "dimension:key" filters (keys as in /expenses/summary/) into {dimension: [keys]}."""
+    filters: Dict[str, List[str]] = {}
+    for value in values:
+        dimension, separator, key = value.partition(":")
+        if not separator:
+            raise ValueError(f"Filters look like merchant:Amazon, not '{value}'")
+        filters.setdefault(resolve_dimension(dimension), []).append(key or UNKNOWN_LABELS[resolve_dimension(dimension)])
+    return filters
+
+
+def pivot_expenses(
+    db: Session,
+    user_id: int,
+    rows: str,
+    columns: Optional[str] = None,
+    measure: str = "spend",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    filters: Optional[Dict[str, List[str]]] = None
+) -> Dict[str, Any]:
+    """Pivot a user's spend by one or two dimensions from the in-memory cube."""
+    if measure not in MEASURES:
+        raise ValueError(f"Unknown measure '{measure}'; expected one of {', '.join(MEASURES)}")
+    rows = resolve_dimension(rows)
+    columns = resolve_dimension(columns) if columns else None
+    if rows == columns:
+        raise ValueError("rows and columns must be different dimensions")
+
+    cube = get_cube(db, user_id)
+    with cube.lock:
+        return cube.pivot(rows, columns, measure, start, end, filters)
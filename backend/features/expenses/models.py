@@ -0,0 +1,74 @@
+# features/expenses/models.py
+import sqlalchemy as sa
+from core.database import Base
+
+
+class MonthlySpendMixin:
+    """Invoice count and grand-total sum per user, month and one dimension value.
+
+    Maintained incrementally by features.expenses.rollups. Missing dimension
+    values are stored as "" (primary key columns cannot be NULL) and invoices
+    without a purchase date are not rolled up.
+    """
+    user_id = sa.Column(sa.Integer, nullable=False)
+    month = sa.Column(sa.Date, nullable=False)  # First day of the month
+    invoice_count = sa.Column(sa.Integer, nullable=False, default=0)
+    total = sa.Column(sa.Numeric(14, 2), nullable=False, default=0)
+
+
+class MonthlyCategorySpend(Base, MonthlySpendMixin):
+    __tablename__ = "monthly_category_spend"
+
+    category = sa.Column(sa.String(100), nullable=False)
+
+    __table_args__ = (sa.PrimaryKeyConstraint("user_id", "month", "category"),)
+
+
+class MonthlyMerchantSpend(Base, MonthlySpendMixin):
+    __tablename__ = "monthly_merchant_spend"
+
+    merchant = sa.Column(sa.String(255), nullable=False)
+
+    __table_args__ = (sa.PrimaryKeyConstraint("user_id", "month", "merchant"),)
+
+
+class MonthlyPaymentMethodSpend(Base, MonthlySpendMixin):
+    __tablename__ = "monthly_payment_method_spend"
+
+    payment_method = sa.Column(sa.String(50), nullable=False)
+
+    __table_args__ = (sa.PrimaryKeyConstraint("user_id", "month", "payment_method"),)
+
+
+class MonthlyItemTypeSpend(Base, MonthlySpendMixin):
+    """Invoices counted once per distinct item type among their items."""
+    __tablename__ = "monthly_item_type_spend"
+
+    item_type = sa.Column(sa.String(100), nullable=False)
+
+    __table_args__ = (sa.PrimaryKeyConstraint("user_id", "month", "item_type"),)
+
+
+class UserDataGeneration(Base):
+    """Counter bumped in the same transaction as every write to a user's invoices, items, categories or tags.
+
+    Results not filtered by user are cached under user_id 0, whose
+    generation is the sum over all rows, so any bump invalidates them. Cached
+    results are valid only while their stored generation equals the current
+    one (see features.expenses.cache).
+    """
+    __tablename__ = "user_data_generations"
+
+    user_id = sa.Column(sa.Integer, primary_key=True)
+    generation = sa.Column(sa.BigInteger, nullable=False, default=0)
+
+
+class ExpenseResultCache(Base):
+    """Serialized expense result for one user and parameter set, tagged with the generation it was computed at."""
+    __tablename__ = "expense_result_cache"
+
+    user_id = sa.Column(sa.Integer, primary_key=True)  # 0 for results across all users
+    cache_key = sa.Column(sa.String(255), primary_key=True)
+    generation = sa.Column(sa.BigInteger, nullable=False)
+    payload = sa.Column(sa.LargeBinary, nullable=False)  # JSON body, served as-is on a hit
+    created_at = sa.Column(sa.DateTime, nullable=False, server_default=sa.func.now())
@@ -0,0 +1,152 @@
+# features/expenses/rollups.py
+from typing import Any, Dict, Iterable, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from features.expenses.models import (
+    MonthlyCategorySpend, MonthlyMerchantSpend, MonthlyPaymentMethodSpend, MonthlyItemTypeSpend
+)
+from features.invoices.models import Invoice, InvoiceItem, Category, InvoiceCategory
+
+# ─────────────────────────────────────────────────────────
+# MONTHLY SPEND ROLLUPS
+# ─────────────────────────────────────────────────────────
+# Writers call remove_from_rollups() before changing invoices and
+# add_to_rollups() after, with the affected invoice IDs. Each call recomputes
+# those invoices' contributions from the database and upserts them with the
+# given sign, so any combination of field, item and category changes keeps
+# the rollups exact without per-field bookkeeping.
+
+# Rollup model and its dimension column, by dimension name
+ROLLUP_MODELS = {
+    "category": (MonthlyCategorySpend, MonthlyCategorySpend.category),
+    "merchant": (MonthlyMerchantSpend, MonthlyMerchantSpend.merchant),
+    "payment_method": (MonthlyPaymentMethodSpend, MonthlyPaymentMethodSpend.payment_method),
+    "item_type": (MonthlyItemTypeSpend, MonthlyItemTypeSpend.item_type),
+}
+
+
+def _contributions(dimension: str, conditions: List, sign: int = 1):
+    """(user_id, month, key, invoice_count, total) of the invoices matching conditions."""
+    month = sa.cast(sa.func.date_trunc("month", Invoice.purchase_date), sa.Date)
+    amount = sa.func.coalesce(Invoice.grand_total, 0)
+
+    if dimension == "category":
+        key = sa.func.coalesce(Category.category_name, "")
+        source = (
+            sa.select(Invoice.user_id, month.label("month"), key.label("key"), amount.label("amount"))
+            .outerjoin(InvoiceCategory, InvoiceCategory.invoice_id == Invoice.invoice_id)
+            .outerjoin(Category, Category.category_id == InvoiceCategory.category_id)
+        )
+    elif dimension == "item_type":
+        key = sa.func.coalesce(InvoiceItem.item_type, "")
+        source = (
+            sa.select(Invoice.invoice_id, Invoice.user_id, month.label("month"), key.label("key"), amount.label("amount"))
+            .join(InvoiceItem, InvoiceItem.invoice_id == Invoice.invoice_id)
+            .distinct()
+        )
+    else:
+        column = Invoice.merchant_name if dimension == "merchant" else Invoice.payment_method
+        source = sa.select(Invoice.user_id, month.label("month"), sa.func.coalesce(column, "").label("key"), amount.label("amount"))
+
+    rows = source.where(
+        Invoice.is_deleted == False,
+        Invoice.user_id.isnot(None),
+        Invoice.purchase_date.isnot(None),
+        *conditions
+    ).subquery()
+
+    return (
+        sa.select(
+            rows.c.user_id,
+            rows.c.month,
+            rows.c.key,
+            (sa.func.count() * sign).label("invoice_count"),
+            (sa.func.sum(rows.c.amount) * sign).label("total"),
+        )
+        .group_by(rows.c.user_id, rows.c.month, rows.c.key)
+    )
+
+
+def _apply(db: Session, conditions: List, sign: int) -> None:
+    for dimension, (model, key_column) in ROLLUP_MODELS.items():
+        statement = pg_insert(model).from_select(
+            ["user_id", "month", key_column.key, "invoice_count", "total"],
+            _contributions(dimension, conditions, sign)
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[model.user_id, model.month, key_column],
+            set_={
+                "invoice_count": model.invoice_count + statement.excluded.invoice_count,
+                "total": model.total + statement.excluded.total,
+            }
+        )
+        if sign > 0:
+            db.execute(statement)
+            continue
+
+        # Drop the rows this decrement emptied, looked up by primary key
+        emptied = [
+            (row.user_id, row.month, row.key)
+            for row in db.execute(statement.returning(
+                model.user_id, model.month, key_column.label("key"), model.invoice_count
+            ))
+            if row.invoice_count <= 0
+        ]
+        if emptied:
+            db.query(model).filter(
+                sa.tuple_(model.user_id, model.month, key_column).in_(emptied),
+                model.invoice_count <= 0
+            ).delete(synchronize_session=False)
+
+
+def add_to_rollups(db: Session, invoice_ids: Iterable[int]) -> None:
+    """Add the current state of these invoices to the rollups (after creating or changing them)."""
+    invoice_ids = list(invoice_ids)
+    if invoice_ids:
+        db.flush()
+        _apply(db, [Invoice.invoice_id.in_(invoice_ids)], 1)
+
+
+def remove_from_rollups(db: Session, invoice_ids: Iterable[int]) -> None:
+    """Subtract the current state of these invoices from the rollups (before changing or deleting them)."""
+    invoice_ids = list(invoice_ids)
+    if invoice_ids:
+        db.flush()
+        _apply(db, [Invoice.invoice_id.in_(invoice_ids)], -1)
+
+
+def rebuild_rollups(db: Session, user_id: Optional[int] = None) -> None:
+    """Recompute the rollups from scratch (backfill, or repair after out-of-band writes)."""
+    for model, _ in ROLLUP_MODELS.values():
+        query = db.query(model)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        query.delete(synchronize_session=False)
+    _apply(db, [Invoice.user_id == user_id] if user_id is not None else [], 1)
+
+
+def get_monthly_spend(
+    db: Session,
+    dimension: str,
+    user_id: int,
+    start_month: Optional[Any] = None,
+    end_month: Optional[Any] = None
+) -> List[Dict[str, Any]]:
+    """Rollup rows for a user between two months (inclusive), oldest first."""
+    if dimension not in ROLLUP_MODELS:
+        raise ValueError(f"Unknown dimension '{dimension}'; expected one of {', '.join(ROLLUP_MODELS)}")
+    model, key_column = ROLLUP_MODELS[dimension]
+
+    query = db.query(model.month, key_column, model.invoice_count, model.total).filter(model.user_id == user_id)
+    if start_month is not None:
+        query = query.filter(model.month >= start_month)
+    if end_month is not None:
+        query = query.filter(model.month <= end_month)
+
+    return [
+        {"month": month.strftime("%Y-%m"), "key": key, "count": count, "total": float(total)}
+        for month, key, count, total in query.order_by(model.month, model.total.desc())
+    ]
@@ -1,14 +1,24 @@
 # features/expenses/router.py
-from typing import List, Optional
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
+from datetime import date, datetime
+from typing import List, Optional, Union
+from dateutil.relativedelta import relativedelta
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
 from sqlalchemy.orm import Session
-import json
 
 from core.database import get_db
-from features.invoices.models import Invoice, InvoiceItem, ExpenseCategory, InvoiceExpenseCategory, Category, InvoiceCategory
-from features.expenses.schemas import ExpenseSummary, ExpenseResponse, ExpenseGroupResponse
+from core.serialization import FastJSONResponse, etag_json_response
+from features.invoices.models import ExpenseCategory
+from features.expenses.schemas import (
+    ExpenseGroupResponse, ExpenseGroupSummary, ExpenseGroupItemsPage, ExpenseBreakdownNode, MonthlySpendRow,
+    TimeSeriesResponse, PivotResponse, CacheStatsResponse
+)
+from features.expenses.cache import cached_json, cache_key, cache_entry_count, stats as cache_stats
+from features.expenses.cube import parse_pivot_filters, pivot_expenses
+from features.expenses.rollups import get_monthly_spend
+from features.expenses.services import (
+    date_filter_today, expense_filter_conditions, parse_dimensions, get_expense_breakdown,
+    get_expense_groups, get_expense_group_totals, get_expense_group_items, get_expense_timeseries
+)
 
 router = APIRouter(
     prefix="/expenses",
@@ -30,318 +40,192 @@ async def get_expense_categories(db: Session = Depends(get_db), user_id: Optiona
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/summary/", response_model=List[ExpenseGroupResponse])
+@router.get("/summary/", response_model=List[Union[ExpenseGroupResponse, ExpenseGroupSummary]])
 async def get_expense_summary(
     db: Session = Depends(get_db), 
     user_id: Optional[int] = None,
     category: Optional[str] = None,
     date_filter: Optional[str] = None,
-    view_by: Optional[str] = "category"
+    view_by: Optional[str] = "category",
+    summary_only: bool = False
 ):
-    """Get expense summary data, grouped by the specified view_by parameter."""
+    """Get expense summary data, grouped by the specified view_by parameter.
+    
+    Group counts and totals are aggregated in SQL; invoices and products are
+    read as plain rows rather than ORM objects, and results are cached until
+    the user's next invoice, item, category or tag write. With ``summary_only`` only
+    name, key, count and total are returned per group; fetch a group's
+    invoices page by page from /expenses/groups/{view_by}/{key}/items.
+    """
     try:
-        # Base query
-        query = db.query(Invoice).filter(Invoice.is_deleted == False)
-        
-        # Apply filters
-        if user_id:
-            query = query.filter(Invoice.user_id == user_id)
-            
-        # Updated category filtering to check regular Categories
-        if category and category != "All":
-            # Try to find the category in either Category or ExpenseCategory
-            query = query.join(InvoiceCategory).join(Category)
-            query = query.filter(Category.category_name == category)
-            
-        if date_filter and date_filter != "all":
-            # Handle date filtering logic here
-            now = datetime.utcnow()
-            months_to_subtract = {
-                "3months": 3,
-                "6months": 6,
-                "1year": 12
-            }.get(date_filter, 0)
-            
-            if months_to_subtract > 0:
-                cutoff_date = now - timedelta(days=30 * months_to_subtract)
-                query = query.filter(Invoice.purchase_date >= cutoff_date)
-        
-        # Get all matching invoices
-        invoices = query.all()
-        
-        # Process and group the data based on view_by parameter
-        grouped_data = []
-        
-        if view_by == "category":
-            # Group by category
-            categories = {}
-            for invoice in invoices:
-                if invoice.categories:
-                    for category_obj in invoice.categories:
-                        # Convert Category object to string
-                        category = category_obj.category_name if hasattr(category_obj, 'category_name') else str(category_obj)
-                        
-                        if category not in categories:
-                            categories[category] = {
-                                "name": category,
-                                "count": 0,
-                                "total": 0,
-                                "items": []
-                            }
-                        categories[category]["count"] += 1
-                        categories[category]["total"] += float(invoice.grand_total or 0)
-                        
-                        # Add invoice data to items
-                        item_data = {
-                            "id": invoice.invoice_id,
-                            "store": invoice.merchant_name or "",
-                            "orderNumber": invoice.order_number or f"Order # {invoice.invoice_id}",
-                            "date": invoice.purchase_date.strftime("%B %d, %Y") if invoice.purchase_date else "",
-                            "category": category,  # Use string value
-                            "creditCard": invoice.payment_method or "",
-                            "total": float(invoice.grand_total or 0),
-                            "products": []
-                        }
-                        
-                        # Add product data
-                        for item in invoice.items:
-                            item_data["products"].append({
-                                "name": item.product_name,
-                                "price": float(item.unit_price) if item.unit_price else 0,
-                                "quantity": item.quantity if item.quantity else 0
-                            })
-                            
-                        categories[category]["items"].append(item_data)
-                else:
-                    # Handle uncategorized invoices
-                    category = "Uncategorized"
-                    if category not in categories:
-                        categories[category] = {
-                            "name": category,
-                            "count": 0,
-                            "total": 0,
-                            "items": []
-                        }
-                    categories[category]["count"] += 1
-                    categories[category]["total"] += float(invoice.grand_total or 0)
-                    
-                    # Add invoice data to items (same as above)
-                    item_data = {
-                        "id": invoice.invoice_id,
-                        "store": invoice.merchant_name or "",
-                        "orderNumber": invoice.order_number or f"Order # {invoice.invoice_id}",
-                        "date": invoice.purchase_date.strftime("%B %d, %Y") if invoice.purchase_date else "",
-                        "category": category,
-                        "creditCard": invoice.payment_method or "",
-                        "total": float(invoice.grand_total or 0),
-                        "products": []
-                    }
-                    
-                    for item in invoice.items:
-                        item_data["products"].append({
-                            "name": item.product_name,
-                            "price": float(item.unit_price) if item.unit_price else 0,
-                            "quantity": item.quantity if item.quantity else 0
-                        })
-                        
-                    categories[category]["items"].append(item_data)
-            
-            # Convert dictionary to list
-            grouped_data = list(categories.values())
-            
-        elif view_by == "store":
-            # Group by store/merchant
-            stores = {}
-            for invoice in invoices:
-                store = invoice.merchant_name or "Unknown"
-                if store not in stores:
-                    stores[store] = {
-                        "name": store,
-                        "count": 0,
-                        "total": 0,
-                        "items": []
-                    }
-                stores[store]["count"] += 1
-                stores[store]["total"] += float(invoice.grand_total or 0)
-                
-                # Get category as string
-                category = "Uncategorized"
-                if invoice.categories and len(invoice.categories) > 0:
-                    category_obj = invoice.categories[0]
-                    category = category_obj.category_name if hasattr(category_obj, 'category_name') else str(category_obj)
-                
-                # Add invoice data (similar to above)
-                item_data = {
-                    "id": invoice.invoice_id,
-                    "store": store,
-                    "orderNumber": invoice.order_number or f"Order # {invoice.invoice_id}",
-                    "date": invoice.purchase_date.strftime("%B %d, %Y") if invoice.purchase_date else "",
-                    "category": category,
-                    "creditCard": invoice.payment_method or "",
-                    "total": float(invoice.grand_total or 0),
-                    "products": []
-                }
-                
-                for item in invoice.items:
-                    item_data["products"].append({
-                        "name": item.product_name,
-                        "price": float(item.unit_price) if item.unit_price else 0,
-                        "quantity": item.quantity if item.quantity else 0
-                    })
-                    
-                stores[store]["items"].append(item_data)
-            
-            # Convert dictionary to list
-            grouped_data = list(stores.values())
-            
-        elif view_by == "date":
-            # Group by month
-            months = {}
-            for invoice in invoices:
-                if invoice.purchase_date:
-                    month_year = invoice.purchase_date.strftime("%B %Y")
-                else:
-                    month_year = "Unknown Date"
-                    
-                if month_year not in months:
-                    months[month_year] = {
-                        "name": month_year,
-                        "count": 0,
-                        "total": 0,
-                        "items": []
-                    }
-                months[month_year]["count"] += 1
-                months[month_year]["total"] += float(invoice.grand_total or 0)
-                
-                # Get category as string
-                category = "Uncategorized"
-                if invoice.categories and len(invoice.categories) > 0:
-                    category_obj = invoice.categories[0]
-                    category = category_obj.category_name if hasattr(category_obj, 'category_name') else str(category_obj)
-                
-                # Add invoice data (similar to above)
-                item_data = {
-                    "id": invoice.invoice_id,
-                    "store": invoice.merchant_name or "",
-                    "orderNumber": invoice.order_number or f"Order # {invoice.invoice_id}",
-                    "date": invoice.purchase_date.strftime("%B %d, %Y") if invoice.purchase_date else "",
-                    "category": category,
-                    "creditCard": invoice.payment_method or "",
-                    "total": float(invoice.grand_total or 0),
-                    "products": []
-                }
-                
-                for item in invoice.items:
-                    item_data["products"].append({
-                        "name": item.product_name,
-                        "price": float(item.unit_price) if item.unit_price else 0,
-                        "quantity": item.quantity if item.quantity else 0
-                    })
-                    
-                months[month_year]["items"].append(item_data)
-            
-            # Convert dictionary to list
-            grouped_data = list(months.values())
-            
-        elif view_by == "card":
-            # Group by credit card
-            cards = {}
-            for invoice in invoices:
-                card = invoice.payment_method or "Unknown"
-                if card not in cards:
-                    cards[card] = {
-                        "name": card,
-                        "count": 0,
-                        "total": 0,
-                        "items": []
-                    }
-                cards[card]["count"] += 1
-                cards[card]["total"] += float(invoice.grand_total or 0)
-                
-                # Get category as string
-                category = "Uncategorized"
-                if invoice.categories and len(invoice.categories) > 0:
-                    category_obj = invoice.categories[0]
-                    category = category_obj.category_name if hasattr(category_obj, 'category_name') else str(category_obj)
-                
-                # Add invoice data (similar to above)
-                item_data = {
-                    "id": invoice.invoice_id,
-                    "store": invoice.merchant_name or "",
-                    "orderNumber": invoice.order_number or f"Order # {invoice.invoice_id}",
-                    "date": invoice.purchase_date.strftime("%B %d, %Y") if invoice.purchase_date else "",
-                    "category": category,
-                    "creditCard": card,
-                    "total": float(invoice.grand_total or 0),
-                    "products": []
-                }
-                
-                for item in invoice.items:
-                    item_data["products"].append({
-                        "name": item.product_name,
-                        "price": float(item.unit_price) if item.unit_price else 0,
-                        "quantity": item.quantity if item.quantity else 0
-                    })
-                    
-                cards[card]["items"].append(item_data)
-            
-            # Convert dictionary to list
-            grouped_data = list(cards.values())
-            
-        elif view_by == "itemType":
-            # Group by item type
-            item_types = {}
-            for invoice in invoices:
-                for item in invoice.items:
-                    item_type = item.item_type or "Other"
-                    if item_type not in item_types:
-                        item_types[item_type] = {
-                            "name": item_type,
-                            "count": 0,
-                            "total": 0,
-                            "items": []
-                        }
-                    
-                    # Only count the invoice once per item type
-                    if not any(i["id"] == invoice.invoice_id for i in item_types[item_type]["items"]):
-                        item_types[item_type]["count"] += 1
-                        item_types[item_type]["total"] += float(invoice.grand_total or 0)
-                        
-                        # Get category as string
-                        category = "Uncategorized"
-                        if invoice.categories and len(invoice.categories) > 0:
-                            category_obj = invoice.categories[0]
-                            category = category_obj.category_name if hasattr(category_obj, 'category_name') else str(category_obj)
-                        
-                        # Add invoice data (similar to above)
-                        item_data = {
-                            "id": invoice.invoice_id,
-                            "store": invoice.merchant_name or "",
-                            "orderNumber": invoice.order_number or f"Order # {invoice.invoice_id}",
-                            "date": invoice.purchase_date.strftime("%B %d, %Y") if invoice.purchase_date else "",
-                            "category": category,
-                            "creditCard": invoice.payment_method or "",
-                            "total": float(invoice.grand_total or 0),
-                            "products": []
-                        }
-                        
-                        # Add relevant products (of this item type)
-                        for inv_item in invoice.items:
-                            if inv_item.item_type == item_type:
-                                item_data["products"].append({
-                                    "name": inv_item.product_name,
-                                    "price": float(inv_item.unit_price) if inv_item.unit_price else 0,
-                                    "quantity": inv_item.quantity if inv_item.quantity else 0
-                                })
-                                
-                        item_types[item_type]["items"].append(item_data)
-            
-            # Convert dictionary to list
-            grouped_data = list(item_types.values())
-        
-        # Sort grouped data by total (descending)
-        grouped_data.sort(key=lambda x: x["total"], reverse=True)
-            
-        return grouped_data
+        view_by = view_by or "category"
+        conditions = expense_filter_conditions(user_id, category, date_filter)
+        compute = get_expense_group_totals if summary_only else get_expense_groups
+        key = cache_key(
+            "summary", view_by=view_by, category=category, date_filter=date_filter,
+            # Relative date filters move with the calendar
+            today=date_filter_today() if date_filter else None, summary_only=summary_only
+        )
+        payload = cached_json(db, user_id, key, lambda: compute(db, view_by, conditions))
+        return Response(content=payload, media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/groups/{view_by}/{key:path}/items", response_model=ExpenseGroupItemsPage)
+async def get_expense_group_items_page(
+    view_by: str,
+    key: str,
+    db: Session = Depends(get_db),
+    user_id: Optional[int] = None,
+    category: Optional[str] = None,
+    date_filter: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Page through the invoices of one summary group (key as returned by /expenses/summary/)."""
+    try:
+        conditions = expense_filter_conditions(user_id, category, date_filter)
+        return FastJSONResponse(get_expense_group_items(db, view_by, key, conditions, skip=skip, limit=limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/breakdown", response_model=List[ExpenseBreakdownNode])
+async def get_expense_breakdown_tree(
+    dimensions: str = "category",
+    db: Session = Depends(get_db),
+    user_id: Optional[int] = None,
+    category: Optional[str] = None,
+    date_filter: Optional[str] = None
+):
+    """Nested expense totals over several dimensions, e.g. ``dimensions=year,category``.
+    
+    Dimensions: category, merchant, month, year, card, item_type, tag (the
+    summary's view_by names are accepted too). Every level is aggregated in a
+    single query; each node has name, key, count, total and, except at the
+    last level, its children.
+    """
+    try:
+        dimension_list = parse_dimensions(dimensions)
+        conditions = expense_filter_conditions(user_id, category, date_filter)
+        key = cache_key(
+            "breakdown", dimensions=",".join(dimension_list), category=category, date_filter=date_filter,
+            today=date_filter_today() if date_filter else None
+        )
+        payload = cached_json(db, user_id, key, lambda: get_expense_breakdown(db, dimension_list, conditions))
+        return Response(content=payload, media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/timeseries", response_model=TimeSeriesResponse)
+async def get_expense_timeseries_endpoint(
+    db: Session = Depends(get_db),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bucket: str = "month",
+    split_by: Optional[str] = None,
+    user_id: Optional[int] = None,
+    category: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Spend per day, week, month, quarter or year between start and end (inclusive, YYYY-MM-DD).
+    
+    Defaults to the last twelve calendar months. Buckets without purchases
+    are zero-filled. ``split_by`` (category, merchant, card, item_type, tag,
+    ...) returns one series per group instead of a single "All" series. The
+    response carries an ETag, so clients can revalidate with If-None-Match.
+    """
+    try:
+        end = end or date.today()
+        start = start or end.replace(day=1) - relativedelta(months=11)
+        conditions = expense_filter_conditions(user_id, category)
+        key = cache_key("timeseries", start=start, end=end, bucket=bucket, split_by=split_by, category=category)
+        payload = cached_json(
+            db, user_id, key, lambda: get_expense_timeseries(db, start, end, bucket, conditions, split_by=split_by)
+        )
+        return etag_json_response(payload, if_none_match)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def parse_month(value: Optional[str]) -> Optional[date]:
+    """Parse a YYYY-MM query parameter into the first day of that month."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise ValueError(f"Months look like 2024-03, not '{value}'")
+
+
+@router.get("/monthly/{dimension}", response_model=List[MonthlySpendRow])
+async def get_monthly_spend_rollup(
+    dimension: str,
+    db: Session = Depends(get_db),
+    user_id: int = 1,
+    year: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
+    """Monthly invoice count and spend per category, merchant, payment_method or item_type.
+    
+    Read from the incrementally maintained rollup tables, so the cost depends
+    on the number of months and keys rather than on the number of invoices.
+    ``year`` or ``start``/``end`` (YYYY-MM, inclusive) restrict the range.
+    """
+    try:
+        start_month, end_month = parse_month(start), parse_month(end)
+        if year is not None:
+            start_month, end_month = date(year, 1, 1), date(year, 12, 1)
+        return FastJSONResponse(get_monthly_spend(db, dimension, user_id, start_month, end_month))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/pivot", response_model=PivotResponse)
+async def get_expense_pivot(
+    rows: str,
+    columns: Optional[str] = None,
+    measure: str = "spend",
+    user_id: int = 1,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    filter: List[str] = Query([]),
+    db: Session = Depends(get_db)
+):
+    """Spend of one user pivoted by one or two dimensions, served from an in-memory cube.
+
+    ``measure`` is "spend" (invoice totals, each invoice counted once per
+    group as in the summary) or "item_spend" (quantity x unit price of the
+    line items). Repeatable ``filter`` parameters such as merchant:Amazon or
+    month:2024-03 restrict the invoices; filters on the same dimension are ORed.
+    """
+    try:
+        return FastJSONResponse(pivot_expenses(
+            db, user_id, rows, columns, measure, start, end, parse_pivot_filters(filter)
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def get_expense_cache_stats(db: Session = Depends(get_db)):
+    """Hit rate of the expense result cache in this worker process, and the number of stored results."""
+    try:
+        return dict(cache_stats.snapshot(), entries=cache_entry_count(db))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
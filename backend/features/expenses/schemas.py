@@ -20,14 +20,28 @@ class ExpenseItem(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
-class ExpenseGroupResponse(BaseModel):
+class ExpenseGroupSummary(BaseModel):
     name: str
+    key: str  # Identifies the group in /expenses/groups/{view_by}/{key}/items
     count: int
     total: float
-    items: List[ExpenseItem]
     
     model_config = ConfigDict(from_attributes=True)
 
+class ExpenseGroupResponse(ExpenseGroupSummary):
+    items: List[ExpenseItem]
+
+class ExpenseGroupItemsPage(ExpenseGroupSummary):
+    skip: int
+    limit: int
+    items: List[ExpenseItem]
+
+class MonthlySpendRow(BaseModel):
+    month: str  # YYYY-MM
+    key: str  # Category, merchant, payment method or item type ("" when missing)
+    count: int
+    total: float
+
 class ExpenseSummary(BaseModel):
     total_spending: float
     purchase_count: int
@@ -40,4 +54,43 @@ class ExpenseResponse(BaseModel):
     summary: ExpenseSummary
     data: List[ExpenseGroupResponse]
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+class ExpenseBreakdownNode(ExpenseGroupSummary):
+    children: Optional[List["ExpenseBreakdownNode"]] = None  # Groups of the next dimension; absent at the last level
+
+class TimeSeriesPoint(BaseModel):
+    period: str  # First day of the bucket (YYYY-MM-DD)
+    count: int
+    total: float
+
+class TimeSeries(ExpenseGroupSummary):
+    points: List[TimeSeriesPoint]
+
+class TimeSeriesResponse(BaseModel):
+    start: str
+    end: str
+    bucket: str
+    split_by: Optional[str] = None
+    series: List[TimeSeries]
+
+class PivotKey(BaseModel):
+    name: str
+    key: str  # As in /expenses/summary/, usable in pivot filters
+
+class PivotAxis(BaseModel):
+    dimension: str
+    keys: List[PivotKey]
+
+class PivotResponse(BaseModel):
+    measure: str
+    rows: PivotAxis
+    columns: Optional[PivotAxis] = None
+    totals: List[List[float]]  # [row][column]; a single column without columns
+    counts: List[List[int]]
+
+class CacheStatsResponse(BaseModel):
+    process_id: int  # Counters are per worker process
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int  # Results stored in the shared cache table
@@ -0,0 +1,464 @@
+# features/expenses/services.py
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlalchemy as sa
+from dateutil.relativedelta import relativedelta
+from sqlalchemy.dialects.postgresql import INTERVAL
+from sqlalchemy.orm import Session
+
+from features.invoices.models import Invoice, InvoiceItem, Category, InvoiceCategory, Tag, InvoiceTag
+
+# Dimensions expenses can be grouped by, with the label for invoices missing a value
+UNKNOWN_LABELS = {
+    "category": "Uncategorized",
+    "merchant": "Unknown",
+    "month": "Unknown Date",
+    "year": "Unknown Date",
+    "card": "Unknown",
+    "item_type": "Other",
+    "tag": "Untagged",
+}
+DIMENSIONS = tuple(UNKNOWN_LABELS)
+
+# view_by modes of the expense summary and the dimension each groups by
+VIEW_BY_DIMENSIONS = {
+    "category": "category",
+    "store": "merchant",
+    "date": "month",
+    "card": "card",
+    "itemType": "item_type",
+}
+VIEW_BY_OPTIONS = tuple(VIEW_BY_DIMENSIONS)
+
+# Time series bucket sizes: date_trunc field and the step between buckets
+TIMESERIES_BUCKETS = {
+    "day": "1 day",
+    "week": "1 week",
+    "month": "1 month",
+    "quarter": "3 months",
+    "year": "1 year",
+}
+MAX_TIMESERIES_BUCKETS = 5000
+
+DATE_FILTER_MONTHS = {
+    "3months": 3,
+    "6months": 6,
+    "1year": 12,
+}
+
+
+def date_filter_today() -> date:
+    """The day relative date filters count back from; also part of their cache keys."""
+    return datetime.utcnow().date()
+
+
+def expense_filter_conditions(
+    user_id: Optional[int] = None,
+    category: Optional[str] = None,
+    date_filter: Optional[str] = None
+) -> List:
+    """WHERE conditions on Invoice for the summary filters."""
+    conditions = [Invoice.is_deleted == False]
+
+    if user_id:
+        conditions.append(Invoice.user_id == user_id)
+
+    if category and category != "All":
+        # EXISTS rather than a join, so invoices are not repeated per category
+        conditions.append(Invoice.categories.any(Category.category_name == category))
+
+    months = DATE_FILTER_MONTHS.get(date_filter or "", 0)
+    if months > 0:
+        # Calendar months: "3months" on 31 May starts on 28 Feb, not 30 * 3 days back
+        conditions.append(Invoice.purchase_date >= date_filter_today() - relativedelta(months=months))
+
+    return conditions
+
+
+def _label(value: Optional[str], unknown: str) -> str:
+    return value if value else unknown
+
+
+def resolve_dimension(name: str) -> str:
+    """Dimension for a dimension name or a summary view_by mode."""
+    dimension = VIEW_BY_DIMENSIONS.get(name, name)
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown grouping '{name}'; expected one of {', '.join(DIMENSIONS + VIEW_BY_OPTIONS)}")
+    return dimension
+
+
+def parse_dimensions(value: str) -> List[str]:
+    """Parse a comma-separated list of distinct dimensions (outermost first)."""
+    dimensions = [resolve_dimension(name.strip()) for name in value.split(",") if name.strip()]
+    if not dimensions:
+        raise ValueError("Give at least one dimension to group by")
+    if len(set(dimensions)) != len(dimensions):
+        raise ValueError("Each dimension can only be grouped by once")
+    return dimensions
+
+
+def _join_dimension(query, dimension: str, invoices=Invoice.__table__):
+    """Join what a dimension needs onto the membership query; returns (query, key expression).
+
+    ``invoices`` is the invoices table or any selectable with its columns
+    (e.g. a pre-filtered CTE).
+    """
+    if dimension == "category":
+        query = (
+            query.outerjoin(InvoiceCategory, InvoiceCategory.invoice_id == invoices.c.invoice_id)
+            .outerjoin(Category, Category.category_id == InvoiceCategory.category_id)
+        )
+        return query, Category.category_name
+    if dimension == "tag":
+        query = (
+            query.outerjoin(InvoiceTag, InvoiceTag.invoice_id == invoices.c.invoice_id)
+            .outerjoin(Tag, Tag.tag_id == InvoiceTag.tag_id)
+        )
+        return query, Tag.tag_name
+    if dimension == "item_type":
+        # Inner join: an invoice without items has no item type
+        query = query.join(InvoiceItem, InvoiceItem.invoice_id == invoices.c.invoice_id)
+        return query, sa.func.nullif(InvoiceItem.item_type, "", type_=InvoiceItem.item_type.type)
+    if dimension == "month":
+        return query, sa.func.date_trunc("month", invoices.c.purchase_date, type_=sa.DateTime)
+    if dimension == "year":
+        return query, sa.cast(sa.extract("year", invoices.c.purchase_date), sa.Integer)
+    column = invoices.c.merchant_name if dimension == "merchant" else invoices.c.payment_method
+    # NULLIF so blank and missing values fall into the same group
+    return query, sa.func.nullif(column, "", type_=column.type)
+
+
+def _dimension_type(dimension: str):
+    return _join_dimension(sa.select(Invoice.invoice_id), dimension)[1].type
+
+
+def expense_group_memberships(
+    dimensions: List[str],
+    conditions: List,
+    name: str = "expense_groups",
+    invoices=Invoice.__table__
+):
+    """CTE of (invoice_id, amount, key_0 .. key_n) rows: the group(s) each matching invoice falls into.
+
+    An invoice appears once per category or tag it has and once per distinct
+    item type among its items; amount is always its grand total. DISTINCT
+    removes the repeats (e.g. several items of the same type), so an invoice
+    is counted once per group with a single hash pass instead of a scan of
+    the group for every item.
+    """
+    query = sa.select(invoices.c.invoice_id, sa.func.coalesce(invoices.c.grand_total, 0).label("amount"))
+    for position, dimension in enumerate(dimensions):
+        query, key = _join_dimension(query, dimension, invoices)
+        query = query.add_columns(key.label(f"key_{position}"))
+    return query.where(*conditions).distinct().cte(name)
+
+
+def format_group_key(dimension: str, key: Any) -> str:
+    """Display name of a group key (months as e.g. "March 2024")."""
+    if key is None or key == "":
+        return UNKNOWN_LABELS[dimension]
+    if dimension == "month":
+        return key.strftime("%B %Y")
+    return str(key)
+
+
+def group_url_key(dimension: str, key: Any) -> str:
+    """Key identifying a group in drill-down URLs: the display name, or YYYY-MM for months."""
+    if dimension == "month" and key is not None:
+        return key.strftime("%Y-%m")
+    return format_group_key(dimension, key)
+
+
+def group_key_condition(dimension: str, column, key: str):
+    """Condition on a membership key column selecting the group a drill-down key refers to."""
+    if key == UNKNOWN_LABELS[dimension]:
+        # Same merging as the summary: missing values and values literally named like the label
+        return column.is_(None) if dimension in ("month", "year") else sa.or_(column.is_(None), column == key)
+    if dimension == "month":
+        try:
+            return column == datetime.strptime(key, "%Y-%m")
+        except ValueError:
+            raise ValueError(f"Month keys look like 2024-03, not '{key}'")
+    if dimension == "year":
+        if not key.isdigit():
+            raise ValueError(f"Year keys look like 2024, not '{key}'")
+        return column == int(key)
+    return column == key
+
+
+def get_expense_breakdown(db: Session, dimensions: List[str], conditions: List) -> List[Dict[str, Any]]:
+    """Nested group totals: groups of the first dimension, each with children for the next, and so on.
+
+    Every level is grouped from its own membership rows (the dimensions down
+    to that level), so a node's count and total are the same as in a flat
+    grouping by those dimensions: a year counts each of its invoices once
+    even when they have several categories below it, and invoices without
+    items still count towards a category with item types beneath it. All
+    levels are aggregated in one UNION ALL query.
+    """
+    levels = []
+    for depth in range(1, len(dimensions) + 1):
+        groups = expense_group_memberships(dimensions[:depth], conditions, name=f"expense_groups_{depth}")
+        keys = [groups.c[f"key_{position}"] for position in range(depth)]
+        # Pad the deeper keys with typed NULLs so every level has the same columns
+        padding = [
+            sa.cast(sa.null(), _dimension_type(dimension)).label(f"key_{position}")
+            for position, dimension in enumerate(dimensions) if position >= depth
+        ]
+        levels.append(
+            sa.select(
+                sa.literal(depth).label("depth"),
+                *keys,
+                *padding,
+                sa.func.count().label("count"),
+                sa.func.sum(groups.c.amount).label("total"),
+            )
+            .group_by(*keys)
+        )
+    rows = db.execute(sa.union_all(*levels)).all()
+
+    # Parents (lower depth) first, so every child finds its parent node
+    roots: List[Dict[str, Any]] = []
+    nodes: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+    for row in sorted(rows, key=lambda row: row.depth):
+        raw_keys = [row._mapping[f"key_{position}"] for position in range(row.depth)]
+        path = tuple(format_group_key(dimension, key) for dimension, key in zip(dimensions, raw_keys))
+        node = nodes.get(path)
+        if node is None:
+            node = {"name": path[-1], "key": group_url_key(dimensions[row.depth - 1], raw_keys[-1]), "count": 0, "total": 0.0}
+            if row.depth < len(dimensions):
+                node["children"] = []
+            nodes[path] = node
+            (nodes[path[:-1]]["children"] if row.depth > 1 else roots).append(node)
+        # Different raw keys can share a display name (e.g. NULL and "Unknown")
+        node["count"] += row.count
+        node["total"] += float(row.total or 0)
+
+    def sort_by_total(level: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        level.sort(key=lambda node: node["total"], reverse=True)
+        for node in level:
+            if "children" in node:
+                sort_by_total(node["children"])
+        return level
+
+    return sort_by_total(roots)
+
+
+def get_expense_group_totals(db: Session, view_by: str, conditions: List) -> List[Dict[str, Any]]:
+    """Invoice count and total spend per group of one view_by mode or dimension."""
+    return get_expense_breakdown(db, [resolve_dimension(view_by)], conditions)
+
+
+def _expense_invoice_rows(groups):
+    """Invoice columns for each membership row, newest first."""
+    first_category = (
+        sa.select(sa.func.min(Category.category_name))
+        .join(InvoiceCategory, InvoiceCategory.category_id == Category.category_id)
+        .where(InvoiceCategory.invoice_id == Invoice.invoice_id)
+        .correlate(Invoice)
+        .scalar_subquery()
+    )
+    return (
+        sa.select(
+            groups.c.key_0.label("group_key"),
+            Invoice.invoice_id,
+            Invoice.merchant_name,
+            Invoice.order_number,
+            Invoice.purchase_date,
+            Invoice.payment_method,
+            Invoice.grand_total,
+            first_category.label("first_category"),
+        )
+        .join(Invoice, Invoice.invoice_id == groups.c.invoice_id)
+        .order_by(Invoice.purchase_date.desc().nulls_last(), Invoice.invoice_id)
+    )
+
+
+def _load_products(db: Session, invoice_ids) -> Dict[int, List[tuple]]:
+    """(name, price, quantity, item_type) of each invoice's items, keyed by invoice ID."""
+    products: Dict[int, List[tuple]] = {}
+    for invoice_id, name, price, quantity, item_type in db.execute(
+        sa.select(
+            InvoiceItem.invoice_id,
+            InvoiceItem.product_name,
+            InvoiceItem.unit_price,
+            InvoiceItem.quantity,
+            InvoiceItem.item_type,
+        )
+        .where(InvoiceItem.invoice_id.in_(invoice_ids))
+        .order_by(InvoiceItem.item_id)
+    ):
+        products.setdefault(invoice_id, []).append((name, price, quantity, item_type))
+    return products
+
+
+def _serialize_expense_item(dimension: str, name: str, row, products: Dict[int, List[tuple]]) -> Dict[str, Any]:
+    category = name if dimension == "category" else _label(row.first_category, UNKNOWN_LABELS["category"])
+    invoice_products = products.get(row.invoice_id, [])
+    if dimension == "item_type":
+        # Only the products of this item type
+        invoice_products = [product for product in invoice_products if _label(product[3], UNKNOWN_LABELS["item_type"]) == name]
+
+    return {
+        "id": row.invoice_id,
+        "store": row.merchant_name or ("Unknown" if dimension == "merchant" else ""),
+        "orderNumber": row.order_number or f"Order # {row.invoice_id}",
+        "date": row.purchase_date.strftime("%B %d, %Y") if row.purchase_date else "",
+        "category": category,
+        "creditCard": row.payment_method or ("Unknown" if dimension == "card" else ""),
+        "total": float(row.grand_total or 0),
+        "products": [
+            {"name": product_name, "price": float(price) if price else 0, "quantity": quantity or 0}
+            for product_name, price, quantity, _ in invoice_products
+        ],
+    }
+
+
+def get_expense_groups(db: Session, view_by: str, conditions: List) -> List[Dict[str, Any]]:
+    """Group totals with every invoice (and its products) embedded, read as plain rows.
+
+    Three queries regardless of the number of invoices: group totals, invoice
+    rows per group, and the products of those invoices.
+    """
+    dimension = resolve_dimension(view_by)
+    groups = expense_group_memberships([dimension], conditions)
+    result = {group["name"]: dict(group, items=[]) for group in get_expense_group_totals(db, dimension, conditions)}
+
+    products = _load_products(db, sa.select(groups.c.invoice_id))
+    for row in db.execute(_expense_invoice_rows(groups)):
+        name = format_group_key(dimension, row.group_key)
+        result[name]["items"].append(_serialize_expense_item(dimension, name, row, products))
+
+    return list(result.values())
+
+
+def get_expense_group_items(
+    db: Session,
+    view_by: str,
+    key: str,
+    conditions: List,
+    skip: int = 0,
+    limit: int = 50
+) -> Dict[str, Any]:
+    """One page of the invoices in a single group, with the group's count and total."""
+    dimension = resolve_dimension(view_by)
+    groups = expense_group_memberships([dimension], conditions)
+    in_group = group_key_condition(dimension, groups.c.key_0, key)
+
+    count, total = db.execute(
+        sa.select(sa.func.count(), sa.func.sum(groups.c.amount)).where(in_group)
+    ).one()
+
+    rows = db.execute(_expense_invoice_rows(groups).where(in_group).offset(skip).limit(limit)).all()
+    products = _load_products(db, [row.invoice_id for row in rows]) if rows else {}
+
+    name = key
+    if dimension == "month" and key != UNKNOWN_LABELS["month"]:
+        name = datetime.strptime(key, "%Y-%m").strftime("%B %Y")
+
+    return {
+        "name": name,
+        "key": key,
+        "count": count,
+        "total": float(total or 0),
+        "skip": skip,
+        "limit": limit,
+        "items": [_serialize_expense_item(dimension, name, row, products) for row in rows],
+    }
+
+
+def get_expense_timeseries(
+    db: Session,
+    start: date,
+    end: date,
+    bucket: str,
+    conditions: List,
+    split_by: Optional[str] = None
+) -> Dict[str, Any]:
+    """Spend per calendar bucket between start and end (inclusive), optionally one series per group.
+
+    Buckets come from generate_series over date_trunc, so periods without
+    purchases are returned with zero count and total; every series has the
+    same periods, oldest first. An invoice counts once per bucket, or once
+    per bucket and group when split.
+    """
+    if bucket not in TIMESERIES_BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'; expected one of {', '.join(TIMESERIES_BUCKETS)}")
+    if start > end:
+        raise ValueError("start must not be after end")
+    approximate_days = {"day": 1, "week": 7, "month": 28, "quarter": 90, "year": 365}[bucket]
+    if (end - start).days // approximate_days > MAX_TIMESERIES_BUCKETS:
+        raise ValueError(f"More than {MAX_TIMESERIES_BUCKETS} {bucket} buckets; use a larger bucket or a shorter range")
+    dimension = resolve_dimension(split_by) if split_by else None
+
+    conditions = conditions + [Invoice.purchase_date >= start, Invoice.purchase_date <= end]
+    groups = expense_group_memberships([dimension] if dimension else [], conditions)
+    period = sa.func.date_trunc(bucket, Invoice.purchase_date, type_=sa.DateTime)
+    key = groups.c.key_0 if dimension else sa.cast(sa.null(), sa.String)
+
+    buckets = sa.select(
+        sa.func.generate_series(
+            sa.func.date_trunc(bucket, sa.cast(start, sa.DateTime), type_=sa.DateTime),
+            sa.cast(end, sa.DateTime),
+            sa.cast(TIMESERIES_BUCKETS[bucket], INTERVAL),
+            type_=sa.DateTime
+        ).label("period")
+    ).cte("buckets")
+    totals = (
+        sa.select(
+            period.label("period"),
+            key.label("group_key"),
+            sa.func.count().label("count"),
+            sa.func.sum(groups.c.amount).label("total"),
+        )
+        .join(Invoice, Invoice.invoice_id == groups.c.invoice_id)
+        .group_by(period, *([key] if dimension else []))
+        .cte("totals")
+    )
+    if dimension:
+        # Every group gets every bucket; the left join leaves the empty ones NULL
+        keys = sa.select(totals.c.group_key).distinct().cte("series_keys")
+        query = (
+            sa.select(buckets.c.period, keys.c.group_key, totals.c.count, totals.c.total)
+            .select_from(buckets.join(keys, sa.true()))
+            .outerjoin(totals, sa.and_(
+                totals.c.period == buckets.c.period,
+                totals.c.group_key.isnot_distinct_from(keys.c.group_key)
+            ))
+        )
+    else:
+        query = (
+            sa.select(buckets.c.period, totals.c.group_key, totals.c.count, totals.c.total)
+            .outerjoin(totals, totals.c.period == buckets.c.period)
+        )
+
+    series: Dict[str, Dict[str, Any]] = {}
+    for period, group_key, count, total in db.execute(query.order_by(buckets.c.period)):
+        name = format_group_key(dimension, group_key) if dimension else "All"
+        entry = series.get(name)
+        if entry is None:
+            entry = series[name] = {
+                "name": name,
+                "key": group_url_key(dimension, group_key) if dimension else "All",
+                "count": 0,
+                "total": 0.0,
+                "points": {},
+            }
+        # Keys sharing a display name (NULL and "Unknown") are summed per period
+        point = entry["points"].setdefault(period.date().isoformat(), {"count": 0, "total": 0.0})
+        point["count"] += count or 0
+        point["total"] += float(total or 0)
+        entry["count"] += count or 0
+        entry["total"] += float(total or 0)
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "bucket": bucket,
+        "split_by": dimension,
+        "series": [
+            dict(entry, points=[{"period": period, **point} for period, point in entry["points"].items()])
+            for entry in sorted(series.values(), key=lambda entry: entry["total"], reverse=True)
+        ],
+    }
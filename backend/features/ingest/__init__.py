@@ -0,0 +1 @@
+"""Ingestion of invoice files from sources other than the single-file upload form."""
@@ -0,0 +1,364 @@
+# features/ingest/imap.py
+import base64
+import imaplib
+import logging
+import quopri
+import re
+import threading
+from dataclasses import dataclass
+from email.header import decode_header, make_header
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import unquote
+
+from core.config import (
+    IMAP_FETCH_BATCH, IMAP_POLL_INTERVAL, INGEST_WORKERS, UPLOAD_CHUNK_SIZE
+)
+from core.database import SessionLocal
+from features.ingest.models import ImapMailboxState
+from features.ingest.pipeline import create_batch, stage_source, run_batch
+
+logger = logging.getLogger(__name__)
+
+LITERAL_PATTERN = re.compile(rb"\{(\d+)\}\r\n")
+WHITESPACE_PATTERN = re.compile(rb"\s+")
+
+
+# ─────────────────────────────────────────────────────────
+# IMAP RESPONSE PARSING
+# ─────────────────────────────────────────────────────────
+
+def parse_imap_list(data: bytes) -> List[Any]:
+    """Parse IMAP response data (atoms, quoted strings, literals, NIL, lists) into nested lists."""
+    stack: List[List[Any]] = [[]]
+    pos = 0
+    while pos < len(data):
+        char = data[pos:pos + 1]
+        if char in b" \r\n":
+            pos += 1
+        elif char == b"(":
+            stack.append([])
+            pos += 1
+        elif char == b")":
+            item = stack.pop()
+            stack[-1].append(item)
+            pos += 1
+        elif char == b'"':
+            pos += 1
+            value = bytearray()
+            while data[pos:pos + 1] != b'"':
+                if data[pos:pos + 1] == b"\\":
+                    pos += 1
+                value += data[pos:pos + 1]
+                pos += 1
+            stack[-1].append(value.decode("utf-8", "replace"))
+            pos += 1
+        elif char == b"{":
+            match = LITERAL_PATTERN.match(data, pos)
+            length = int(match.group(1))
+            stack[-1].append(data[match.end():match.end() + length].decode("utf-8", "replace"))
+            pos = match.end() + length
+        else:
+            end = pos
+            while end < len(data) and data[end:end + 1] not in b" ()\r\n":
+                end += 1
+            atom = data[pos:end].decode("ascii", "replace")
+            stack[-1].append(None if atom.upper() == "NIL" else atom)
+            pos = end
+    return stack[0]
+
+
+def join_fetch_data(data: Iterable) -> bytes:
+    """Reassemble imaplib FETCH data, where literals arrive as (header, literal) tuples."""
+    parts = []
+    for item in data:
+        if isinstance(item, tuple):
+            parts.append(item[0] + b"\r\n" + item[1])
+        elif item:
+            parts.append(item)
+    return b" ".join(parts)
+
+
+def fetch_items(data: Iterable) -> Dict[str, Any]:
+    """Map each message's UID to its FETCH attribute dict."""
+    tokens = parse_imap_list(join_fetch_data(data))
+    messages = {}
+    # Responses come as "<seq> (<name> <value> ...)" pairs
+    for attributes in tokens:
+        if not isinstance(attributes, list):
+            continue
+        values = {str(attributes[i]).upper(): attributes[i + 1] for i in range(0, len(attributes) - 1, 2)}
+        if "UID" in values:
+            messages[values["UID"]] = values
+    return messages
+
+
+# ─────────────────────────────────────────────────────────
+# BODYSTRUCTURE
+# ─────────────────────────────────────────────────────────
+
+@dataclass
+class Attachment:
+    uid: int
+    part: str  # Body section number, e.g. "2" or "1.2"
+    file_name: str
+    encoding: str
+    size: int  # Encoded size in octets
+
+
+def _params(values: Optional[List]) -> Dict[str, str]:
+    if not isinstance(values, list):
+        return {}
+    return {str(values[i]).lower(): values[i + 1] for i in range(0, len(values) - 1, 2)}
+
+
+def _decode_file_name(params: Dict[str, str]) -> Optional[str]:
+    # RFC 2231 (filename*=utf-8''...) and RFC 2047 (=?utf-8?...?=) encodings
+    for key in ("filename*", "name*"):
+        if params.get(key):
+            value = params[key]
+            return unquote(value.split("''", 1)[1]) if "''" in value else value
+    for key in ("filename", "name"):
+        if params.get(key):
+            return str(make_header(decode_header(params[key]))).strip('"')
+    return None
+
+
+def find_pdf_attachments(uid: int, structure: List, section: str = "") -> List[Attachment]:
+    """Walk a BODYSTRUCTURE and return the PDF parts without downloading anything."""
+    if not isinstance(structure, list) or not structure:
+        return []
+
+    # Multipart: child parts first, then the subtype string
+    if isinstance(structure[0], list):
+        attachments = []
+        for index, child in enumerate(part for part in structure if isinstance(part, list)):
+            number = f"{section}.{index + 1}" if section else str(index + 1)
+            attachments.extend(find_pdf_attachments(uid, child, number))
+        return attachments
+
+    media_type = str(structure[0]).lower()
+    subtype = str(structure[1]).lower()
+    if media_type == "message":
+        return []  # Forwarded messages aren't descended into
+
+    # Extension fields sit after the type-specific ones (line count for text/*)
+    disposition_index = 9 if media_type == "text" else 8
+    disposition = structure[disposition_index] if len(structure) > disposition_index else None
+    params = _params(structure[2])
+    if isinstance(disposition, list) and len(disposition) > 1:
+        params.update(_params(disposition[1]))
+
+    file_name = _decode_file_name(params)
+    is_pdf = (media_type, subtype) == ("application", "pdf") or (file_name or "").lower().endswith(".pdf")
+    if not is_pdf:
+        return []
+
+    part = section or "1"
+    return [Attachment(
+        uid=uid,
+        part=part,
+        file_name=file_name or f"message-{uid}-{part}.pdf",
+        encoding=str(structure[5] or "7bit").lower(),
+        size=int(structure[6] or 0)
+    )]
+
+
+# ─────────────────────────────────────────────────────────
+# STREAMING ATTACHMENT DOWNLOAD
+# ─────────────────────────────────────────────────────────
+
+class AttachmentReader:
+    """File-like reader that downloads one body part in ranged chunks and decodes it on the fly.
+
+    Each read issues a partial FETCH (BODY.PEEK[part]<offset.length>), so
+    memory stays at one chunk however large the attachment is, and the
+    message is never marked as read.
+    """
+
+    def __init__(self, conn: imaplib.IMAP4, attachment: Attachment, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.conn = conn
+        self.attachment = attachment
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.pending = b""  # Encoded bytes that can't be decoded yet
+        self.buffer = b""  # Decoded bytes not yet returned
+        self.exhausted = False
+
+    def _fetch_encoded(self) -> bytes:
+        section = f"BODY.PEEK[{self.attachment.part}]<{self.offset}.{self.chunk_size}>"
+        typ, data = self.conn.uid("FETCH", str(self.attachment.uid), f"({section})")
+        if typ != "OK":
+            raise OSError(f"FETCH {section} for UID {self.attachment.uid} failed")
+        for item in data:
+            if isinstance(item, tuple) and b"BODY[" in item[0].upper():
+                return item[1]
+        return b""
+
+    def _decode(self, encoded: bytes, final: bool) -> bytes:
+        encoding = self.attachment.encoding
+        data = self.pending + encoded
+        if encoding == "base64":
+            data = WHITESPACE_PATTERN.sub(b"", data)
+            usable = len(data) if final else len(data) - len(data) % 4
+            self.pending = data[usable:]
+            return base64.b64decode(data[:usable] + b"=" * (-usable % 4)) if usable else b""
+        if encoding == "quoted-printable":
+            cut = len(data)
+            if not final:
+                # Don't split an =XX escape or =\r\n soft line break across chunks
+                tail = data.rfind(b"=", max(0, len(data) - 3))
+                if tail != -1:
+                    cut = tail
+            self.pending = data[cut:]
+            return quopri.decodestring(data[:cut])
+        self.pending = b""
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.exhausted and (size < 0 or len(self.buffer) < size):
+            encoded = self._fetch_encoded()
+            self.offset += len(encoded)
+            final = not encoded or (self.attachment.size and self.offset >= self.attachment.size)
+            self.buffer += self._decode(encoded, bool(final))
+            if final:
+                self.exhausted = True
+        if size < 0:
+            size = len(self.buffer)
+        result, self.buffer = self.buffer[:size], self.buffer[size:]
+        return result
+
+
+# ─────────────────────────────────────────────────────────
+# INGESTER
+# ─────────────────────────────────────────────────────────
+
+class ImapIngestor:
+    """Poll IMAP mailboxes for order e-mails and ingest their PDF attachments.
+
+    Each mailbox keeps its UIDVALIDITY and the highest UID processed, so a
+    poll only searches and fetches messages newer than that. BODYSTRUCTURE
+    is fetched for a whole range of new messages in one round trip, and only
+    the PDF parts are then downloaded. Attachments go through the ingest
+    pipeline, so OCR/template work runs in parallel and already-known
+    content is skipped by hash.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        username: str,
+        password: str,
+        mailboxes: Iterable[str] = ("INBOX",),
+        port: Optional[int] = None,
+        use_ssl: bool = True,
+        user_id: int = 1,
+        category: Optional[str] = None,
+        tags: Optional[str] = None,
+        use_templates: bool = False,
+        workers: int = INGEST_WORKERS,
+        fetch_batch: int = IMAP_FETCH_BATCH
+    ):
+        self.host = host
+        self.port = port or (993 if use_ssl else 143)
+        self.username = username
+        self.password = password
+        self.mailboxes = list(mailboxes)
+        self.use_ssl = use_ssl
+        self.user_id = user_id
+        self.category = category
+        self.tags = tags
+        self.use_templates = use_templates
+        self.workers = workers
+        self.fetch_batch = fetch_batch
+
+    @property
+    def account(self) -> str:
+        return f"{self.username}@{self.host}"
+
+    def connect(self) -> imaplib.IMAP4:
+        conn = imaplib.IMAP4_SSL(self.host, self.port) if self.use_ssl else imaplib.IMAP4(self.host, self.port)
+        conn.login(self.username, self.password)
+        return conn
+
+    def poll(self) -> int:
+        """Process new messages in every mailbox; returns the number of invoices created."""
+        conn = self.connect()
+        try:
+            return sum(self.poll_mailbox(conn, mailbox) for mailbox in self.mailboxes)
+        finally:
+            try:
+                conn.logout()
+            except (imaplib.IMAP4.error, OSError):
+                pass
+
+    def poll_mailbox(self, conn: imaplib.IMAP4, mailbox: str) -> int:
+        typ, _ = conn.select(f'"{mailbox}"', readonly=True)
+        if typ != "OK":
+            raise OSError(f"Cannot open mailbox {mailbox}")
+        uid_validity = int(conn.response("UIDVALIDITY")[1][0])
+        uid_next = conn.response("UIDNEXT")[1][0]
+
+        db = SessionLocal()
+        try:
+            state = db.get(ImapMailboxState, (self.account, mailbox))
+            if state is None:
+                state = ImapMailboxState(account=self.account, mailbox=mailbox, last_uid=0, messages_seen=0)
+                db.add(state)
+            if state.uid_validity != uid_validity:
+                if state.uid_validity is not None:
+                    logger.warning(f"UIDVALIDITY of {mailbox} changed; rescanning (known attachments are skipped by hash)")
+                state.uid_validity = uid_validity
+                state.last_uid = 0
+            db.commit()
+
+            # UIDNEXT tells us there is nothing new without even searching
+            if uid_next is not None and int(uid_next) - 1 <= state.last_uid:
+                return 0
+
+            typ, data = conn.uid("SEARCH", None, f"UID {state.last_uid + 1}:*")
+            # "n:*" always matches the last message, even when its UID is below n
+            uids = sorted(uid for uid in (int(value) for value in (data[0] or b"").split()) if uid > state.last_uid)
+
+            created = 0
+            for start in range(0, len(uids), self.fetch_batch):
+                chunk = uids[start:start + self.fetch_batch]
+                created += self._ingest_messages(conn, db, mailbox, chunk)
+                state.last_uid = chunk[-1]
+                state.messages_seen += len(chunk)
+                db.commit()
+            return created
+        finally:
+            db.close()
+
+    def _ingest_messages(self, conn: imaplib.IMAP4, db, mailbox: str, uids: List[int]) -> int:
+        typ, data = conn.uid("FETCH", ",".join(str(uid) for uid in uids), "(UID BODYSTRUCTURE)")
+        if typ != "OK":
+            raise OSError(f"FETCH BODYSTRUCTURE failed in {mailbox}")
+
+        attachments = []
+        for uid, values in fetch_items(data).items():
+            attachments.extend(find_pdf_attachments(int(uid), values.get("BODYSTRUCTURE")))
+        if not attachments:
+            return 0
+
+        batch = create_batch(db, "imap", user_id=self.user_id, category=self.category,
+                             tags=self.tags, use_templates=self.use_templates)
+        seen = set()
+        for attachment in attachments:
+            stage_source(db, batch, attachment.file_name, AttachmentReader(conn, attachment), seen)
+        db.commit()
+
+        run_batch(db, batch, workers=self.workers)
+        created = sum(1 for batch_file in batch.files if batch_file.status == "created")
+        logger.info(f"{self.account}/{mailbox}: batch {batch.batch_id} created {created} of {len(attachments)} attachments")
+        return created
+
+    def run(self, interval: int = IMAP_POLL_INTERVAL, stop_event: Optional[threading.Event] = None) -> None:
+        """Poll until stop_event is set, logging (not raising) connection errors."""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                self.poll()
+            except (imaplib.IMAP4.error, OSError) as e:
+                logger.error(f"IMAP poll of {self.account} failed: {e}")
+            stop_event.wait(interval)
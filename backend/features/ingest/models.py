@@ -0,0 +1,90 @@
+# features/ingest/models.py
+import sqlalchemy as sa
+from sqlalchemy.orm import relationship
+from core.database import Base
+from core.models import TimestampMixin
+
+
+class UploadSession(Base, TimestampMixin):
+    """A resumable (tus-style) upload whose bytes arrive in chunks across requests."""
+    __tablename__ = "upload_sessions"
+
+    upload_id = sa.Column(sa.String(32), primary_key=True)  # uuid4 hex
+    user_id = sa.Column(sa.Integer, sa.ForeignKey("users.user_id"))
+    file_name = sa.Column(sa.String(255), nullable=False)
+    upload_length = sa.Column(sa.BigInteger, nullable=False)  # Total size announced by the client
+    upload_offset = sa.Column(sa.BigInteger, nullable=False, default=0)  # Bytes received so far
+    category = sa.Column(sa.String(255))
+    tags = sa.Column(sa.Text)  # Comma-separated, as in the upload form
+    use_templates = sa.Column(sa.Boolean, default=False)
+    status = sa.Column(sa.String(20), nullable=False, default="active")  # active, completed
+    invoice_id = sa.Column(sa.Integer, sa.ForeignKey("invoices.invoice_id", ondelete="SET NULL"))
+
+    __table_args__ = (
+        # Stale-session sweeps filter on updated_at
+        sa.Index("ix_upload_sessions_updated_at", "updated_at"),
+    )
+
+
+class IngestBatch(Base, TimestampMixin):
+    """A group of files ingested together (bulk upload, watched folder, mailbox or WebDAV sync)."""
+    __tablename__ = "ingest_batches"
+
+    batch_id = sa.Column(sa.String(32), primary_key=True)  # uuid4 hex
+    source = sa.Column(sa.String(50), nullable=False)  # bulk, watch, imap, webdav
+    user_id = sa.Column(sa.Integer, sa.ForeignKey("users.user_id"))
+    category = sa.Column(sa.String(255))
+    tags = sa.Column(sa.Text)  # Comma-separated
+    use_templates = sa.Column(sa.Boolean, default=False)
+    status = sa.Column(sa.String(20), nullable=False, default="processing")  # processing, completed
+
+    files = relationship("IngestBatchFile", back_populates="batch", cascade="all, delete-orphan",
+                         order_by="IngestBatchFile.file_id")
+
+
+class IngestBatchFile(Base, TimestampMixin):
+    """Per-file status within an ingest batch."""
+    __tablename__ = "ingest_batch_files"
+
+    file_id = sa.Column(sa.Integer, primary_key=True)
+    batch_id = sa.Column(sa.String(32), sa.ForeignKey("ingest_batches.batch_id", ondelete="CASCADE"), nullable=False, index=True)
+    file_name = sa.Column(sa.String(255), nullable=False)
+    staged_path = sa.Column(sa.Text)  # Temporary copy awaiting processing
+    sha256 = sa.Column(sa.String(64))
+    status = sa.Column(sa.String(20), nullable=False, default="queued")  # queued, created, duplicate, failed, skipped, expanded
+    invoice_id = sa.Column(sa.Integer, sa.ForeignKey("invoices.invoice_id", ondelete="SET NULL"))
+    error = sa.Column(sa.Text)
+
+    batch = relationship("IngestBatch", back_populates="files")
+
+
+class WatchFolderState(Base, TimestampMixin):
+    """Per-directory high-water mark of the watched-folder ingester."""
+    __tablename__ = "watch_folder_states"
+
+    directory = sa.Column(sa.Text, primary_key=True)
+    high_water_mark = sa.Column(sa.Float, nullable=False, default=0)  # Latest arrival time (epoch seconds) ingested
+    files_ingested = sa.Column(sa.Integer, nullable=False, default=0)
+
+
+class ImapMailboxState(Base, TimestampMixin):
+    """Per-mailbox UID high-water mark of the IMAP ingester."""
+    __tablename__ = "imap_mailbox_states"
+
+    account = sa.Column(sa.String(255), primary_key=True)  # username@host
+    mailbox = sa.Column(sa.String(255), primary_key=True)
+    uid_validity = sa.Column(sa.BigInteger)  # A change means UIDs were reassigned
+    last_uid = sa.Column(sa.BigInteger, nullable=False, default=0)  # Highest UID already processed
+    messages_seen = sa.Column(sa.Integer, nullable=False, default=0)
+
+
+class WebDavManifestEntry(Base, TimestampMixin):
+    """Last-synced ETag of a remote WebDAV file or directory."""
+    __tablename__ = "webdav_manifest"
+
+    source = sa.Column(sa.String(255), primary_key=True)  # Base URL being synced
+    path = sa.Column(sa.Text, primary_key=True)  # Decoded server path
+    is_collection = sa.Column(sa.Boolean, nullable=False, default=False)
+    etag = sa.Column(sa.String(255))
+    size_bytes = sa.Column(sa.BigInteger)
+    sha256 = sa.Column(sa.String(64))  # Content hash of the last download (files only)
@@ -0,0 +1,272 @@
+# features/ingest/pipeline.py
+import logging
+import os
+import uuid
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from core.config import ALLOWED_EXTENSIONS, MAX_UPLOAD_SIZE, MAX_ZIP_ENTRIES, INGEST_WORKERS, INGEST_COMMIT_BATCH_SIZE
+from core.database import SessionLocal
+from features.ingest.models import IngestBatch, IngestBatchFile
+from features.invoices.services import analyze_invoice_file, create_invoice_from_file, split_csv
+from utils.storage import StreamedFile, copy_to_temp, store_file, get_blob
+
+logger = logging.getLogger(__name__)
+
+
+def is_zip_name(file_name: str) -> bool:
+    return file_name.lower().endswith(".zip")
+
+
+def is_ingestible(file_name: str) -> bool:
+    return os.path.splitext(file_name)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def create_batch(
+    db: Session,
+    source: str,
+    user_id: int = 1,
+    category: Optional[str] = None,
+    tags: Optional[str] = None,
+    use_templates: bool = False
+) -> IngestBatch:
+    batch = IngestBatch(
+        batch_id=uuid.uuid4().hex,
+        source=source,
+        user_id=user_id,
+        category=category,
+        tags=tags,
+        use_templates=use_templates,
+        status="processing"
+    )
+    db.add(batch)
+    return batch
+
+
+def add_batch_file(
+    db: Session,
+    batch: IngestBatch,
+    file_name: str,
+    staged: Optional[StreamedFile] = None,
+    status: str = "queued",
+    error: Optional[str] = None
+) -> IngestBatchFile:
+    """Queue a staged file (or record a skipped/failed one) in a batch."""
+    batch_file = IngestBatchFile(
+        file_name=file_name,
+        staged_path=str(staged.path) if staged else None,
+        sha256=staged.sha256 if staged else None,
+        status=status,
+        error=error
+    )
+    batch.files.append(batch_file)
+    return batch_file
+
+
+def add_staged_file(
+    db: Session,
+    batch: IngestBatch,
+    file_name: str,
+    staged: StreamedFile,
+    seen: Optional[Set[str]] = None
+) -> IngestBatchFile:
+    """Queue a staged file unless its content was already ingested.
+
+    Content already in blob storage, or already staged in this batch (tracked
+    in ``seen``), is recorded as a duplicate and its staged copy removed.
+    """
+    if (seen is not None and staged.sha256 in seen) or get_blob(db, staged.sha256) is not None:
+        staged.path.unlink(missing_ok=True)
+        batch_file = add_batch_file(db, batch, file_name, status="duplicate", error="Content already ingested")
+        batch_file.sha256 = staged.sha256
+        return batch_file
+
+    if seen is not None:
+        seen.add(staged.sha256)
+    return add_batch_file(db, batch, file_name, staged)
+
+
+def stage_source(
+    db: Session,
+    batch: IngestBatch,
+    file_name: str,
+    source: BinaryIO,
+    seen: Optional[Set[str]] = None
+) -> IngestBatchFile:
+    """Copy a source stream into a batch, deduplicating by content hash (see add_staged_file)."""
+    try:
+        staged = copy_to_temp(source, file_name, max_bytes=MAX_UPLOAD_SIZE)
+    except ValueError as e:
+        return add_batch_file(db, batch, file_name, status="failed", error=str(e))
+    return add_staged_file(db, batch, file_name, staged, seen)
+
+
+def describe_batch(batch: IngestBatch) -> Dict[str, Any]:
+    """Batch summary with per-file status, shaped like IngestBatchResponse."""
+    files = [batch_file for batch_file in batch.files if batch_file.status != "expanded"]
+    return {
+        "batch_id": batch.batch_id,
+        "source": batch.source,
+        "status": batch.status,
+        "total_files": len(files),
+        "counts": dict(Counter(batch_file.status for batch_file in files)),
+        "files": [
+            {
+                "file_id": batch_file.file_id,
+                "file_name": batch_file.file_name,
+                "status": batch_file.status,
+                "invoice_id": batch_file.invoice_id,
+                "sha256": batch_file.sha256,
+                "error": batch_file.error,
+            }
+            for batch_file in files
+        ],
+        "created_at": batch.created_at,
+        "updated_at": batch.updated_at,
+    }
+
+
+def expand_zip(
+    db: Session,
+    batch: IngestBatch,
+    archive_file: IngestBatchFile,
+    seen: Optional[Set[str]] = None
+) -> None:
+    """Queue every supported entry of a staged ZIP, copying entries out one at a time.
+
+    Only the central directory is read up front; each entry is decompressed
+    straight to its own temporary file in chunks, and the decompressed size
+    is enforced while copying rather than trusted from the archive header.
+    Entries are deduplicated by content hash like other sources (see
+    add_staged_file).
+    """
+    archive_path = Path(archive_file.staged_path)
+    with zipfile.ZipFile(archive_path) as archive:
+        entries = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        ]
+        if len(entries) > MAX_ZIP_ENTRIES:
+            raise ValueError(f"Archive has {len(entries)} entries; the limit is {MAX_ZIP_ENTRIES}")
+
+        for info in entries:
+            entry_name = os.path.basename(info.filename)
+            if entry_name.startswith(".") or not is_ingestible(entry_name):
+                add_batch_file(db, batch, entry_name, status="skipped", error="Unsupported file type")
+                continue
+            try:
+                with archive.open(info) as source:
+                    staged = copy_to_temp(source, entry_name, max_bytes=MAX_UPLOAD_SIZE)
+                add_staged_file(db, batch, entry_name, staged, seen)
+            except (ValueError, zipfile.BadZipFile, RuntimeError) as e:
+                # RuntimeError covers encrypted entries
+                add_batch_file(db, batch, entry_name, status="failed", error=str(e))
+
+    archive_file.status = "expanded"
+    archive_file.staged_path = None
+    archive_path.unlink(missing_ok=True)
+
+
+def _commit_results(db: Session, batch: IngestBatch, completed: List[tuple], tags: List[str]) -> None:
+    """Create invoices for analysed files in one transaction, one savepoint per file."""
+    for batch_file, future in completed:
+        staged_path = Path(batch_file.staged_path)
+        savepoint = db.begin_nested()
+        try:
+            analysis = future.result()
+            streamed = StreamedFile(path=staged_path, sha256=batch_file.sha256, size_bytes=staged_path.stat().st_size)
+            blob = store_file(db, streamed, batch_file.file_name)
+            response_data = create_invoice_from_file(
+                db, blob, batch_file.file_name,
+                user_id=batch.user_id or 1,
+                category=batch.category,
+                tags=tags,
+                use_templates=bool(batch.use_templates),
+                analysis=analysis
+            )
+            savepoint.commit()
+            batch_file.status = "created"
+            batch_file.invoice_id = response_data["invoice_id"]
+        except Exception as e:
+            # A blob file store_file moved into place is removed after the
+            # commit below, unless another invoice references it by then
+            savepoint.rollback()
+            logger.warning(f"Ingest of {batch_file.file_name} in batch {batch.batch_id} failed: {e}")
+            batch_file.status = "failed"
+            batch_file.error = str(e)
+            staged_path.unlink(missing_ok=True)
+        batch_file.staged_path = None
+    db.commit()
+
+
+def ingest_queued_files(db: Session, batch: IngestBatch, workers: int = INGEST_WORKERS) -> None:
+    """Analyse queued files on a thread pool and create their invoices in batched transactions.
+
+    OCR, template matching and perceptual hashing run in parallel (tesseract
+    and poppler are subprocesses, so threads scale across cores); all database
+    work stays on this thread, committing every INGEST_COMMIT_BATCH_SIZE files.
+    """
+    # Imported here: the templates feature depends on invoice models
+    from features.templates.services import load_active_templates
+
+    queued = [batch_file for batch_file in batch.files if batch_file.status == "queued" and batch_file.staged_path]
+    if not queued:
+        return
+
+    templates = load_active_templates(db) if batch.use_templates else None
+    tags = split_csv(batch.tags)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(analyze_invoice_file, batch_file.staged_path, templates): batch_file
+            for batch_file in queued
+        }
+        completed = []
+        for future in as_completed(futures):
+            completed.append((futures.pop(future), future))
+            if len(completed) >= INGEST_COMMIT_BATCH_SIZE:
+                _commit_results(db, batch, completed, tags)
+                completed = []
+        if completed:
+            _commit_results(db, batch, completed, tags)
+
+
+def run_batch(db: Session, batch: IngestBatch, workers: int = INGEST_WORKERS) -> None:
+    """Ingest the queued files of a batch synchronously and mark it completed."""
+    ingest_queued_files(db, batch, workers=workers)
+    batch.status = "completed"
+    db.commit()
+
+
+def process_batch(batch_id: str) -> None:
+    """Expand archives and ingest every queued file of a batch (run as a background task)."""
+    db = SessionLocal()
+    try:
+        batch = db.get(IngestBatch, batch_id)
+        if batch is None:
+            return
+
+        archives = [batch_file for batch_file in batch.files if batch_file.status == "queued" and is_zip_name(batch_file.file_name)]
+        # Entries repeating a loose file or an entry of another archive in the batch are duplicates
+        seen = {batch_file.sha256 for batch_file in batch.files if batch_file.sha256 and batch_file not in archives}
+        for archive_file in archives:
+            try:
+                expand_zip(db, batch, archive_file, seen)
+            except (ValueError, zipfile.BadZipFile) as e:
+                archive_file.status = "failed"
+                archive_file.error = str(e)
+                Path(archive_file.staged_path).unlink(missing_ok=True)
+                archive_file.staged_path = None
+        db.commit()
+
+        run_batch(db, batch)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error processing ingest batch {batch_id}: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+# features/ingest/resumable.py
+import base64
+import hashlib
+import logging
+import os
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+import aiofiles
+import sqlalchemy as sa
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from starlette.requests import ClientDisconnect
+
+from core.config import ALLOWED_EXTENSIONS, MAX_RESUMABLE_UPLOAD_SIZE, RESUMABLE_UPLOAD_TTL_HOURS, UPLOAD_CHUNK_SIZE
+from features.ingest.models import UploadSession
+from utils.storage import TEMP_FOLDER, StreamedFile
+
+logger = logging.getLogger(__name__)
+
+# Partial data of in-progress sessions, one file per upload id
+RESUMABLE_FOLDER = TEMP_FOLDER / "resumable"
+
+
+def partial_path(upload_id: str) -> Path:
+    return RESUMABLE_FOLDER / f"{upload_id}.part"
+
+
+def parse_upload_metadata(header: Optional[str]) -> Dict[str, str]:
+    """Decode a tus Upload-Metadata header: comma-separated "key base64(value)" pairs."""
+    metadata = {}
+    for pair in (header or "").split(","):
+        parts = pair.strip().split(" ", 1)
+        if not parts[0]:
+            continue
+        try:
+            metadata[parts[0]] = base64.b64decode(parts[1]).decode("utf-8") if len(parts) > 1 else ""
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError(f"Invalid Upload-Metadata value for {parts[0]}")
+    return metadata
+
+
+def create_upload_session(
+    db: Session,
+    file_name: str,
+    upload_length: int,
+    user_id: int = 1,
+    category: Optional[str] = None,
+    tags: Optional[str] = None,
+    use_templates: bool = False
+) -> UploadSession:
+    """Register a new resumable upload and create its empty partial file."""
+    if upload_length <= 0:
+        raise ValueError("Upload-Length must be positive")
+    if upload_length > MAX_RESUMABLE_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {MAX_RESUMABLE_UPLOAD_SIZE} byte limit")
+    if os.path.splitext(file_name)[1].lower() not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {file_name}")
+
+    session = UploadSession(
+        upload_id=uuid.uuid4().hex,
+        user_id=user_id,
+        file_name=file_name,
+        upload_length=upload_length,
+        upload_offset=0,
+        category=category,
+        tags=tags,
+        use_templates=use_templates,
+        status="active"
+    )
+    RESUMABLE_FOLDER.mkdir(parents=True, exist_ok=True)
+    partial_path(session.upload_id).touch()
+    db.add(session)
+    return session
+
+
+def get_upload_session(db: Session, upload_id: str, for_update: bool = False) -> Optional[UploadSession]:
+    query = db.query(UploadSession).filter(UploadSession.upload_id == upload_id)
+    if for_update:
+        # Serialises concurrent PATCH/finalize requests for the same upload
+        query = query.with_for_update()
+    return query.first()
+
+
+async def append_chunk(session: UploadSession, chunks: AsyncIterator[bytes]) -> int:
+    """Append a request body at the session's offset and return the new offset.
+
+    The partial file is first truncated to the recorded offset, discarding
+    bytes from a request that died before its offset was saved. If the client
+    disconnects mid-chunk, whatever arrived is kept so it can resume from there.
+    """
+    path = partial_path(session.upload_id)
+    if not path.exists():
+        raise HTTPException(status_code=410, detail="Partial upload data is gone; start a new upload")
+    os.truncate(path, session.upload_offset)
+
+    remaining = session.upload_length - session.upload_offset
+    written = 0
+    async with aiofiles.open(path, "ab") as out:
+        try:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > remaining:
+                    raise HTTPException(status_code=413, detail="Chunk extends past Upload-Length")
+                await out.write(chunk)
+        except ClientDisconnect:
+            logger.info(f"Client disconnected during upload {session.upload_id} after {written} bytes")
+
+    return session.upload_offset + written
+
+
+def snapshot_partial_file(session: UploadSession, chunk_size: int = UPLOAD_CHUNK_SIZE) -> StreamedFile:
+    """Hash a completed upload in fixed-size chunks and hard-link it for blob storage.
+
+    Blocking; run in a thread pool. The link (not the partial file itself) is
+    moved into blob storage, so a finalize that fails later can be retried.
+    """
+    path = partial_path(session.upload_id)
+    digest = hashlib.sha256()
+    size_bytes = 0
+    with open(path, "rb") as source:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            size_bytes += len(chunk)
+            digest.update(chunk)
+
+    TEMP_FOLDER.mkdir(parents=True, exist_ok=True)
+    link_path = TEMP_FOLDER / f"{session.upload_id}{os.path.splitext(session.file_name)[1].lower()}"
+    link_path.unlink(missing_ok=True)
+    os.link(path, link_path)
+    return StreamedFile(path=link_path, sha256=digest.hexdigest(), size_bytes=size_bytes)
+
+
+def discard_upload_session(db: Session, session: UploadSession) -> None:
+    partial_path(session.upload_id).unlink(missing_ok=True)
+    db.delete(session)
+
+
+def purge_stale_upload_sessions(db: Session, max_age_hours: int = RESUMABLE_UPLOAD_TTL_HOURS) -> int:
+    """Delete sessions (and their partial data) that have not received data for max_age_hours."""
+    cutoff = sa.func.now() - timedelta(hours=max_age_hours)
+    stale = db.query(UploadSession).filter(UploadSession.updated_at < cutoff).all()
+    for session in stale:
+        discard_upload_session(db, session)
+    return len(stale)
@@ -0,0 +1,260 @@
+# features/ingest/router.py
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Request, Response, UploadFile, File, Form
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+
+from core.config import MAX_UPLOAD_SIZE, MAX_BULK_UPLOAD_SIZE
+from core.database import get_db
+from features.ingest.models import IngestBatch
+from features.ingest.schemas import UploadSessionResponse, IngestBatchResponse
+from features.ingest.pipeline import (
+    create_batch, add_batch_file, describe_batch, process_batch, is_zip_name, is_ingestible
+)
+from features.ingest.resumable import (
+    parse_upload_metadata, create_upload_session, get_upload_session, append_chunk,
+    snapshot_partial_file, partial_path, discard_upload_session, purge_stale_upload_sessions
+)
+from features.invoices.services import create_invoice_from_file, split_csv
+from utils.helpers import parse_boolean
+from utils.storage import save_upload, store_file
+
+router = APIRouter(
+    prefix="/ingest",
+    tags=["ingest"],
+    responses={404: {"description": "Not found"}},
+)
+
+TUS_VERSION = "1.0.0"
+OFFSET_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _offset_headers(session) -> dict:
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(session.upload_offset),
+        "Upload-Length": str(session.upload_length),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("/uploads", status_code=201, response_model=UploadSessionResponse)
+async def create_resumable_upload(
+    request: Request,
+    upload_length: int = Header(..., alias="Upload-Length"),
+    upload_metadata: Optional[str] = Header(None, alias="Upload-Metadata"),
+    db: Session = Depends(get_db)
+):
+    """Start a resumable upload (tus creation).
+
+    Upload-Metadata carries base64 values for filename (required), category,
+    tags, use_templates and user_id. Send the bytes with PATCH to the returned
+    Location, then POST .../finalize to create the invoice.
+    """
+    try:
+        metadata = parse_upload_metadata(upload_metadata)
+        if not metadata.get("filename"):
+            raise HTTPException(status_code=400, detail="Upload-Metadata must include filename")
+
+        # Sweep abandoned sessions while we're here; the query is index-backed
+        purge_stale_upload_sessions(db)
+
+        session = create_upload_session(
+            db,
+            file_name=metadata["filename"],
+            upload_length=upload_length,
+            user_id=int(metadata.get("user_id") or 1),
+            category=metadata.get("category"),
+            tags=metadata.get("tags"),
+            use_templates=parse_boolean(metadata.get("use_templates", "false"))
+        )
+        db.commit()
+        db.refresh(session)
+
+        location = str(request.url_for("get_resumable_upload", upload_id=session.upload_id))
+        headers = {"Location": location, **_offset_headers(session)}
+        return Response(
+            content=UploadSessionResponse.model_validate(session).model_dump_json(),
+            status_code=201,
+            media_type="application/json",
+            headers=headers
+        )
+    except HTTPException:
+        db.rollback()
+        raise
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.head("/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str, db: Session = Depends(get_db)):
+    """Report how many bytes the server has, so an interrupted client knows where to resume."""
+    session = get_upload_session(db, upload_id)
+    if not session:
+        return Response(status_code=404, headers={"Tus-Resumable": TUS_VERSION})
+    return Response(status_code=200, headers=_offset_headers(session))
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_resumable_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Return the state of a resumable upload."""
+    session = get_upload_session(db, upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+
+@router.patch("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    content_type: Optional[str] = Header(None, alias="Content-Type"),
+    db: Session = Depends(get_db)
+):
+    """Append a chunk at Upload-Offset (tus PATCH).
+
+    Each chunk must fit within the server's request size limit; clients
+    should send chunks of a few megabytes.
+    """
+    if content_type != OFFSET_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {OFFSET_CONTENT_TYPE}")
+
+    try:
+        session = get_upload_session(db, upload_id, for_update=True)
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if session.status != "active":
+            raise HTTPException(status_code=409, detail="Upload already finalized")
+        if upload_offset != session.upload_offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload-Offset {upload_offset} does not match server offset {session.upload_offset}"
+            )
+
+        session.upload_offset = await append_chunk(session, request.stream())
+        db.commit()
+
+        return Response(status_code=204, headers=_offset_headers(session))
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/uploads/{upload_id}/finalize", response_model=dict)
+async def finalize_resumable_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Turn a fully received upload into an invoice, exactly as /upload/ would."""
+    try:
+        session = get_upload_session(db, upload_id, for_update=True)
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+
+        # Retried finalize after a lost response: report the invoice already created
+        if session.status == "completed":
+            return {"message": "Upload already finalized", "invoice_id": session.invoice_id, "filename": session.file_name}
+
+        if session.upload_offset != session.upload_length:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: {session.upload_offset} of {session.upload_length} bytes received"
+            )
+
+        streamed = await run_in_threadpool(snapshot_partial_file, session)
+        blob = store_file(db, streamed, session.file_name)
+
+        response_data = create_invoice_from_file(
+            db, blob, session.file_name,
+            user_id=session.user_id or 1,
+            category=session.category,
+            tags=split_csv(session.tags),
+            use_templates=bool(session.use_templates)
+        )
+        session.status = "completed"
+        session.invoice_id = response_data["invoice_id"]
+        db.commit()
+        
+        # The bytes now live in blob storage
+        partial_path(upload_id).unlink(missing_ok=True)
+
+        return response_data
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def cancel_resumable_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Abort an upload and delete its partial data (tus termination)."""
+    try:
+        session = get_upload_session(db, upload_id, for_update=True)
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        discard_upload_session(db, session)
+        db.commit()
+        return Response(status_code=204, headers={"Tus-Resumable": TUS_VERSION})
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk", status_code=202, response_model=IngestBatchResponse)
+async def bulk_upload(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    category: Optional[str] = Form(None),
+    tags: Optional[str] = Form(None),
+    use_templates: Optional[bool] = Form(False),
+    user_id: int = Form(1),
+    db: Session = Depends(get_db)
+):
+    """Upload many invoice files and/or ZIP archives in one request.
+
+    Files are streamed to disk and the batch is processed in the background:
+    archives are expanded entry by entry, OCR/template work runs on a worker
+    pool and invoices are committed in batches. Poll GET /ingest/batches/{id}
+    for per-file status.
+    """
+    try:
+        batch = create_batch(db, "bulk", user_id=user_id, category=category, tags=tags, use_templates=bool(use_templates))
+
+        for upload in files:
+            file_name = upload.filename or "upload"
+            if not (is_zip_name(file_name) or is_ingestible(file_name)):
+                add_batch_file(db, batch, file_name, status="skipped", error="Unsupported file type")
+                continue
+            try:
+                max_bytes = MAX_BULK_UPLOAD_SIZE if is_zip_name(file_name) else MAX_UPLOAD_SIZE
+                add_batch_file(db, batch, file_name, await save_upload(upload, max_bytes=max_bytes))
+            except HTTPException as e:
+                # One oversized file shouldn't sink the whole batch
+                add_batch_file(db, batch, file_name, status="failed", error=e.detail)
+
+        db.commit()
+        background_tasks.add_task(process_batch, batch.batch_id)
+
+        return describe_batch(batch)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/batches/{batch_id}", response_model=IngestBatchResponse)
+async def get_batch(batch_id: str, db: Session = Depends(get_db)):
+    """Return the status of an ingest batch and each of its files."""
+    batch = db.get(IngestBatch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return describe_batch(batch)
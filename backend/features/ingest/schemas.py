@@ -0,0 +1,39 @@
+# features/ingest/schemas.py
+from typing import Dict, List, Optional
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    file_name: str
+    upload_length: int
+    upload_offset: int
+    status: str
+    invoice_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class IngestBatchFileResponse(BaseModel):
+    file_id: int
+    file_name: str
+    status: str
+    invoice_id: Optional[int] = None
+    sha256: Optional[str] = None
+    error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class IngestBatchResponse(BaseModel):
+    batch_id: str
+    source: str
+    status: str
+    total_files: int
+    counts: Dict[str, int]  # Files per status
+    files: List[IngestBatchFileResponse]
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
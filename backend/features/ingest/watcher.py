@@ -0,0 +1,206 @@
+# features/ingest/watcher.py
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from watchfiles import Change, watch
+
+from core.config import (
+    INGEST_COMMIT_BATCH_SIZE, INGEST_WORKERS, WATCH_SETTLE_SECONDS, WATCH_FORCE_POLLING, WATCH_POLL_INTERVAL_MS
+)
+from core.database import SessionLocal
+from features.ingest.models import WatchFolderState
+from features.ingest.pipeline import create_batch, stage_source, run_batch, is_ingestible
+
+logger = logging.getLogger(__name__)
+
+# Names scanners and copy tools give to files still being written
+IN_PROGRESS_SUFFIXES = (".part", ".partial", ".tmp", ".crdownload", ".filepart")
+
+
+def arrival_time(stat: os.stat_result) -> float:
+    """When a file appeared in the folder.
+
+    ctime changes when a file is moved or copied in, so this also catches
+    files whose mtime was preserved from an older original.
+    """
+    return max(stat.st_mtime, stat.st_ctime)
+
+
+def is_candidate(path: Path) -> bool:
+    name = path.name
+    return not name.startswith((".", "~$")) and not name.lower().endswith(IN_PROGRESS_SUFFIXES) and is_ingestible(name)
+
+
+class FolderWatcher:
+    """Watch directories for new invoice files and feed them to the ingest pipeline.
+
+    Uses inotify (via watchfiles) and falls back to polling when inotify is
+    unavailable or force_polling is set, which network shares need since
+    remote writes raise no local events. A file is only ingested once its
+    size and mtime have been stable for settle_seconds. Each directory keeps
+    a high-water mark of the newest file ingested, so after a restart only
+    files that arrived since then are considered.
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[str],
+        user_id: int = 1,
+        category: Optional[str] = None,
+        tags: Optional[str] = None,
+        use_templates: bool = False,
+        settle_seconds: float = WATCH_SETTLE_SECONDS,
+        force_polling: bool = WATCH_FORCE_POLLING,
+        poll_interval_ms: int = WATCH_POLL_INTERVAL_MS,
+        workers: int = INGEST_WORKERS,
+        batch_size: int = INGEST_COMMIT_BATCH_SIZE
+    ):
+        self.directories = [Path(directory).resolve() for directory in directories]
+        self.user_id = user_id
+        self.category = category
+        self.tags = tags
+        self.use_templates = use_templates
+        self.settle_seconds = settle_seconds
+        self.force_polling = force_polling
+        self.poll_interval_ms = poll_interval_ms
+        self.workers = workers
+        self.batch_size = batch_size
+        # Files seen but not yet ingested: path -> (size, mtime) at the last look
+        self.pending: Dict[Path, Tuple[int, float]] = {}
+
+    def root_for(self, path: Path) -> Optional[Path]:
+        for directory in self.directories:
+            if path == directory or directory in path.parents:
+                return directory
+        return None
+
+    def observe(self, path: Path) -> None:
+        if not is_candidate(path):
+            return
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.pending.pop(path, None)
+            return
+        self.pending[path] = (stat.st_size, stat.st_mtime)
+
+    def catch_up(self) -> None:
+        """Queue files that arrived at or after each directory's high-water mark."""
+        db = SessionLocal()
+        try:
+            marks = {state.directory: state.high_water_mark for state in db.query(WatchFolderState)}
+        finally:
+            db.close()
+
+        for directory in self.directories:
+            mark = marks.get(str(directory), 0)
+            for current, _, names in os.walk(directory):
+                for name in names:
+                    path = Path(current) / name
+                    try:
+                        if is_candidate(path) and arrival_time(path.stat()) >= mark:
+                            self.observe(path)
+                    except FileNotFoundError:
+                        continue
+
+    def ready_files(self) -> List[Path]:
+        """Pop pending files that have stopped changing."""
+        now = time.time()
+        ready = []
+        for path, (size, mtime) in list(self.pending.items()):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self.pending[path] = (stat.st_size, stat.st_mtime)
+            elif now - stat.st_mtime >= self.settle_seconds:
+                ready.append(path)
+                del self.pending[path]
+        return ready
+
+    def ingest(self, paths: List[Path]) -> None:
+        """Ingest settled files per directory in batches, then advance each high-water mark."""
+        by_root: Dict[Path, List[Path]] = {}
+        for path in paths:
+            root = self.root_for(path)
+            if root is not None:
+                by_root.setdefault(root, []).append(path)
+
+        for root, root_paths in by_root.items():
+            for start in range(0, len(root_paths), self.batch_size):
+                self._ingest_batch(root, root_paths[start:start + self.batch_size])
+
+    def _ingest_batch(self, root: Path, paths: List[Path]) -> None:
+        db = SessionLocal()
+        try:
+            batch = create_batch(db, "watch", user_id=self.user_id, category=self.category,
+                                 tags=self.tags, use_templates=self.use_templates)
+            seen = set()
+            arrivals = []
+            for path in paths:
+                try:
+                    arrivals.append(arrival_time(path.stat()))
+                    with open(path, "rb") as source:
+                        stage_source(db, batch, path.name, source, seen)
+                except OSError as e:
+                    logger.warning(f"Could not read {path}: {e}")
+            db.commit()
+
+            run_batch(db, batch, workers=self.workers)
+            created = sum(1 for batch_file in batch.files if batch_file.status == "created")
+
+            # Never move the mark past a file in this directory that is still settling
+            mark = max(arrivals, default=0)
+            still_pending = [mtime for path, (_, mtime) in self.pending.items() if self.root_for(path) == root]
+            if still_pending:
+                mark = min(mark, min(still_pending))
+
+            state = db.get(WatchFolderState, str(root)) or WatchFolderState(directory=str(root), high_water_mark=0, files_ingested=0)
+            state.high_water_mark = max(state.high_water_mark, mark)
+            state.files_ingested += created
+            db.add(state)
+            db.commit()
+            logger.info(f"Watched folder {root}: batch {batch.batch_id} created {created} of {len(paths)} files")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error ingesting files from {root}: {e}")
+        finally:
+            db.close()
+
+    def flush(self) -> None:
+        ready = self.ready_files()
+        if ready:
+            self.ingest(ready)
+
+    def run(self, stop_event=None) -> None:
+        """Catch up on files that arrived while stopped, then watch until stop_event is set."""
+        for directory in self.directories:
+            directory.mkdir(parents=True, exist_ok=True)
+        self.catch_up()
+
+        while True:
+            try:
+                for changes in watch(
+                    *self.directories,
+                    force_polling=self.force_polling,
+                    poll_delay_ms=self.poll_interval_ms,
+                    # Wake up regularly so settling files are re-checked even when nothing changes
+                    rust_timeout=int(max(self.settle_seconds, 1) * 1000),
+                    yield_on_timeout=True,
+                    stop_event=stop_event,
+                ):
+                    for change, path in changes:
+                        if change != Change.deleted:
+                            self.observe(Path(path))
+                    self.flush()
+                return
+            except (OSError, RuntimeError) as e:
+                if self.force_polling:
+                    raise
+                logger.warning(f"inotify unavailable ({e}); falling back to polling")
+                self.force_polling = True
@@ -0,0 +1,325 @@
+# features/ingest/webdav.py
+import logging
+import posixpath
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+import httpx
+from sqlalchemy.orm import Session
+
+from core.config import (
+    INGEST_WORKERS, MAX_UPLOAD_SIZE, UPLOAD_CHUNK_SIZE,
+    WEBDAV_MAX_CONNECTIONS, WEBDAV_TIMEOUT, WEBDAV_SYNC_BATCH, WEBDAV_SYNC_INTERVAL
+)
+from core.database import SessionLocal
+from features.ingest.models import WebDavManifestEntry
+from features.ingest.pipeline import create_batch, add_batch_file, add_staged_file, run_batch, is_ingestible
+from utils.storage import StreamedFile, copy_to_temp
+
+logger = logging.getLogger(__name__)
+
+DAV = "{DAV:}"
+PROPFIND_BODY = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<d:propfind xmlns:d="DAV:"><d:prop>'
+    b'<d:resourcetype/><d:getetag/><d:getcontentlength/>'
+    b'</d:prop></d:propfind>'
+)
+
+
+@dataclass
+class RemoteEntry:
+    path: str  # Decoded server path without a trailing slash
+    is_collection: bool
+    etag: Optional[str]
+    size_bytes: Optional[int]
+
+
+def normalize_path(path: str) -> str:
+    path = unquote(path)
+    return path.rstrip("/") or "/"
+
+
+def parse_multistatus(body: bytes) -> List[RemoteEntry]:
+    """Entries of a PROPFIND 207 Multi-Status response."""
+    entries = []
+    for response in ET.fromstring(body).iter(f"{DAV}response"):
+        href = response.findtext(f"{DAV}href")
+        if not href:
+            continue
+        props = {}
+        for propstat in response.findall(f"{DAV}propstat"):
+            status = propstat.findtext(f"{DAV}status") or ""
+            prop = propstat.find(f"{DAV}prop")
+            if " 200 " in f"{status} " and prop is not None:
+                props.update({child.tag: child for child in prop})
+
+        resourcetype = props.get(f"{DAV}resourcetype")
+        etag = props.get(f"{DAV}getetag")
+        length = props.get(f"{DAV}getcontentlength")
+        entries.append(RemoteEntry(
+            path=normalize_path(urlsplit(href.strip()).path),
+            is_collection=resourcetype is not None and resourcetype.find(f"{DAV}collection") is not None,
+            etag=etag.text.strip() if etag is not None and etag.text else None,
+            size_bytes=int(length.text) if length is not None and (length.text or "").strip().isdigit() else None
+        ))
+    return entries
+
+
+class ResponseReader:
+    """File-like view of a streamed HTTP response body, for copy_to_temp."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = chunks
+        self.buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class WebDavSync:
+    """Pull new and changed invoice files from a WebDAV (e.g. Nextcloud) folder.
+
+    Directories are listed with Depth: 1 PROPFINDs, level by level, and every
+    ETag is compared with the manifest stored from the previous sync. Servers
+    such as Nextcloud change a folder's ETag whenever anything below it
+    changes, so unchanged subtrees are skipped without being listed and a sync
+    with no changes costs a single request; set trust_collection_etags=False
+    for servers whose folder ETags only track direct children. Listings and
+    downloads share one connection pool capped at max_connections.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        user_id: int = 1,
+        category: Optional[str] = None,
+        tags: Optional[str] = None,
+        use_templates: bool = False,
+        trust_collection_etags: bool = True,
+        max_connections: int = WEBDAV_MAX_CONNECTIONS,
+        timeout: float = WEBDAV_TIMEOUT,
+        batch_size: int = WEBDAV_SYNC_BATCH,
+        workers: int = INGEST_WORKERS
+    ):
+        parts = urlsplit(url)
+        self.source = url.rstrip("/")
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.root = normalize_path(parts.path)
+        self.auth = (username, password or "") if username else None
+        self.user_id = user_id
+        self.category = category
+        self.tags = tags
+        self.use_templates = use_templates
+        self.trust_collection_etags = trust_collection_etags
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.workers = workers
+
+    def client(self) -> httpx.Client:
+        return httpx.Client(
+            base_url=self.origin,
+            auth=self.auth,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        )
+
+    @staticmethod
+    def url_path(path: str, is_collection: bool = False) -> str:
+        quoted = quote(path)
+        return quoted + "/" if is_collection and not quoted.endswith("/") else quoted
+
+    def propfind(self, client: httpx.Client, path: str, depth: str = "1") -> List[RemoteEntry]:
+        response = client.request(
+            "PROPFIND",
+            self.url_path(path, is_collection=True),
+            headers={"Depth": depth, "Content-Type": "application/xml; charset=utf-8"},
+            content=PROPFIND_BODY
+        )
+        response.raise_for_status()
+        return parse_multistatus(response.content)
+
+    def download(self, client: httpx.Client, entry: RemoteEntry) -> StreamedFile:
+        with client.stream("GET", self.url_path(entry.path)) as response:
+            response.raise_for_status()
+            return copy_to_temp(
+                ResponseReader(response.iter_bytes(UPLOAD_CHUNK_SIZE)),
+                posixpath.basename(entry.path),
+                max_bytes=MAX_UPLOAD_SIZE
+            )
+
+    def scan(
+        self,
+        client: httpx.Client,
+        pool: ThreadPoolExecutor,
+        manifest: Dict[str, Optional[str]],
+        root: RemoteEntry
+    ) -> Tuple[List[RemoteEntry], List[RemoteEntry], Dict[str, Set[str]]]:
+        """Walk changed directories; returns changed files, changed directories and each listing."""
+        changed_files: List[RemoteEntry] = []
+        changed_dirs: List[RemoteEntry] = [root]
+        listings: Dict[str, Set[str]] = {}
+
+        frontier = [root.path]
+        while frontier:
+            next_frontier = []
+            for path, entries in pool.map(lambda path: (path, self.propfind(client, path)), frontier):
+                children = [entry for entry in entries if entry.path != path]
+                listings[path] = {entry.path for entry in children}
+                for entry in children:
+                    known = entry.etag is not None and manifest.get(entry.path) == entry.etag
+                    if entry.is_collection:
+                        if not (known and self.trust_collection_etags):
+                            changed_dirs.append(entry)
+                            next_frontier.append(entry.path)
+                    elif not known and is_ingestible(posixpath.basename(entry.path)):
+                        changed_files.append(entry)
+            frontier = next_frontier
+        return changed_files, changed_dirs, listings
+
+    def sync(self) -> int:
+        """Run one sync; returns the number of invoices created."""
+        db = SessionLocal()
+        try:
+            with self.client() as client, ThreadPoolExecutor(max_workers=self.max_connections) as pool:
+                root = next(iter(self.propfind(client, self.root, depth="0")), None)
+                if root is None or not root.is_collection:
+                    raise ValueError(f"{self.source} is not a WebDAV collection")
+                root.path = self.root
+
+                known_root = db.get(WebDavManifestEntry, (self.source, self.root))
+                if self.trust_collection_etags and root.etag and known_root is not None and known_root.etag == root.etag:
+                    logger.info(f"WebDAV {self.source}: no changes")
+                    return 0
+
+                manifest = dict(
+                    db.query(WebDavManifestEntry.path, WebDavManifestEntry.etag)
+                    .filter(WebDavManifestEntry.source == self.source)
+                )
+                changed_files, changed_dirs, listings = self.scan(client, pool, manifest, root)
+
+                created = 0
+                unreachable: List[str] = []
+                for start in range(0, len(changed_files), self.batch_size):
+                    chunk = changed_files[start:start + self.batch_size]
+                    batch_created, batch_unreachable = self._ingest_batch(db, client, pool, chunk)
+                    created += batch_created
+                    unreachable.extend(batch_unreachable)
+
+                self._record_directories(db, changed_dirs, unreachable)
+                self._forget_removed(db, manifest, listings)
+                db.commit()
+                logger.info(
+                    f"WebDAV {self.source}: {len(changed_files)} new or changed files, "
+                    f"{created} invoices created, {len(unreachable)} downloads failed"
+                )
+                return created
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _ingest_batch(
+        self,
+        db: Session,
+        client: httpx.Client,
+        pool: ThreadPoolExecutor,
+        entries: List[RemoteEntry]
+    ) -> Tuple[int, List[str]]:
+        """Download entries in parallel, ingest them as one batch and record them in the manifest.
+
+        Files that could not be downloaded are left out of the manifest so the
+        next sync retries them.
+        """
+        def fetch(entry: RemoteEntry):
+            try:
+                return self.download(client, entry)
+            except (httpx.HTTPError, ValueError) as e:
+                return e
+
+        batch = create_batch(db, "webdav", user_id=self.user_id, category=self.category,
+                             tags=self.tags, use_templates=self.use_templates)
+        seen = set()
+        downloaded = []
+        unreachable = []
+        for entry, result in zip(entries, pool.map(fetch, entries)):
+            file_name = posixpath.basename(entry.path)
+            if isinstance(result, httpx.HTTPError):
+                logger.warning(f"Could not download {entry.path}: {result}")
+                add_batch_file(db, batch, file_name, status="failed", error=str(result))
+                unreachable.append(entry.path)
+            elif isinstance(result, ValueError):
+                # Too large: record it so it is not downloaded again until it changes
+                add_batch_file(db, batch, file_name, status="failed", error=str(result))
+                downloaded.append((entry, None))
+            else:
+                add_staged_file(db, batch, file_name, result, seen)
+                downloaded.append((entry, result.sha256))
+        db.commit()
+
+        run_batch(db, batch, workers=self.workers)
+
+        for entry, sha256 in downloaded:
+            db.merge(WebDavManifestEntry(
+                source=self.source,
+                path=entry.path,
+                is_collection=False,
+                etag=entry.etag,
+                size_bytes=entry.size_bytes,
+                sha256=sha256
+            ))
+        db.commit()
+        return sum(1 for batch_file in batch.files if batch_file.status == "created"), unreachable
+
+    def _record_directories(self, db: Session, directories: List[RemoteEntry], unreachable: List[str]) -> None:
+        """Store directory ETags, except above files that still need to be retried."""
+        for directory in directories:
+            prefix = directory.path.rstrip("/") + "/"
+            if any(path.startswith(prefix) for path in unreachable):
+                continue
+            db.merge(WebDavManifestEntry(
+                source=self.source,
+                path=directory.path,
+                is_collection=True,
+                etag=directory.etag
+            ))
+
+    def _forget_removed(self, db: Session, manifest: Dict[str, Optional[str]], listings: Dict[str, Set[str]]) -> None:
+        """Drop manifest entries (and their subtrees) that disappeared from a listed directory."""
+        removed = [
+            path for path in manifest
+            if path != self.root and posixpath.dirname(path) in listings and path not in listings[posixpath.dirname(path)]
+        ]
+        for path in removed:
+            db.query(WebDavManifestEntry).filter(
+                WebDavManifestEntry.source == self.source,
+                (WebDavManifestEntry.path == path) | WebDavManifestEntry.path.startswith(path + "/", autoescape=True)
+            ).delete(synchronize_session=False)
+
+    def run(self, interval: int = WEBDAV_SYNC_INTERVAL, stop_event: Optional[threading.Event] = None) -> None:
+        """Sync until stop_event is set, logging (not raising) server errors."""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                self.sync()
+            except (httpx.HTTPError, ET.ParseError, ValueError) as e:
+                logger.error(f"WebDAV sync of {self.source} failed: {e}")
+            stop_event.wait(interval)
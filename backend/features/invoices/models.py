@@ -1,7 +1,7 @@
 # features/invoices/models.py
 import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from core.database import Base
 from core.models import TimestampMixin, SoftDeleteMixin
@@ -27,6 +27,7 @@ class Invoice(Base, TimestampMixin, SoftDeleteMixin):
     gift_card_amount = sa.Column(sa.Numeric(10, 2))
     refunded_amount = sa.Column(sa.Numeric(10, 2))
     credit_card = sa.Column(sa.String(255))  # Credit card used
+    search_vector = deferred(sa.Column(TSVECTOR))  # Maintained by features.search.services
     
     # Relationships
     user = relationship("User", back_populates="invoices")
@@ -38,6 +39,31 @@ class Invoice(Base, TimestampMixin, SoftDeleteMixin):
     files = relationship("InvoiceFile", back_populates="invoice")
     template_tests = relationship("TemplateTestResult", back_populates="invoice")
     expense_categories = relationship("ExpenseCategory", secondary="invoice_expense_categories", back_populates="invoices")
+    
+    # Indexes backing the invoice list filters and sort keys. Every read
+    # filters is_deleted = false, so they are partial: soft-deleted invoices
+    # take no space in them and the planner skips the is_deleted check.
+    __table_args__ = (
+        # Covers the spend analytics over a date range (top merchants/cards, percentiles) as index-only scans
+        sa.Index("ix_invoices_active_user_date", "user_id", "purchase_date",
+                 postgresql_include=["invoice_id", "grand_total", "merchant_name", "payment_method"],
+                 postgresql_where=sa.text("is_deleted = false")),
+        sa.Index("ix_invoices_active_user_status", "user_id", "status", postgresql_where=sa.text("is_deleted = false")),
+        sa.Index("ix_invoices_active_user_merchant", "user_id", "merchant_name", postgresql_where=sa.text("is_deleted = false")),
+        sa.Index("ix_invoices_active_user_payment_method", "user_id", "payment_method",
+                 postgresql_where=sa.text("is_deleted = false")),
+        sa.Index("ix_invoices_active_user_grand_total", "user_id", "grand_total",
+                 postgresql_where=sa.text("is_deleted = false")),
+        sa.Index("ix_invoices_search_vector", "search_vector", postgresql_using="gin"),
+        # Trigram indexes (pg_trgm) for fuzzy duplicate detection and the
+        # invoice list's q search (ILIKE '%...%' on all three columns)
+        sa.Index("ix_invoices_merchant_trgm", "merchant_name", postgresql_using="gin",
+                 postgresql_ops={"merchant_name": "gin_trgm_ops"}),
+        sa.Index("ix_invoices_order_number_trgm", "order_number", postgresql_using="gin",
+                 postgresql_ops={"order_number": "gin_trgm_ops"}),
+        sa.Index("ix_invoices_notes_trgm", "notes", postgresql_using="gin",
+                 postgresql_ops={"notes": "gin_trgm_ops"}),
+    )
 
 
 class InvoiceItem(Base):
@@ -63,6 +89,14 @@ class InvoiceItem(Base):
     
     # Relationships
     invoice = relationship("Invoice", back_populates="items")
+    
+    # Items of an invoice (detail views, cascades, joins from invoices), and
+    # item type lookups (summary grouping, replacement intervals) that join
+    # to invoices for user and date, which ix_invoices_active_user_date covers
+    __table_args__ = (
+        sa.Index("ix_invoice_items_invoice", "invoice_id"),
+        sa.Index("ix_invoice_items_item_type_invoice", "item_type", "invoice_id"),
+    )
 
 
 class Tag(Base):
@@ -80,6 +114,11 @@ class InvoiceTag(Base):
     
     invoice_id = sa.Column(sa.Integer, sa.ForeignKey("invoices.invoice_id"), primary_key=True)
     tag_id = sa.Column(sa.Integer, sa.ForeignKey("tags.tag_id"), primary_key=True)
+    
+    # Reverse lookup (tag -> invoices) for tag filters and facets
+    __table_args__ = (
+        sa.Index("ix_invoice_tags_tag_invoice", "tag_id", "invoice_id"),
+    )
 
 
 class Category(Base):
@@ -97,6 +136,11 @@ class InvoiceCategory(Base):
     
     invoice_id = sa.Column(sa.Integer, sa.ForeignKey("invoices.invoice_id"), primary_key=True)
     category_id = sa.Column(sa.Integer, sa.ForeignKey("categories.category_id"), primary_key=True)
+    
+    # Reverse lookup (category -> invoices) for category filters and facets
+    __table_args__ = (
+        sa.Index("ix_invoice_categories_category_invoice", "category_id", "invoice_id"),
+    )
 
 
 class InvoiceStatusHistory(Base):
@@ -111,13 +155,32 @@ class InvoiceStatusHistory(Base):
     invoice = relationship("Invoice", back_populates="status_history")
 
 
+class FileBlob(Base):
+    """Content-addressed upload stored once per SHA-256, shared by every InvoiceFile that references it."""
+    __tablename__ = "file_blobs"
+    
+    sha256 = sa.Column(sa.String(64), primary_key=True)
+    size_bytes = sa.Column(sa.BigInteger, nullable=False)
+    storage_path = sa.Column(sa.Text, nullable=False)
+    ref_count = sa.Column(sa.Integer, nullable=False, default=0)
+    created_at = sa.Column(sa.DateTime, default=datetime.utcnow)
+
+
 class InvoiceFile(Base):
     __tablename__ = "invoice_files"
     
     file_id = sa.Column(sa.Integer, primary_key=True)
-    invoice_id = sa.Column(sa.Integer, sa.ForeignKey("invoices.invoice_id"))
-    file_name = sa.Column(sa.String(255))
+    invoice_id = sa.Column(sa.Integer, sa.ForeignKey("invoices.invoice_id"), index=True)
+    file_name = sa.Column(sa.String(255), index=True)
     file_path = sa.Column(sa.Text)
+    sha256 = sa.Column(sa.String(64), sa.ForeignKey("file_blobs.sha256"), index=True)
+    ocr_text = sa.Column(sa.Text)  # Raw OCR output, kept for full-text search
+    # Perceptual hash (dHash) of the first page, split into 16-bit bands for multi-index hashing
+    phash = sa.Column(sa.BigInteger)
+    phash_band_0 = sa.Column(sa.Integer, index=True)
+    phash_band_1 = sa.Column(sa.Integer, index=True)
+    phash_band_2 = sa.Column(sa.Integer, index=True)
+    phash_band_3 = sa.Column(sa.Integer, index=True)
     uploaded_at = sa.Column(sa.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -139,6 +202,21 @@ class AuditLog(Base):
     # Relationships
     user = relationship("User", back_populates="audit_logs")
 
+
+class IdempotencyKey(Base):
+    """Client-supplied Idempotency-Key with the fingerprint and response of the request that used it."""
+    __tablename__ = "idempotency_keys"
+    
+    user_id = sa.Column(sa.Integer, primary_key=True)
+    endpoint = sa.Column(sa.String(50), primary_key=True)
+    key = sa.Column(sa.String(255), primary_key=True)
+    fingerprint = sa.Column(sa.String(64), nullable=False)  # SHA-256 of the request parameters
+    status = sa.Column(sa.String(20), nullable=False, default="processing")  # processing, completed
+    response_status = sa.Column(sa.Integer)
+    response_body = sa.Column(JSONB)
+    created_at = sa.Column(sa.DateTime, default=datetime.utcnow)
+    expires_at = sa.Column(sa.DateTime, nullable=False, index=True)
+
 class ExpenseCategory(Base, TimestampMixin):
     __tablename__ = "expense_categories"
     
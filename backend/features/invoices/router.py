@@ -1,8 +1,8 @@
 # features/invoices/router.py
 import os
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File, Form
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File, Form, Header
+from fastapi.responses import JSONResponse, FileResponse, Response
 from sqlalchemy.orm import Session
 from pathlib import Path
 
@@ -13,14 +13,27 @@ from features.invoices.models import Tag, InvoiceTag
 from utils.audit import log_audit
 
 from core.database import get_db
+from core.serialization import FastJSONResponse
 from features.invoices.models import (
     Invoice, InvoiceItem, Tag, Category, InvoiceFile, InvoiceStatusHistory
 )
 from features.invoices.schemas import (
-    InvoiceCreate, InvoiceResponse, InvoiceUpdate, InvoiceItemBase
+    InvoiceCreate, InvoiceResponse, InvoiceUpdate,
+    InvoiceFilterParams, InvoiceFacetsResponse
 )
+from features.invoices.services import (
+    invoice_filter_conditions, apply_invoice_sort, get_invoice_facets,
+    parse_projection, apply_projection, serialize_invoice, split_csv, create_invoice_from_file
+)
+from features.search.services import refresh_search_vector
+from features.expenses.rollups import add_to_rollups, remove_from_rollups
+from features.duplicates.services import find_duplicates_of_invoice, get_invoice_by_order_number
 from utils.helpers import parse_date, get_or_create_tag, get_or_create_category, add_status_history
 from utils.audit import log_audit
+from utils.storage import save_upload, store_file, acquire_blob, release_blob, get_blob, is_sha256
+from utils.idempotency import (
+    request_fingerprint, reserve_idempotency_key, save_idempotent_response, release_idempotency_key
+)
 
 router = APIRouter(
     prefix="",
@@ -32,218 +45,170 @@ router = APIRouter(
 UPLOAD_FOLDER = Path("uploads")
 
 @router.get("/invoices/", response_model=List[InvoiceResponse])
-async def get_invoices(db: Session = Depends(get_db), user_id: Optional[int] = None, skip: int = 0, limit: int = 100):
-    """Return all invoices, optionally filtered by user."""
+async def get_invoices(
+    db: Session = Depends(get_db),
+    filters: InvoiceFilterParams = Depends(),
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[str] = None,
+    include: Optional[str] = None
+):
+    """Return invoices matching the given filters, sorted server-side.
+    
+    ``fields`` (comma-separated column names) and ``include`` (any of
+    items, tags, categories) restrict the response to a sparse fieldset.
+    """
     try:
-        query = db.query(Invoice).filter(Invoice.is_deleted == False)
+        columns, includes = parse_projection(fields, include)
         
-        if user_id:
-            query = query.filter(Invoice.user_id == user_id)
+        query = db.query(Invoice).filter(*invoice_filter_conditions(filters))
+        query = apply_invoice_sort(query, filters)
+        query = apply_projection(query, columns, includes)
             
         invoices = query.offset(skip).limit(limit).all()
         
-        return [
-            InvoiceResponse(
-                invoice_id=invoice.invoice_id,
-                user_id=invoice.user_id,
-                file_name=invoice.file_name,
-                merchant_name=invoice.merchant_name,
-                order_number=invoice.order_number,
-                purchase_date=invoice.purchase_date.isoformat() if invoice.purchase_date else None,
-                payment_method=invoice.payment_method,
-                grand_total=float(invoice.grand_total) if invoice.grand_total is not None else None,
-                status=invoice.status,
-                notes=invoice.notes,
-                shipping_handling=float(invoice.shipping_handling) if invoice.shipping_handling is not None else None,
-                estimated_tax=float(invoice.estimated_tax) if invoice.estimated_tax is not None else None,
-                total_before_tax=float(invoice.total_before_tax) if invoice.total_before_tax is not None else None,
-                billing_address=invoice.billing_address,
-                credit_card_transactions=float(invoice.credit_card_transactions) if invoice.credit_card_transactions is not None else None,
-                gift_card_amount=float(invoice.gift_card_amount) if invoice.gift_card_amount is not None else None,
-                refunded_amount=float(invoice.refunded_amount) if invoice.refunded_amount is not None else None,
-                created_at=invoice.created_at,
-                items=[
-                    InvoiceItemBase(
-                        product_name=item.product_name,
-                        quantity=item.quantity,
-                        unit_price=float(item.unit_price) if item.unit_price is not None else 0,
-                        product_link=item.product_link,
-                        documentation=item.documentation,
-                        condition=item.condition,
-                        paid_by=item.paid_by,
-                        used_date=item.used_date.isoformat() if item.used_date else None,
-                        expiration_date=item.expiration_date.isoformat() if item.expiration_date else None
-                    ) for item in invoice.items
-                ],
-                tags=[tag.tag_name for tag in invoice.tags],
-                categories=[category.category_name for category in invoice.categories]
-            ) for invoice in invoices
-        ]
+        # Encoded directly with orjson; response_model only documents the full shape
+        return FastJSONResponse([serialize_invoice(invoice, columns, includes) for invoice in invoices])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/invoices/facets", response_model=InvoiceFacetsResponse)
+async def get_invoices_facets(db: Session = Depends(get_db), filters: InvoiceFilterParams = Depends()):
+    """Return invoice counts per status, tag and category for the given filters."""
+    try:
+        return get_invoice_facets(db, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/invoice/{invoice_id}", response_model=InvoiceResponse)
-async def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
-    """Return a single invoice by ID."""
+async def get_invoice(
+    invoice_id: int,
+    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    include: Optional[str] = None
+):
+    """Return a single invoice by ID, optionally as a sparse fieldset."""
     try:
-        invoice = db.query(Invoice).filter(Invoice.invoice_id == invoice_id, Invoice.is_deleted == False).first()
+        columns, includes = parse_projection(fields, include)
+        
+        query = db.query(Invoice).filter(Invoice.invoice_id == invoice_id, Invoice.is_deleted == False)
+        invoice = apply_projection(query, columns, includes).first()
         
         if not invoice:
             raise HTTPException(status_code=404, detail="Invoice not found")
         
-        return InvoiceResponse(
-            invoice_id=invoice.invoice_id,
-            user_id=invoice.user_id,
-            file_name=invoice.file_name,
-            merchant_name=invoice.merchant_name,  # Include merchant_name in response
-            order_number=invoice.order_number,
-            purchase_date=invoice.purchase_date.isoformat() if invoice.purchase_date else None,
-            payment_method=invoice.payment_method,
-            grand_total=float(invoice.grand_total) if invoice.grand_total is not None else None,
-            status=invoice.status,
-            notes=invoice.notes,
-            shipping_handling=float(invoice.shipping_handling) if invoice.shipping_handling is not None else None,
-            estimated_tax=float(invoice.estimated_tax) if invoice.estimated_tax is not None else None,
-            total_before_tax=float(invoice.total_before_tax) if invoice.total_before_tax is not None else None,
-            billing_address=invoice.billing_address,
-            credit_card_transactions=float(invoice.credit_card_transactions) if invoice.credit_card_transactions is not None else None,
-            gift_card_amount=float(invoice.gift_card_amount) if invoice.gift_card_amount is not None else None,
-            refunded_amount=float(invoice.refunded_amount) if invoice.refunded_amount is not None else None,
-            created_at=invoice.created_at,
-            items=[
-                InvoiceItemBase(
-                    product_name=item.product_name,
-                    quantity=item.quantity,
-                    unit_price=float(item.unit_price) if item.unit_price is not None else 0,
-                    product_link=item.product_link,
-                    documentation=item.documentation,
-                    condition=item.condition,
-                    paid_by=item.paid_by,
-                    used_date=item.used_date.isoformat() if item.used_date else None,
-                    expiration_date=item.expiration_date.isoformat() if item.expiration_date else None
-                ) for item in invoice.items
-            ],
-            tags=[tag.tag_name for tag in invoice.tags],
-            categories=[category.category_name for category in invoice.categories]
-        )
+        return FastJSONResponse(serialize_invoice(invoice, columns, includes))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/upload/", response_model=dict)
 async def upload_file(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
     category: Optional[str] = Form(None),
     tags: Optional[str] = Form(None),
     use_templates: Optional[bool] = Form(False),  # Add use_templates param with default False
     user_id: int = Form(1),
+    sha256: Optional[str] = Form(None),  # Reference bytes already on the server instead of sending them
+    file_name: Optional[str] = Form(None),  # Display name when uploading by sha256
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Upload an invoice file."""
+    """Upload an invoice file.
+    
+    Files are stored content-addressed by SHA-256. Clients that already know
+    the server holds the bytes (see HEAD /files/by-hash/{sha}) can send
+    ``sha256`` and ``file_name`` instead of the file. Retries that repeat an
+    ``Idempotency-Key`` header get the original response back.
+    """
+    streamed = None
+    reserved = False
     try:
-        # Make sure the upload folder exists
-        if not UPLOAD_FOLDER.exists():
-            UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
-            
-        # Create a unique filename or use the original
-        filename = file.filename
-        file_path = UPLOAD_FOLDER / filename
-        
-        # Save the file
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Process tags if provided
-        tag_list = []
-        if tags:
-            tag_list = [tag.strip() for tag in tags.split(",")]
-        
-        # Create a new invoice record
-        new_invoice = Invoice(
-            user_id=user_id,
-            file_name=filename,
-            merchant_name=os.path.splitext(filename)[0],  # Use filename as default merchant name
-            status="Open"
-        )
-        db.add(new_invoice)
-        db.flush()
-        
-        # Add invoice file record
-        invoice_file = InvoiceFile(
-            invoice_id=new_invoice.invoice_id,
-            file_name=filename,
-            file_path=str(file_path)
-        )
-        db.add(invoice_file)
-        
-        # Add tags if provided
-        for tag_name in tag_list:
-            tag = get_or_create_tag(db, tag_name)
-            new_invoice.tags.append(tag)
-        
-        # Add category if provided
-        if category:
-            cat = get_or_create_category(db, category)
-            new_invoice.categories.append(cat)
-        
-        # Add status history
-        add_status_history(db, new_invoice.invoice_id, new_invoice.status)
-        
-        # Process with OCR templates if requested
-        template_used = None
-        if use_templates:
-            # Import template-related functions
-            from features.templates.services import find_matching_template, process_with_template, update_invoice_with_extracted_data
-            
-            # Try to find a matching template
-            matching_template = find_matching_template(str(file_path), db)
-            
-            if matching_template:
-                # Process the file with the template
-                result = process_with_template(str(file_path), matching_template.template_data)
-                
-                if result["success"]:
-                    # Update the invoice with extracted data
-                    update_invoice_with_extracted_data(new_invoice, result["extracted_data"], db)
-                    template_used = matching_template.name
-        
-        # Log audit
-        log_audit(
-            db=db,
+        if file is not None:
+            filename = file.filename
+            # Stream to disk in chunks, hashing as we go
+            streamed = await save_upload(file)
+            content_sha256 = streamed.sha256
+        elif sha256 and file_name:
+            filename = file_name
+            content_sha256 = sha256.lower()
+        else:
+            raise HTTPException(status_code=400, detail="Provide a file, or sha256 and file_name")
+        
+        # A retry returns the stored response without running OCR or inserting again
+        fingerprint = request_fingerprint(content_sha256, filename, category, tags, use_templates)
+        replay = reserve_idempotency_key(db, idempotency_key, "upload", user_id, fingerprint)
+        if replay is not None:
+            return replay
+        reserved = True
+        
+        if streamed is not None:
+            # Move into blob storage (or drop the copy if the blob already exists)
+            blob = store_file(db, streamed, filename)
+        else:
+            blob = acquire_blob(db, content_sha256)
+            if blob is None:
+                raise HTTPException(status_code=404, detail="No stored file with this sha256")
+        
+        response_data = create_invoice_from_file(
+            db, blob, filename,
             user_id=user_id,
-            action="UPLOAD",
-            table_name="invoices",
-            record_id=new_invoice.invoice_id,
-            new_data={
-                "file_name": filename,
-                "merchant_name": new_invoice.merchant_name,
-                "status": new_invoice.status
-            }
+            category=category,
+            tags=split_csv(tags),
+            use_templates=use_templates
         )
-        
+        save_idempotent_response(db, idempotency_key, "upload", user_id, response_data)
         db.commit()
         
-        # Return information about template usage if applicable
-        response_data = {
-            "message": "File uploaded successfully",
-            "invoice_id": new_invoice.invoice_id,
-            "filename": filename
-        }
-        
-        if template_used:
-            response_data["template_used"] = template_used
-        
         return response_data
+    except HTTPException:
+        db.rollback()
+        if reserved:
+            release_idempotency_key(db, idempotency_key, "upload", user_id)
+        raise
     except Exception as e:
         db.rollback()
+        if reserved:
+            release_idempotency_key(db, idempotency_key, "upload", user_id)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if streamed is not None:
+            # No-op once store_file has moved it
+            streamed.path.unlink(missing_ok=True)
 
 @router.post("/add-entry/", response_model=dict)
-async def add_entry(entry_data: InvoiceCreate, db: Session = Depends(get_db), user_id: int = 1):
-    """Add a new invoice entry without file."""
+async def add_entry(
+    entry_data: InvoiceCreate,
+    db: Session = Depends(get_db),
+    user_id: int = 1,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Add a new invoice entry without file; retries with the same Idempotency-Key return the original response."""
+    reserved = False
     try:
+        replay = reserve_idempotency_key(db, idempotency_key, "add-entry", user_id, request_fingerprint(entry_data))
+        if replay is not None:
+            return replay
+        reserved = True
+        
+        # Reject a clashing order number up front instead of failing on the unique constraint
+        existing = get_invoice_by_order_number(db, entry_data.order_number)
+        if existing:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "An invoice with this order number already exists", "invoice_id": existing.invoice_id}
+            )
+        
         # Create new invoice
         new_invoice = Invoice(
             user_id=user_id,  # Default user ID if auth not implemented
@@ -277,6 +242,7 @@ async def add_entry(entry_data: InvoiceCreate, db: Session = Depends(get_db), us
                 documentation=item_data.documentation,
                 condition=item_data.condition,
                 paid_by=item_data.paid_by,
+                item_type=item_data.item_type,
                 used_date=parse_date(item_data.used_date),
                 expiration_date=parse_date(item_data.expiration_date)
             )
@@ -310,10 +276,27 @@ async def add_entry(entry_data: InvoiceCreate, db: Session = Depends(get_db), us
             }
         )
         
+        db.flush()
+        refresh_search_vector(db, [new_invoice.invoice_id])
+        add_to_rollups(db, [new_invoice.invoice_id])
+        
+        duplicates = find_duplicates_of_invoice(db, new_invoice)
+        
+        response_data = {"message": "Invoice entry added successfully", "invoice_id": new_invoice.invoice_id}
+        if duplicates:
+            response_data["duplicates"] = duplicates
+        save_idempotent_response(db, idempotency_key, "add-entry", user_id, response_data)
         db.commit()
-        return {"message": "Invoice entry added successfully", "invoice_id": new_invoice.invoice_id}
+        return response_data
+    except HTTPException:
+        db.rollback()
+        if reserved:
+            release_idempotency_key(db, idempotency_key, "add-entry", user_id)
+        raise
     except Exception as e:
         db.rollback()
+        if reserved:
+            release_idempotency_key(db, idempotency_key, "add-entry", user_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -327,6 +310,16 @@ async def update_invoice(invoice_id: int, invoice_data: InvoiceUpdate, db: Sessi
         if not invoice:
             raise HTTPException(status_code=404, detail="Invoice not found")
         
+        existing = get_invoice_by_order_number(db, invoice_data.order_number, exclude_invoice_id=invoice_id)
+        if existing:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "An invoice with this order number already exists", "invoice_id": existing.invoice_id}
+            )
+        
+        # Take the invoice out of the monthly rollups; it is added back once updated
+        remove_from_rollups(db, [invoice_id])
+        
         # Store old data for audit log
         old_data = {
             "file_name": invoice.file_name,
@@ -351,19 +344,22 @@ async def update_invoice(invoice_id: int, invoice_data: InvoiceUpdate, db: Sessi
             # Create new filename with format Merchant-Order#_OrderNumber.ext
             new_filename = f"{invoice_data.merchant_name}-Order#_{invoice_data.order_number}{old_ext}"
         
-        # If old file exists and name changed, rename on disk
-        if old_filename and old_file_path and Path(old_file_path).exists() and (new_filename != old_filename):
-            new_file_path = UPLOAD_FOLDER / new_filename
-            Path(old_file_path).rename(new_file_path)
-            
-            # Update file record
+        if old_filename and new_filename != old_filename:
             file_record = db.query(InvoiceFile).filter(
                 InvoiceFile.invoice_id == invoice_id,
                 InvoiceFile.file_name == old_filename
             ).first()
-            if file_record:
+            
+            if file_record and file_record.sha256:
+                # Content-addressed files keep their storage path; only the display name changes
                 file_record.file_name = new_filename
-                file_record.file_path = str(new_file_path)
+            elif old_file_path and Path(old_file_path).exists():
+                # Legacy files stored by name are renamed on disk
+                new_file_path = UPLOAD_FOLDER / new_filename
+                Path(old_file_path).rename(new_file_path)
+                if file_record:
+                    file_record.file_name = new_filename
+                    file_record.file_path = str(new_file_path)
         
         # Update invoice fields
         if invoice_data.merchant_name is not None:
@@ -432,6 +428,7 @@ async def update_invoice(invoice_id: int, invoice_data: InvoiceUpdate, db: Sessi
                     documentation=item_data.documentation,
                     condition=item_data.condition,
                     paid_by=item_data.paid_by,
+                    item_type=item_data.item_type,
                     used_date=parse_date(item_data.used_date),
                     expiration_date=parse_date(item_data.expiration_date)
                 )
@@ -474,32 +471,67 @@ async def update_invoice(invoice_id: int, invoice_data: InvoiceUpdate, db: Sessi
             }
         )
         
+        db.flush()
+        refresh_search_vector(db, [invoice_id])
+        add_to_rollups(db, [invoice_id])
+        
         db.commit()
         return {"message": "Invoice updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def resolve_file_path(db: Session, filename: str) -> Optional[Path]:
+    """Find the stored file for a display name, falling back to legacy files stored by name."""
+    file_record = db.query(InvoiceFile).filter(
+        InvoiceFile.file_name == filename,
+        InvoiceFile.file_path.isnot(None)
+    ).order_by(InvoiceFile.file_id.desc()).first()
+    if file_record and Path(file_record.file_path).exists():
+        return Path(file_record.file_path)
+    
+    legacy_path = UPLOAD_FOLDER / Path(filename).name
+    if legacy_path.exists():
+        return legacy_path
+    return None
+
+
 @router.get("/uploads/{filename}")
-async def get_uploaded_file(filename: str):
+async def get_uploaded_file(filename: str, db: Session = Depends(get_db)):
     """Return the file if it exists, else a 200 with a message that no file is available."""
-    file_path = UPLOAD_FOLDER / filename
-    if not Path(file_path).exists():
+    file_path = resolve_file_path(db, filename)
+    if file_path is None:
         return JSONResponse(content={"detail": "No file available"}, status_code=200)
     
     return FileResponse(file_path, filename=filename)
 
 
 @router.get("/download/{filename}")
-def download_invoice(filename: str):
+def download_invoice(filename: str, db: Session = Depends(get_db)):
     """Download the file if it exists, else 404."""
-    file_path = UPLOAD_FOLDER / filename
-    if Path(file_path).exists():
+    file_path = resolve_file_path(db, filename)
+    if file_path is not None:
         return FileResponse(file_path, filename=filename)
     
     return JSONResponse(content={"detail": "File not found"}, status_code=404)
 
 
+@router.head("/files/by-hash/{sha256}")
+async def head_file_by_hash(sha256: str, db: Session = Depends(get_db)):
+    """Tell clients whether the server already stores these bytes (200) or not (404)."""
+    sha256 = sha256.lower()
+    if not is_sha256(sha256):
+        return Response(status_code=400)
+    
+    blob = get_blob(db, sha256)
+    if blob is None:
+        return Response(status_code=404)
+    
+    return Response(status_code=200, headers={"Content-Length": str(blob.size_bytes), "ETag": f'"{blob.sha256}"'})
+
+
 @router.delete("/delete/{invoice_id}")
 async def delete_invoice(invoice_id: int, db: Session = Depends(get_db), user_id: int = 1):
     """Soft delete an invoice record."""
@@ -516,6 +548,7 @@ async def delete_invoice(invoice_id: int, db: Session = Depends(get_db), user_id
         invoice.order_number = None
         
         # Soft delete
+        remove_from_rollups(db, [invoice_id])
         invoice.is_deleted = True
         
         # Log audit
@@ -547,11 +580,18 @@ async def delete_invoice_permanent(invoice_id: int, db: Session = Depends(get_db
         # Get file information
         filename = invoice.file_name
         
-        # Delete the associated files from disk
+        # Release content-addressed blobs (their files go once the commit
+        # leaves them unreferenced); legacy files are removed after the commit
+        legacy_paths = []
         for file_record in invoice.files:
-            file_path = file_record.file_path
-            if file_path and Path(file_path).exists():
-                Path(file_path).unlink()
+            if file_record.sha256:
+                sha256 = file_record.sha256
+                db.delete(file_record)
+                db.flush()
+                release_blob(db, sha256)
+            elif file_record.file_path and Path(file_record.file_path).exists():
+                legacy_paths.append(Path(file_record.file_path))
+                db.delete(file_record)
         
         # Log audit
         log_audit(
@@ -564,47 +604,17 @@ async def delete_invoice_permanent(invoice_id: int, db: Session = Depends(get_db
         )
         
         # Hard delete the record (cascade will handle related records)
+        remove_from_rollups(db, [invoice_id])
         db.delete(invoice)
         db.commit()
         
-        return {"message": "Invoice permanently deleted"}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error permanently deleting invoice: {str(e)}")
-
-
-@router.delete("/delete-permanent/{invoice_id}")
-async def delete_invoice_permanent(invoice_id: int, db: Session = Depends(get_db), user_id: int = 1):
-    """Hard delete an invoice record and remove associated files."""
-    try:
-        invoice = db.query(Invoice).filter(Invoice.invoice_id == invoice_id).first()
-        if not invoice:
-            raise HTTPException(status_code=404, detail="Invoice not found")
-        
-        # Get file information
-        filename = invoice.file_name
-        
-        # Delete the associated files from disk
-        for file_record in invoice.files:
-            file_path = file_record.file_path
-            if file_path and Path(file_path).exists():
-                Path(file_path).unlink()
-        
-        # Log audit
-        log_audit(
-            db=db,
-            user_id=user_id,
-            action="HARD_DELETE",
-            table_name="invoices",
-            record_id=invoice_id,
-            old_data={"file_name": filename, "merchant_name": invoice.merchant_name}  # Add merchant_name
-        )
-        
-        # Hard delete the record (cascade will handle related records)
-        db.delete(invoice)
-        db.commit()
+        for path in legacy_paths:
+            path.unlink(missing_ok=True)
         
         return {"message": "Invoice permanently deleted"}
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error permanently deleting invoice: {str(e)}")
@@ -642,6 +652,12 @@ async def delete_category(category_name: str, db: Session = Depends(get_db), use
         transaction = db.begin_nested()
         
         try:
+            # Invoices in this category move to another category (or Uncategorized) in the rollups
+            affected_ids = [row[0] for row in db.query(InvoiceCategory.invoice_id).filter(
+                InvoiceCategory.category_id == category.category_id
+            )]
+            remove_from_rollups(db, affected_ids)
+            
             # First, remove all references to this category in the junction table
             junction_count = db.query(InvoiceCategory).filter(
                 InvoiceCategory.category_id == category.category_id
@@ -649,6 +665,7 @@ async def delete_category(category_name: str, db: Session = Depends(get_db), use
             
             # Then delete the category itself
             db.delete(category)
+            add_to_rollups(db, affected_ids)
             
             # Log the action
             log_audit(
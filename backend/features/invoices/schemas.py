@@ -1,5 +1,5 @@
 # backend/schemas/invoice.py
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -93,4 +93,31 @@ class InvoiceUpdate(BaseModel):
     categories: Optional[List[str]] = None
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class InvoiceFilterParams(BaseModel):
+    """Query parameters accepted by the invoice list and facet endpoints.
+    
+    List-valued filters (status, tag, category, payment_method) accept
+    comma-separated values, e.g. ``status=Open,Paid``.
+    """
+    user_id: Optional[int] = None
+    status: Optional[str] = None
+    merchant: Optional[str] = None
+    payment_method: Optional[str] = None
+    tag: Optional[str] = None
+    category: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    min_total: Optional[float] = None
+    max_total: Optional[float] = None
+    q: Optional[str] = None
+    sort_by: str = "date"
+    sort_order: str = "desc"
+
+
+class InvoiceFacetsResponse(BaseModel):
+    total: int
+    status: Dict[str, int] = {}
+    tags: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
@@ -0,0 +1,425 @@
+# features/invoices/services.py
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import sqlalchemy as sa
+from sqlalchemy.orm import Session, Query, load_only, selectinload, noload
+
+from features.invoices.models import Invoice, InvoiceFile, FileBlob, Tag, InvoiceTag, Category, InvoiceCategory
+from features.invoices.schemas import InvoiceFilterParams
+from features.ocr.services import extract_text_from_file, clean_ocr_text
+from features.search.services import refresh_search_vector
+from features.expenses.rollups import add_to_rollups
+from features.duplicates.services import (
+    find_duplicates_of_invoice, get_invoice_by_order_number, set_file_phash, find_similar_files
+)
+from features.duplicates.phash import compute_file_hash
+from utils.helpers import parse_date, get_or_create_tag, get_or_create_category, add_status_history
+from utils.audit import log_audit
+
+# Sort keys exposed to clients, mapped to indexed invoice columns
+SORT_COLUMNS = {
+    "date": Invoice.purchase_date,
+    "total": Invoice.grand_total,
+    "merchant": Invoice.merchant_name,
+    "status": Invoice.status,
+    "payment_method": Invoice.payment_method,
+    "created": Invoice.created_at,
+}
+
+# Scalar fields of InvoiceResponse, in response order
+INVOICE_FIELDS = [
+    "invoice_id", "user_id", "file_name", "merchant_name", "order_number",
+    "purchase_date", "payment_method", "grand_total", "status", "notes",
+    "shipping_handling", "estimated_tax", "total_before_tax", "billing_address",
+    "credit_card_transactions", "gift_card_amount", "refunded_amount", "created_at",
+]
+
+# Relationships that can be embedded with include=
+INVOICE_RELATIONS = {
+    "items": Invoice.items,
+    "tags": Invoice.tags,
+    "categories": Invoice.categories,
+}
+
+
+def split_csv(value: Optional[str]) -> List[str]:
+    """Split a comma-separated query value into a list of non-empty strings."""
+    if not value:
+        return []
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def invoice_filter_conditions(filters: InvoiceFilterParams) -> List:
+    """Translate invoice list filters into SQL predicates on the invoices table."""
+    conditions = [Invoice.is_deleted == False]
+
+    if filters.user_id:
+        conditions.append(Invoice.user_id == filters.user_id)
+
+    statuses = split_csv(filters.status)
+    if statuses:
+        conditions.append(Invoice.status.in_(statuses))
+
+    if filters.merchant:
+        conditions.append(Invoice.merchant_name == filters.merchant)
+
+    payment_methods = split_csv(filters.payment_method)
+    if payment_methods:
+        conditions.append(Invoice.payment_method.in_(payment_methods))
+
+    date_from = parse_date(filters.date_from)
+    if filters.date_from and not date_from:
+        raise ValueError(f"Invalid date_from: {filters.date_from}")
+    if date_from:
+        conditions.append(Invoice.purchase_date >= date_from)
+
+    date_to = parse_date(filters.date_to)
+    if filters.date_to and not date_to:
+        raise ValueError(f"Invalid date_to: {filters.date_to}")
+    if date_to:
+        conditions.append(Invoice.purchase_date <= date_to)
+
+    if filters.min_total is not None:
+        conditions.append(Invoice.grand_total >= filters.min_total)
+
+    if filters.max_total is not None:
+        conditions.append(Invoice.grand_total <= filters.max_total)
+
+    # Tag and category filters use EXISTS so an invoice matching several
+    # values is returned once and no DISTINCT is needed
+    tags = split_csv(filters.tag)
+    if tags:
+        conditions.append(
+            sa.exists()
+            .where(InvoiceTag.invoice_id == Invoice.invoice_id)
+            .where(InvoiceTag.tag_id == Tag.tag_id)
+            .where(Tag.tag_name.in_(tags))
+        )
+
+    categories = split_csv(filters.category)
+    if categories:
+        conditions.append(
+            sa.exists()
+            .where(InvoiceCategory.invoice_id == Invoice.invoice_id)
+            .where(InvoiceCategory.category_id == Category.category_id)
+            .where(Category.category_name.in_(categories))
+        )
+
+    if filters.q:
+        # Each column has a trigram index, so the OR becomes a BitmapOr of
+        # index scans for patterns of three or more characters. % and _ in
+        # the search text match literally.
+        term = filters.q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{term}%"
+        conditions.append(sa.or_(
+            Invoice.merchant_name.ilike(pattern, escape="\\"),
+            Invoice.order_number.ilike(pattern, escape="\\"),
+            Invoice.notes.ilike(pattern, escape="\\"),
+        ))
+
+    return conditions
+
+
+def apply_invoice_sort(query: Query, filters: InvoiceFilterParams) -> Query:
+    """Order an invoice query by the requested sort key, with a stable tie-breaker."""
+    column = SORT_COLUMNS.get(filters.sort_by)
+    if column is None:
+        raise ValueError(f"Invalid sort_by '{filters.sort_by}'. Expected one of: {', '.join(SORT_COLUMNS)}")
+
+    if filters.sort_order not in ("asc", "desc"):
+        raise ValueError("sort_order must be 'asc' or 'desc'")
+
+    if filters.sort_order == "asc":
+        return query.order_by(column.asc(), Invoice.invoice_id.asc())
+    return query.order_by(column.desc(), Invoice.invoice_id.desc())
+
+
+def get_invoice_facets(db: Session, filters: InvoiceFilterParams) -> Dict:
+    """Count invoices per status, tag and category for the current filter in one query."""
+    filtered = (
+        sa.select(Invoice.invoice_id, Invoice.status)
+        .where(*invoice_filter_conditions(filters))
+        .cte("filtered_invoices")
+    )
+
+    total_counts = sa.select(
+        sa.literal("total").label("facet"),
+        sa.literal(None, sa.String).label("value"),
+        sa.func.count().label("count"),
+    ).select_from(filtered)
+
+    status_counts = (
+        sa.select(
+            sa.literal("status").label("facet"),
+            filtered.c.status.label("value"),
+            sa.func.count().label("count"),
+        )
+        .group_by(filtered.c.status)
+    )
+
+    tag_counts = (
+        sa.select(
+            sa.literal("tags").label("facet"),
+            Tag.tag_name.label("value"),
+            sa.func.count().label("count"),
+        )
+        .select_from(filtered)
+        .join(InvoiceTag, InvoiceTag.invoice_id == filtered.c.invoice_id)
+        .join(Tag, Tag.tag_id == InvoiceTag.tag_id)
+        .group_by(Tag.tag_name)
+    )
+
+    category_counts = (
+        sa.select(
+            sa.literal("categories").label("facet"),
+            Category.category_name.label("value"),
+            sa.func.count().label("count"),
+        )
+        .select_from(filtered)
+        .join(InvoiceCategory, InvoiceCategory.invoice_id == filtered.c.invoice_id)
+        .join(Category, Category.category_id == InvoiceCategory.category_id)
+        .group_by(Category.category_name)
+    )
+
+    facets = {"total": 0, "status": {}, "tags": {}, "categories": {}}
+    rows = db.execute(sa.union_all(total_counts, status_counts, tag_counts, category_counts))
+    for facet, value, count in rows:
+        if facet == "total":
+            facets["total"] = count
+        else:
+            facets[facet][value or "Unknown"] = count
+
+    return facets
+
+
+def parse_projection(fields: Optional[str], include: Optional[str]) -> Tuple[List[str], Set[str]]:
+    """Resolve fields=/include= query values into invoice columns and relationships.
+    
+    Without either parameter the full invoice is returned. Relationship names
+    listed in ``fields`` are treated as if they had been passed in ``include``.
+    """
+    if not fields and not include:
+        return list(INVOICE_FIELDS), set(INVOICE_RELATIONS)
+
+    requested = split_csv(fields)
+    includes = set(split_csv(include)) | {name for name in requested if name in INVOICE_RELATIONS}
+
+    unknown_relations = includes - set(INVOICE_RELATIONS)
+    if unknown_relations:
+        raise ValueError(f"Unknown include: {', '.join(sorted(unknown_relations))}. Expected any of: {', '.join(INVOICE_RELATIONS)}")
+
+    columns = [name for name in requested if name not in INVOICE_RELATIONS]
+    unknown_columns = set(columns) - set(INVOICE_FIELDS)
+    if unknown_columns:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown_columns))}")
+
+    if not requested:
+        columns = list(INVOICE_FIELDS)
+    elif "invoice_id" not in columns:
+        # The primary key is always returned so clients can address the row
+        columns.insert(0, "invoice_id")
+
+    return columns, includes
+
+
+def apply_projection(query: Query, columns: List[str], includes: Set[str]) -> Query:
+    """Load only the requested invoice columns and eager-load only the requested relationships."""
+    options = [load_only(*[getattr(Invoice, name) for name in columns])]
+    for name, relation in INVOICE_RELATIONS.items():
+        options.append(selectinload(relation) if name in includes else noload(relation))
+    return query.options(*options)
+
+
+def serialize_invoice_item(item) -> Dict[str, Any]:
+    """Map an InvoiceItem row to a dict ready for core.serialization.dumps."""
+    return {
+        "product_name": item.product_name,
+        "quantity": item.quantity,
+        "unit_price": item.unit_price if item.unit_price is not None else 0,
+        "product_link": item.product_link,
+        "documentation": item.documentation,
+        "condition": item.condition,
+        "paid_by": item.paid_by,
+        "used_date": item.used_date,
+        "expiration_date": item.expiration_date,
+        "item_type": item.item_type,
+    }
+
+
+def serialize_invoice(invoice: Invoice, columns: List[str], includes: Set[str]) -> Dict[str, Any]:
+    """Map an Invoice row to a dict holding only the projected fields.
+    
+    Values are left as Decimal/date/datetime; the orjson encoder in
+    core.serialization converts them in a single pass.
+    """
+    data = {name: getattr(invoice, name) for name in columns}
+
+    if "items" in includes:
+        data["items"] = [serialize_invoice_item(item) for item in invoice.items]
+    if "tags" in includes:
+        data["tags"] = [tag.tag_name for tag in invoice.tags]
+    if "categories" in includes:
+        data["categories"] = [category.category_name for category in invoice.categories]
+
+    return data
+
+
+@dataclass
+class FileAnalysis:
+    """Result of the database-free OCR, template and perceptual-hash work on one file."""
+    ocr_text: Optional[str] = None
+    phash: Optional[int] = None
+    template_name: Optional[str] = None
+    extracted_data: Optional[Dict[str, Any]] = None
+
+
+def analyze_invoice_file(file_path: str, templates: Optional[List[Tuple[str, Dict]]] = None) -> FileAnalysis:
+    """Run OCR/template extraction (when templates are given) and perceptual hashing on a file.
+    
+    Touches no database session, so bulk ingestion can run it on worker
+    threads; the slow parts (tesseract, poppler) run as subprocesses.
+    """
+    # Imported here: the templates feature depends on invoice models
+    from features.templates.services import select_best_template, process_with_template
+    
+    analysis = FileAnalysis()
+    
+    if templates is not None:
+        # Run OCR once: keep the raw text for search, match templates on the cleaned text
+        analysis.ocr_text = extract_text_from_file(file_path, clean=False)
+        text = clean_ocr_text(analysis.ocr_text)
+        
+        # Try to find a matching template
+        matching_template = select_best_template(((template, template[1]) for template in templates), text)
+        
+        if matching_template:
+            name, template_data = matching_template
+            result = process_with_template(file_path, template_data, text=text)
+            if result["success"]:
+                analysis.template_name = name
+                analysis.extracted_data = result["extracted_data"]
+    
+    analysis.phash = compute_file_hash(file_path)
+    return analysis
+
+
+def create_invoice_from_file(
+    db: Session,
+    blob: FileBlob,
+    filename: str,
+    user_id: int = 1,
+    category: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    use_templates: bool = False,
+    analysis: Optional[FileAnalysis] = None
+) -> Dict[str, Any]:
+    """Create an invoice for a stored file and return the upload response.
+    
+    Shared by the direct upload endpoint and the ingest paths (resumable
+    uploads, bulk batches etc.). Pass a precomputed ``analysis`` to skip the
+    OCR/template step; otherwise it runs inline. Flags duplicates and
+    near-duplicate scans, and flushes without committing.
+    """
+    # Imported here: the templates feature depends on invoice models
+    from features.templates.services import load_active_templates, update_invoice_with_extracted_data
+    
+    file_path = Path(blob.storage_path)
+    
+    if analysis is None:
+        templates = load_active_templates(db) if use_templates else None
+        analysis = analyze_invoice_file(str(file_path), templates)
+    
+    # Create a new invoice record
+    new_invoice = Invoice(
+        user_id=user_id,
+        file_name=filename,
+        merchant_name=os.path.splitext(filename)[0],  # Use filename as default merchant name
+        status="Open"
+    )
+    db.add(new_invoice)
+    db.flush()
+    
+    # Add invoice file record
+    invoice_file = InvoiceFile(
+        invoice_id=new_invoice.invoice_id,
+        file_name=filename,
+        file_path=str(file_path),
+        sha256=blob.sha256,
+        ocr_text=analysis.ocr_text
+    )
+    db.add(invoice_file)
+    
+    # Add tags if provided
+    for tag_name in tags or []:
+        tag = get_or_create_tag(db, tag_name)
+        new_invoice.tags.append(tag)
+    
+    # Add category if provided
+    if category:
+        cat = get_or_create_category(db, category)
+        new_invoice.categories.append(cat)
+    
+    # Add status history
+    add_status_history(db, new_invoice.invoice_id, new_invoice.status)
+    
+    # Update the invoice with data extracted by a matching template
+    if analysis.extracted_data:
+        update_invoice_with_extracted_data(new_invoice, analysis.extracted_data, db)
+    
+    # Look for likely duplicates of what was extracted
+    duplicates = find_duplicates_of_invoice(db, new_invoice)
+    
+    # Look for earlier scans of the same paper document
+    near_duplicates = []
+    if analysis.phash is not None:
+        set_file_phash(invoice_file, analysis.phash)
+        near_duplicates = find_similar_files(db, analysis.phash, user_id=user_id, exclude_invoice_id=new_invoice.invoice_id)
+    
+    # An extracted order number that already exists would violate the unique
+    # constraint, so park the invoice for review instead of failing the upload
+    conflict = get_invoice_by_order_number(db, new_invoice.order_number, exclude_invoice_id=new_invoice.invoice_id)
+    if conflict:
+        new_invoice.notes = f"Possible duplicate of invoice #{conflict.invoice_id} (order number {new_invoice.order_number})"
+        new_invoice.order_number = None
+        new_invoice.status = "Needs Attention"
+        add_status_history(db, new_invoice.invoice_id, new_invoice.status)
+    
+    # Log audit
+    log_audit(
+        db=db,
+        user_id=user_id,
+        action="UPLOAD",
+        table_name="invoices",
+        record_id=new_invoice.invoice_id,
+        new_data={
+            "file_name": filename,
+            "merchant_name": new_invoice.merchant_name,
+            "status": new_invoice.status
+        }
+    )
+    
+    # Index merchant, items and OCR text for full-text search
+    db.flush()
+    refresh_search_vector(db, [new_invoice.invoice_id])
+    add_to_rollups(db, [new_invoice.invoice_id])
+    
+    # Return information about template usage if applicable
+    response_data = {
+        "message": "File uploaded successfully",
+        "invoice_id": new_invoice.invoice_id,
+        "filename": filename,
+        "sha256": blob.sha256
+    }
+    
+    if analysis.template_name:
+        response_data["template_used"] = analysis.template_name
+    
+    if duplicates:
+        response_data["duplicates"] = duplicates
+    
+    if near_duplicates:
+        response_data["near_duplicates"] = near_duplicates
+    
+    return response_data
@@ -2,9 +2,9 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from typing import Optional
-import tempfile
 import os
 
+from utils.storage import save_upload
 from .schemas import OcrOptions, OcrResponse, LanguageResponse
 from .services import process_pdf_with_ocr, get_available_languages
 
@@ -36,11 +36,8 @@ async def extract_text_from_pdf(
             page_range=[page_start, page_end] if page_start is not None else None
         )
         
-        # Create temporary file to store the uploaded PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp:
-            temp_path = temp.name
-            content = await file.read()
-            temp.write(content)
+        # Stream the uploaded PDF to a temporary file
+        temp_path = str((await save_upload(file)).path)
         
         # Extract text using OCR
         try:
@@ -54,6 +51,8 @@ async def extract_text_from_pdf(
         
         return {"text": extracted_text}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OCR processing error: {str(e)}")
 
@@ -8,8 +8,12 @@ from pdf2image import convert_from_path
 from typing import List, Dict, Optional, Union
 
 # Ensure the OCR function correctly identifies file types
-def extract_text_from_file(file_path: str) -> str:
-    """Extract text content from a file (PDF or image) with enhanced preprocessing."""
+def extract_text_from_file(file_path: str, clean: bool = True) -> str:
+    """Extract text content from a file (PDF or image) with enhanced preprocessing.
+    
+    With ``clean=False`` the raw OCR output is returned, without the
+    lowercasing and digit substitutions that template matching relies on.
+    """
     try:
         # Add debugging output
         print(f"Extracting text from: {file_path}")
@@ -17,10 +21,10 @@ def extract_text_from_file(file_path: str) -> str:
         
         # Check if it's a PDF
         if file_path.lower().endswith('.pdf'):
-            return extract_text_from_pdf(file_path)
+            return extract_text_from_pdf(file_path, clean)
         # Check if it's an image
         elif file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-            return extract_text_from_image(file_path)
+            return extract_text_from_image(file_path, clean)
         else:
             print(f"Unsupported file type: {file_path}")
             return ""
@@ -31,7 +35,7 @@ def extract_text_from_file(file_path: str) -> str:
         return ""
 
 # Make sure PDF processing works correctly
-def extract_text_from_pdf(pdf_path: str) -> str:
+def extract_text_from_pdf(pdf_path: str, clean: bool = True) -> str:
     """Extract text from a PDF file using OCR with improved preprocessing."""
     # Create a temporary directory for extracted images
     with tempfile.TemporaryDirectory() as temp_dir:
@@ -59,14 +63,13 @@ def extract_text_from_pdf(pdf_path: str) -> str:
             text += f"\n\n----- Page {i+1} -----\n\n{page_text}"
         
         # Clean up the combined text
-        cleaned_text = clean_ocr_text(text)
-        return cleaned_text
+        return clean_ocr_text(text) if clean else text
 
 
-def extract_text_from_image(image_path: str) -> str:
+def extract_text_from_image(image_path: str, clean: bool = True) -> str:
     """Extract text from an image file using OCR with improved preprocessing."""
     text = preprocess_and_extract_text(image_path)
-    return clean_ocr_text(text)
+    return clean_ocr_text(text) if clean else text
 
 
 def preprocess_and_extract_text(image_path: str) -> str:
@@ -43,4 +43,9 @@ class Payment(Base):
     
     # Relationships
     invoice = relationship("Invoice", back_populates="payments")
-    card_number = relationship("CardNumber", back_populates="payments")
\ No newline at end of file
+    card_number = relationship("CardNumber", back_populates="payments")
+    
+    # Payments of an invoice
+    __table_args__ = (
+        sa.Index("ix_payments_invoice", "invoice_id"),
+    )
\ No newline at end of file
@@ -0,0 +1 @@
+"""Full-text search feature over invoices, line items and OCR text."""
\ No newline at end of file
@@ -0,0 +1,31 @@
+# features/search/router.py
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from core.serialization import FastJSONResponse
+from features.search.schemas import SearchResponse
+from features.search.services import search_invoices
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1),
+    user_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(20, le=100),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over merchant, order number, notes, item names and OCR text."""
+    try:
+        results = search_invoices(db, q, user_id=user_id, skip=skip, limit=limit)
+        return FastJSONResponse({"query": q, "results": results})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
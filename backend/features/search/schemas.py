@@ -0,0 +1,22 @@
+# features/search/schemas.py
+from typing import List, Optional
+from datetime import date
+from pydantic import BaseModel, ConfigDict
+
+
+class SearchHit(BaseModel):
+    invoice_id: int
+    merchant_name: Optional[str] = None
+    order_number: Optional[str] = None
+    purchase_date: Optional[date] = None
+    grand_total: Optional[float] = None
+    status: Optional[str] = None
+    rank: float
+    highlight: Optional[str] = None  # Matching fragments wrapped in <mark> tags
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
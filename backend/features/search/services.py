@@ -0,0 +1,145 @@
+# features/search/services.py
+from typing import Dict, Iterable, List, Optional
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from core.serialization import rows_to_dicts
+from features.invoices.models import Invoice, InvoiceItem, InvoiceFile
+
+# Text search configuration used for both indexing and querying
+SEARCH_CONFIG = "english"
+
+# Options passed to ts_headline when highlighting matches
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=25, MinWords=8, MaxFragments=2"
+
+
+def _item_names(invoice_id_column):
+    """Correlated subquery concatenating the product names of an invoice."""
+    return (
+        sa.select(sa.func.string_agg(InvoiceItem.product_name, " "))
+        .where(InvoiceItem.invoice_id == invoice_id_column)
+        .scalar_subquery()
+    )
+
+
+def _ocr_text(invoice_id_column):
+    """Correlated subquery concatenating the OCR text of an invoice's files."""
+    return (
+        sa.select(sa.func.string_agg(InvoiceFile.ocr_text, " "))
+        .where(InvoiceFile.invoice_id == invoice_id_column)
+        .scalar_subquery()
+    )
+
+
+def _weighted(text, weight: str, config: str = SEARCH_CONFIG):
+    return sa.func.setweight(sa.func.to_tsvector(config, sa.func.coalesce(text, "")), weight)
+
+
+def search_vector_expression():
+    """tsvector over merchant/order number (A), item names (B), notes (C) and OCR text (D)."""
+    return (
+        _weighted(Invoice.merchant_name, "A")
+        .op("||")(_weighted(Invoice.order_number, "A", "simple"))
+        .op("||")(_weighted(_item_names(Invoice.invoice_id), "B"))
+        .op("||")(_weighted(Invoice.notes, "C"))
+        .op("||")(_weighted(_ocr_text(Invoice.invoice_id), "D"))
+    )
+
+
+def refresh_search_vector(db: Session, invoice_ids: Iterable[int]) -> None:
+    """Recompute the search vector of the given invoices.
+
+    Call after flushing changes to an invoice, its items or its files.
+    """
+    invoice_ids = [invoice_id for invoice_id in invoice_ids if invoice_id is not None]
+    if not invoice_ids:
+        return
+    db.execute(
+        sa.update(Invoice)
+        .where(Invoice.invoice_id.in_(invoice_ids))
+        # Keep updated_at as-is: reindexing is not a user-visible change
+        .values(search_vector=search_vector_expression(), updated_at=Invoice.updated_at)
+        # ...and leaves cached expense results valid
+        .execution_options(synchronize_session=False, expense_cache_neutral=True)
+    )
+
+
+def rebuild_search_index(db: Session, batch_size: int = 1000) -> int:
+    """Recompute search vectors for every invoice in batches; returns the number of invoices updated."""
+    updated = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in db.execute(
+            sa.select(Invoice.invoice_id)
+            .where(Invoice.invoice_id > last_id)
+            .order_by(Invoice.invoice_id)
+            .limit(batch_size)
+        )]
+        if not ids:
+            break
+        refresh_search_vector(db, ids)
+        db.commit()
+        updated += len(ids)
+        last_id = ids[-1]
+    return updated
+
+
+def search_invoices(
+    db: Session,
+    query_text: str,
+    user_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> List[Dict]:
+    """Rank invoices matching a web-style query and highlight the matching text.
+
+    Matching and ranking run against the GIN-indexed search vector; the
+    comparatively expensive ts_headline is only evaluated for the page of
+    results being returned.
+    """
+    ts_query = sa.func.websearch_to_tsquery(SEARCH_CONFIG, query_text)
+    rank = sa.func.ts_rank_cd(Invoice.search_vector, ts_query)
+
+    conditions = [Invoice.is_deleted == False, Invoice.search_vector.op("@@")(ts_query)]
+    if user_id:
+        conditions.append(Invoice.user_id == user_id)
+
+    page = (
+        sa.select(
+            Invoice.invoice_id,
+            Invoice.merchant_name,
+            Invoice.order_number,
+            Invoice.purchase_date,
+            Invoice.grand_total,
+            Invoice.status,
+            Invoice.notes,
+            rank.label("rank"),
+        )
+        .where(*conditions)
+        .order_by(rank.desc(), Invoice.invoice_id.desc())
+        .offset(skip)
+        .limit(limit)
+        .subquery("page")
+    )
+
+    document = sa.func.concat_ws(
+        " ",
+        page.c.merchant_name,
+        page.c.order_number,
+        _item_names(page.c.invoice_id),
+        page.c.notes,
+        _ocr_text(page.c.invoice_id),
+    )
+
+    statement = sa.select(
+        page.c.invoice_id,
+        page.c.merchant_name,
+        page.c.order_number,
+        page.c.purchase_date,
+        page.c.grand_total,
+        page.c.status,
+        page.c.rank,
+        sa.func.ts_headline(SEARCH_CONFIG, document, ts_query, HEADLINE_OPTIONS).label("highlight"),
+    ).order_by(page.c.rank.desc(), page.c.invoice_id.desc())
+
+    return rows_to_dicts(db.execute(statement))
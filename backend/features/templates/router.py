@@ -10,7 +10,9 @@ import json
 import tempfile
 import logging
 
+from core.config import MAX_TEMPLATE_IMPORT_SIZE
 from core.database import get_db
+from core.serialization import model_response
 from features.templates.models import InvoiceTemplate, TemplateTestResult
 from features.invoices.models import Invoice, InvoiceFile
 from features.templates.schemas import (
@@ -21,7 +23,8 @@ from features.templates.schemas import (
     TemplateTestResponse
 )
 from features.templates.services import process_with_template, extract_text_from_file
-from features.ocr.services import extract_text_from_file as ocr_extract_text
+from features.ocr.services import extract_text_from_file as ocr_extract_text, clean_ocr_text
+from utils.storage import save_upload
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -48,7 +51,7 @@ async def get_templates(
         query = query.filter(InvoiceTemplate.is_active == True)
         
     templates = query.offset(skip).limit(limit).all()
-    return templates
+    return model_response(List[TemplateResponse], templates)
 
 
 @router.get("/{template_id}", response_model=TemplateResponse)
@@ -161,11 +164,14 @@ async def import_template(
 ):
     """Import a template from a JSON file."""
     try:
-        content = await file.read()
+        streamed = await save_upload(file, max_bytes=MAX_TEMPLATE_IMPORT_SIZE)
         try:
-            template_data = json.loads(content)
+            with open(streamed.path, "rb") as template_file:
+                template_data = json.load(template_file)
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON file")
+        finally:
+            streamed.path.unlink(missing_ok=True)
         
         # Validate template structure
         if "name" not in template_data:
@@ -258,11 +264,14 @@ async def test_template(
         
         logger.info(f"Testing template '{template.name}' on invoice {invoice.invoice_id} (file: {invoice_file.file_path})")
         
-        # Extract the raw text first for debugging
-        raw_text = ocr_extract_text(invoice_file.file_path)
+        # Reuse OCR text persisted at upload time, otherwise extract it now
+        if invoice_file.ocr_text:
+            raw_text = clean_ocr_text(invoice_file.ocr_text)
+        else:
+            raw_text = ocr_extract_text(invoice_file.file_path)
         
         # Process the invoice with the template
-        result = process_with_template(invoice_file.file_path, template.template_data)
+        result = process_with_template(invoice_file.file_path, template.template_data, text=raw_text)
         
         # Log the result for debugging
         logger.info(f"Template test result: Match score: {result['match_score']:.2f}, Fields matched: {result['fields_matched']}/{result['fields_total']}")
@@ -324,18 +333,15 @@ async def test_template_with_file(
         if not template:
             raise HTTPException(status_code=404, detail="Template not found")
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp:
-            temp_path = temp.name
-            content = await file.read()
-            temp.write(content)
+        # Stream the uploaded file to a temporary path
+        temp_path = str((await save_upload(file)).path)
         
         try:
             # Extract raw text for debugging
             raw_text = ocr_extract_text(temp_path)
             
             # Process the file with the template
-            result = process_with_template(temp_path, template.template_data)
+            result = process_with_template(temp_path, template.template_data, text=raw_text)
             
             # Log the result
             logger.info(f"Template test result: Match score: {result['match_score']:.2f}, Fields matched: {result['fields_matched']}/{result['fields_total']}")
@@ -348,6 +354,8 @@ async def test_template_with_file(
             # Clean up temporary file
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error testing template with file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -48,10 +48,15 @@ def match_template_to_text(template_data: Dict, text: str) -> float:
     return match_score
 
 
-def process_with_template(file_path: str, template_data: Dict) -> Dict:
-    """Process a document with a template and extract data with improved regex matching."""
+def process_with_template(file_path: str, template_data: Dict, text: Optional[str] = None) -> Dict:
+    """Process a document with a template and extract data with improved regex matching.
+    
+    Pass ``text`` (cleaned OCR output) to reuse text that was already
+    extracted instead of running OCR on the file again.
+    """
     # Extract text from the file
-    text = extract_text_from_file(file_path)
+    if text is None:
+        text = extract_text_from_file(file_path)
     
     logger.info(f"Extracted text from {file_path}: {len(text)} characters")
     
@@ -549,10 +554,42 @@ def update_invoice_with_extracted_data(invoice, extracted_data: Dict, db: Sessio
             invoice.categories.append(category)
 
 
-def find_matching_template(file_path: str, db: Session) -> Optional[Any]:
+# Minimum match score for a template to be applied
+TEMPLATE_MATCH_THRESHOLD = 0.3
+
+
+def select_best_template(candidates, text: str) -> Optional[Any]:
+    """Return the candidate whose template data best matches the text.
+    
+    ``candidates`` yields (candidate, template_data) pairs, so this works on
+    ORM templates as well as plain data handed to worker threads.
+    """
+    best_match = None
+    best_score = 0
+    
+    # Try to match each template
+    for candidate, template_data in candidates:
+        score = match_template_to_text(template_data, text)
+        if score > best_score and score > TEMPLATE_MATCH_THRESHOLD:
+            best_match = candidate
+            best_score = score
+    
+    return best_match
+
+
+def load_active_templates(db: Session) -> List[tuple]:
+    """Active templates as plain (name, template_data) pairs, safe to share across threads."""
+    # Import here to avoid circular imports
+    from features.templates.models import InvoiceTemplate
+    
+    templates = db.query(InvoiceTemplate).filter(InvoiceTemplate.is_active == True).all()
+    return [(template.name, template.template_data) for template in templates]
+
+
+def find_matching_template(file_path: str, db: Session, text: Optional[str] = None) -> Optional[Any]:
     """Find the best matching template for a document."""
     # Extract text from the file
-    extracted_text = extract_text_from_file(file_path)
+    extracted_text = text if text is not None else extract_text_from_file(file_path)
     
     # Import here to avoid circular imports
     from features.templates.models import InvoiceTemplate
@@ -560,14 +597,4 @@ def find_matching_template(file_path: str, db: Session) -> Optional[Any]:
     # Get all active templates
     templates = db.query(InvoiceTemplate).filter(InvoiceTemplate.is_active == True).all()
     
-    best_match = None
-    best_score = 0
-    
-    # Try to match each template
-    for template in templates:
-        score = match_template_to_text(template.template_data, extracted_text)
-        if score > best_score and score > 0.3:  # Lower threshold to 30%
-            best_match = template
-            best_score = score
-    
-    return best_match
\ No newline at end of file
+    return select_best_template(((template, template.template_data) for template in templates), extracted_text)
@@ -2,12 +2,14 @@
 import os
 from pathlib import Path
 from fastapi import FastAPI, Depends
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
 # Import core components
-from core.database import engine, Base, get_db
+from core.database import get_db
+from core.config import API_MAX_REQUEST_SIZE
+from core.middlewares import RequestSizeLimitMiddleware
+from core.schema import upgrade_database
 
 # Import feature routers
 from features.auth.router import router as auth_router
@@ -17,21 +19,23 @@ from features.expenses.router import router as expenses_router
 from features.templates.router import router as templates_router
 from features.ocr.router import router as ocr_router
 from features.wishlist.router import router as wishlist_router
+from features.search.router import router as search_router
+from features.duplicates.router import router as duplicates_router
+from features.ingest.router import router as ingest_router
+from features.analytics.router import router as analytics_router
+from features.dashboard.router import router as dashboard_router
 
-# Create the FastAPI application with increased request size limit
-app = FastAPI(
-    title="Invoice Management System",
-    # Maximum size of a request in bytes (10MB)
-    max_request_size=10 * 1024 * 1024
-)
+# Create the FastAPI application
+app = FastAPI(title="Invoice Management System")
+
+# FastAPI has no request size option, so the limit is enforced by middleware
+app.middleware("http")(RequestSizeLimitMiddleware(API_MAX_REQUEST_SIZE))
 
-# Ensure the upload folder path
+# Ensure the upload folder path (files are served by the invoices router,
+# which resolves display names to content-addressed blobs)
 UPLOAD_FOLDER = Path("uploads")
 UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
 
-# Mount it for static file serving
-app.mount("/uploads", StaticFiles(directory=UPLOAD_FOLDER), name="uploads")
-
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -39,6 +43,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Resumable upload and retrying clients read these from cross-origin responses
+    expose_headers=["Location", "Upload-Offset", "Upload-Length", "Tus-Resumable", "Idempotent-Replayed", "ETag"],
 )
 
 # Include routers from features
@@ -49,12 +55,17 @@ app.include_router(expenses_router)
 app.include_router(templates_router)
 app.include_router(ocr_router)
 app.include_router(wishlist_router)
+app.include_router(search_router)
+app.include_router(duplicates_router)
+app.include_router(ingest_router)
+app.include_router(analytics_router)
+app.include_router(dashboard_router)
 
-# Create tables on startup
+# Migrate the schema on startup
 @app.on_event("startup")
 async def startup_event():
-    # Create all tables in the database
-    Base.metadata.create_all(bind=engine)
+    # Apply pending migrations (alembic/versions)
+    upgrade_database()
     
     # Ensure default user exists
     db = next(get_db())
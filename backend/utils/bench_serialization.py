@@ -0,0 +1,145 @@
+# utils/bench_serialization.py
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import orjson
+import pydantic
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+# Import every model module so SQLAlchemy can resolve relationship targets
+import features.auth.models  # noqa: F401
+import features.payments.models  # noqa: F401
+import features.templates.models  # noqa: F401
+import features.wishlist.models  # noqa: F401
+from features.invoices.models import Invoice, InvoiceItem, Tag, Category
+from features.invoices.schemas import InvoiceResponse, InvoiceItemBase
+from features.invoices.services import INVOICE_FIELDS, INVOICE_RELATIONS, serialize_invoice
+from core.serialization import dumps
+
+
+def build_invoices(count: int, items_per_invoice: int) -> List[Invoice]:
+    """Build transient Invoice objects resembling a page of real data (no database needed)."""
+    rng = random.Random(42)
+    tags = [Tag(tag_name=f"tag-{i}") for i in range(10)]
+    categories = [Category(category_name=f"category-{i}") for i in range(8)]
+    invoices = []
+    for i in range(count):
+        invoice = Invoice(
+            invoice_id=i + 1,
+            user_id=1,
+            file_name=f"receipt-{i}.pdf",
+            merchant_name=rng.choice(["Amazon", "Best Buy", "Newegg", "B&H", "Home Depot"]),
+            order_number=f"ORD-{i:08d}",
+            purchase_date=date(2020, 1, 1) + timedelta(days=rng.randint(0, 1500)),
+            payment_method="Visa",
+            grand_total=Decimal(f"{rng.uniform(5, 900):.2f}"),
+            status="Paid",
+            notes="Bench invoice",
+            shipping_handling=Decimal("4.99"),
+            estimated_tax=Decimal("3.20"),
+            total_before_tax=Decimal("40.00"),
+            billing_address="1 Main St",
+            credit_card_transactions=Decimal("48.19"),
+            gift_card_amount=Decimal("10.00") if i % 4 == 0 else None,
+            refunded_amount=Decimal("0.00"),
+            created_at=datetime(2024, 1, 1, 12, 0, 0),
+        )
+        for j in range(items_per_invoice):
+            invoice.items.append(InvoiceItem(
+                product_name=f"Product {j}",
+                quantity=rng.randint(1, 4),
+                unit_price=Decimal(f"{rng.uniform(1, 200):.2f}"),
+                product_link=f"https://example.com/products/{j}",
+                documentation=f"https://example.com/manuals/{j}.pdf",
+                condition="New",
+                paid_by="Visa",
+                used_date=date(2024, 2, 1) + timedelta(days=j),
+                expiration_date=date(2026, 2, 1) if j % 2 == 0 else None,
+                item_type="Parts",
+            ))
+        invoice.tags.extend(rng.sample(tags, 2))
+        invoice.categories.append(rng.choice(categories))
+        invoices.append(invoice)
+    return invoices
+
+
+def legacy_serialize(invoices: List[Invoice]) -> bytes:
+    """Previous path: build InvoiceResponse field by field as the old get_invoices handler did,
+    then response_model validation + stdlib encoding."""
+    models = [
+        InvoiceResponse(
+            invoice_id=invoice.invoice_id,
+            user_id=invoice.user_id,
+            file_name=invoice.file_name,
+            merchant_name=invoice.merchant_name,
+            order_number=invoice.order_number,
+            purchase_date=invoice.purchase_date.isoformat() if invoice.purchase_date else None,
+            payment_method=invoice.payment_method,
+            grand_total=float(invoice.grand_total) if invoice.grand_total is not None else None,
+            status=invoice.status,
+            notes=invoice.notes,
+            shipping_handling=float(invoice.shipping_handling) if invoice.shipping_handling is not None else None,
+            estimated_tax=float(invoice.estimated_tax) if invoice.estimated_tax is not None else None,
+            total_before_tax=float(invoice.total_before_tax) if invoice.total_before_tax is not None else None,
+            billing_address=invoice.billing_address,
+            credit_card_transactions=float(invoice.credit_card_transactions) if invoice.credit_card_transactions is not None else None,
+            gift_card_amount=float(invoice.gift_card_amount) if invoice.gift_card_amount is not None else None,
+            refunded_amount=float(invoice.refunded_amount) if invoice.refunded_amount is not None else None,
+            created_at=invoice.created_at,
+            items=[
+                InvoiceItemBase(
+                    product_name=item.product_name,
+                    quantity=item.quantity,
+                    unit_price=float(item.unit_price) if item.unit_price is not None else 0,
+                    product_link=item.product_link,
+                    documentation=item.documentation,
+                    condition=item.condition,
+                    paid_by=item.paid_by,
+                    used_date=item.used_date.isoformat() if item.used_date else None,
+                    expiration_date=item.expiration_date.isoformat() if item.expiration_date else None
+                ) for item in invoice.items
+            ],
+            tags=[tag.tag_name for tag in invoice.tags],
+            categories=[category.category_name for category in invoice.categories]
+        ) for invoice in invoices
+    ]
+    validated = TypeAdapter(List[InvoiceResponse]).validate_python(models, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def fast_serialize(invoices: List[Invoice]) -> bytes:
+    """Current path: map rows to dicts and encode once with orjson."""
+    columns, includes = list(INVOICE_FIELDS), set(INVOICE_RELATIONS)
+    return dumps([serialize_invoice(invoice, columns, includes) for invoice in invoices])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark invoice list serialization")
+    parser.add_argument("--invoices", type=int, default=1000, help="Invoices per page")
+    parser.add_argument("--items", type=int, default=3, help="Line items per invoice")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per path")
+    args = parser.parse_args()
+
+    invoices = build_invoices(args.invoices, args.items)
+
+    # Results depend on the library versions; compare them with the pins in requirements.txt
+    print(f"Python {sys.version.split()[0]}, orjson {orjson.__version__}, pydantic {pydantic.VERSION}")
+    for name, func in (("legacy (pydantic + json)", legacy_serialize), ("fast (dict + orjson)", fast_serialize)):
+        payload = func(invoices)
+        best = min(timeit.repeat(lambda: func(invoices), number=1, repeat=args.repeat))
+        print(f"{name:<26} {best * 1000:8.2f} ms  {len(payload) / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# utils/idempotency.py
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import IDEMPOTENCY_KEY_TTL_HOURS
+from core.serialization import FastJSONResponse
+from features.invoices.models import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """SHA-256 over everything that defines a request, so a reused key with different input can be rejected."""
+    payload = json.dumps(jsonable_encoder(parts), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _key_filter(key: str, endpoint: str, user_id: int):
+    return (
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.key == key,
+    )
+
+
+def reserve_idempotency_key(
+    db: Session,
+    key: Optional[str],
+    endpoint: str,
+    user_id: int,
+    fingerprint: str
+) -> Optional[Response]:
+    """Claim an Idempotency-Key for a new request, or return the response stored for it.
+
+    Returns None when the caller should process the request (no key was sent,
+    or the key is new or expired). The reservation is committed right away so
+    a concurrent retry sees it and gets a 409 instead of running twice; a key
+    reused with a different request is rejected with a 422.
+    """
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+    now = datetime.utcnow()
+    db.query(IdempotencyKey).filter(
+        *_key_filter(key, endpoint, user_id), IdempotencyKey.expires_at <= now
+    ).delete(synchronize_session=False)
+    reserved = db.execute(
+        pg_insert(IdempotencyKey)
+        .values(
+            user_id=user_id,
+            endpoint=endpoint,
+            key=key,
+            fingerprint=fingerprint,
+            status="processing",
+            created_at=now,
+            expires_at=now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+        )
+        .on_conflict_do_nothing()
+        .returning(IdempotencyKey.key)
+    ).first()
+    db.commit()
+    if reserved:
+        return None
+
+    record = db.query(IdempotencyKey).filter(*_key_filter(key, endpoint, user_id)).first()
+    if record is not None and record.fingerprint != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    if record is None or record.status != "completed":
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers={"Retry-After": "1"}
+        )
+    return FastJSONResponse(
+        record.response_body,
+        status_code=record.response_status,
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def save_idempotent_response(
+    db: Session,
+    key: Optional[str],
+    endpoint: str,
+    user_id: int,
+    response_data: Any,
+    status_code: int = 200
+) -> None:
+    """Store the response for a reserved key; commits with the caller's transaction."""
+    if key is None:
+        return
+    db.query(IdempotencyKey).filter(*_key_filter(key, endpoint, user_id)).update(
+        {
+            "status": "completed",
+            "response_status": status_code,
+            "response_body": jsonable_encoder(response_data),
+        },
+        synchronize_session=False
+    )
+
+
+def release_idempotency_key(db: Session, key: Optional[str], endpoint: str, user_id: int) -> None:
+    """Drop the reservation of a failed request so a retry runs it again (call after rolling back)."""
+    if key is None:
+        return
+    db.query(IdempotencyKey).filter(
+        *_key_filter(key, endpoint, user_id), IdempotencyKey.status != "completed"
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    """Delete keys past their TTL; returns how many were removed."""
+    removed = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return removed
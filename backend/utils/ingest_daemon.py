@@ -0,0 +1,149 @@
+# utils/ingest_daemon.py
+import argparse
+import os
+import sys
+import logging
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main  # noqa: F401  (registers every model with SQLAlchemy)
+from core.config import (
+    WATCH_FOLDERS, WATCH_SETTLE_SECONDS, WATCH_FORCE_POLLING, INGEST_WORKERS,
+    IMAP_HOST, IMAP_PORT, IMAP_USERNAME, IMAP_PASSWORD, IMAP_MAILBOXES, IMAP_SSL, IMAP_POLL_INTERVAL,
+    WEBDAV_URL, WEBDAV_USERNAME, WEBDAV_PASSWORD, WEBDAV_MAX_CONNECTIONS, WEBDAV_SYNC_INTERVAL
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('ingest_daemon')
+
+
+def add_ingest_options(parser: argparse.ArgumentParser) -> None:
+    """Options describing how ingested files become invoices."""
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--category")
+    parser.add_argument("--tags", help="Comma-separated tags for every ingested invoice")
+    parser.add_argument("--use-templates", action="store_true", help="Run OCR template extraction")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+
+
+def watch_folders(args) -> None:
+    """Ingest invoice files dropped into the watched directories."""
+    from features.ingest.watcher import FolderWatcher
+
+    directories = args.directory or WATCH_FOLDERS
+    if not directories:
+        raise SystemExit("No directories to watch: pass --directory or set WATCH_FOLDERS")
+
+    watcher = FolderWatcher(
+        directories,
+        user_id=args.user_id,
+        category=args.category,
+        tags=args.tags,
+        use_templates=args.use_templates,
+        settle_seconds=args.settle_seconds,
+        force_polling=args.force_polling,
+        workers=args.workers
+    )
+    logger.info(f"Watching {', '.join(str(directory) for directory in watcher.directories)}")
+    watcher.run()
+
+
+def poll_imap(args) -> None:
+    """Ingest PDF attachments of new messages in the configured mailboxes."""
+    from features.ingest.imap import ImapIngestor
+
+    if not args.host or not args.username:
+        raise SystemExit("No IMAP account: pass --host/--username or set IMAP_HOST/IMAP_USERNAME")
+
+    ingestor = ImapIngestor(
+        args.host,
+        args.username,
+        args.password,
+        mailboxes=args.mailbox or IMAP_MAILBOXES,
+        port=args.port,
+        use_ssl=not args.no_ssl,
+        user_id=args.user_id,
+        category=args.category,
+        tags=args.tags,
+        use_templates=args.use_templates,
+        workers=args.workers
+    )
+    if args.once:
+        logger.info(f"Created {ingestor.poll()} invoices from {ingestor.account}")
+    else:
+        logger.info(f"Polling {ingestor.account} every {args.interval}s")
+        ingestor.run(interval=args.interval)
+
+
+def sync_webdav(args) -> None:
+    """Ingest new and changed files from a WebDAV/Nextcloud folder."""
+    from features.ingest.webdav import WebDavSync
+
+    if not args.url:
+        raise SystemExit("No WebDAV folder: pass --url or set WEBDAV_URL")
+
+    sync = WebDavSync(
+        args.url,
+        username=args.username,
+        password=args.password,
+        user_id=args.user_id,
+        category=args.category,
+        tags=args.tags,
+        use_templates=args.use_templates,
+        trust_collection_etags=not args.full_scan,
+        max_connections=args.max_connections,
+        workers=args.workers
+    )
+    if args.once:
+        logger.info(f"Created {sync.sync()} invoices from {sync.source}")
+    else:
+        logger.info(f"Syncing {sync.source} every {args.interval}s")
+        sync.run(interval=args.interval)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Expense Logger ingestion daemons")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    watch = subparsers.add_parser("watch", help="Auto-ingest files dropped into folders")
+    watch.add_argument("--directory", action="append", help="Directory to watch (repeatable; default WATCH_FOLDERS)")
+    watch.add_argument("--settle-seconds", type=float, default=WATCH_SETTLE_SECONDS)
+    watch.add_argument("--force-polling", action="store_true", default=WATCH_FORCE_POLLING,
+                       help="Poll instead of inotify (needed for SMB/NFS shares)")
+    add_ingest_options(watch)
+    watch.set_defaults(func=watch_folders)
+
+    imap = subparsers.add_parser("imap", help="Ingest PDF attachments from IMAP mailboxes")
+    imap.add_argument("--host", default=IMAP_HOST)
+    imap.add_argument("--port", type=int, default=IMAP_PORT)
+    imap.add_argument("--username", default=IMAP_USERNAME)
+    imap.add_argument("--password", default=IMAP_PASSWORD)
+    imap.add_argument("--mailbox", action="append", help="Mailbox to poll (repeatable; default IMAP_MAILBOXES)")
+    imap.add_argument("--no-ssl", action="store_true", default=not IMAP_SSL, help="Plain IMAP, e.g. for a local test server")
+    imap.add_argument("--interval", type=int, default=IMAP_POLL_INTERVAL, help="Seconds between polls")
+    imap.add_argument("--once", action="store_true", help="Poll once and exit (for cron)")
+    add_ingest_options(imap)
+    imap.set_defaults(func=poll_imap)
+
+    webdav = subparsers.add_parser("webdav", help="Sync new and changed files from a WebDAV/Nextcloud folder")
+    webdav.add_argument("--url", default=WEBDAV_URL)
+    webdav.add_argument("--username", default=WEBDAV_USERNAME)
+    webdav.add_argument("--password", default=WEBDAV_PASSWORD)
+    webdav.add_argument("--max-connections", type=int, default=WEBDAV_MAX_CONNECTIONS)
+    webdav.add_argument("--full-scan", action="store_true",
+                        help="List every folder instead of skipping those whose ETag is unchanged")
+    webdav.add_argument("--interval", type=int, default=WEBDAV_SYNC_INTERVAL, help="Seconds between syncs")
+    webdav.add_argument("--once", action="store_true", help="Sync once and exit (for cron)")
+    add_ingest_options(webdav)
+    webdav.set_defaults(func=sync_webdav)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,135 @@
+# utils/maintenance.py
+import argparse
+import os
+import sys
+import logging
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main  # noqa: F401  (registers every model with SQLAlchemy)
+from core.config import RESUMABLE_UPLOAD_TTL_HOURS
+from core.database import SessionLocal
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('maintenance')
+
+
+def migrate(args) -> None:
+    """Apply pending schema migrations (also run by the API on startup)."""
+    from core.schema import upgrade_database
+
+    upgrade_database()
+    logger.info("Database schema is up to date")
+
+
+def reindex_search(args) -> None:
+    """Recompute the full-text search vector of every invoice."""
+    from features.search.services import rebuild_search_index
+
+    db = SessionLocal()
+    try:
+        updated = rebuild_search_index(db, batch_size=args.batch_size)
+        logger.info(f"Reindexed {updated} invoices")
+    finally:
+        db.close()
+
+
+def rebuild_rollups(args) -> None:
+    """Recompute the monthly spend rollups from the invoices."""
+    from features.expenses.rollups import rebuild_rollups as rebuild
+
+    db = SessionLocal()
+    try:
+        rebuild(db, user_id=args.user_id)
+        db.commit()
+        logger.info("Rebuilt monthly spend rollups" + (f" for user {args.user_id}" if args.user_id else ""))
+    finally:
+        db.close()
+
+
+def purge_uploads(args) -> None:
+    """Delete resumable upload sessions idle for longer than the TTL, with their partial data."""
+    from features.ingest.resumable import purge_stale_upload_sessions
+
+    db = SessionLocal()
+    try:
+        purged = purge_stale_upload_sessions(db, max_age_hours=args.max_age_hours)
+        db.commit()
+        logger.info(f"Purged {purged} stale upload sessions")
+    finally:
+        db.close()
+
+
+def purge_idempotency_keys(args) -> None:
+    """Delete stored Idempotency-Key responses past their TTL."""
+    from utils.idempotency import purge_expired_idempotency_keys
+
+    db = SessionLocal()
+    try:
+        logger.info(f"Purged {purge_expired_idempotency_keys(db)} expired idempotency keys")
+    finally:
+        db.close()
+
+
+def purge_expense_cache(args) -> None:
+    """Delete cached expense results that later writes invalidated or that are too old to be requested again."""
+    from features.expenses.cache import purge_stale_results
+
+    db = SessionLocal()
+    try:
+        logger.info(f"Purged {purge_stale_results(db, older_than_days=args.older_than_days)} cached expense results")
+    finally:
+        db.close()
+
+
+def process_batches(args) -> None:
+    """Finish ingest batches interrupted by a restart (queued files are processed again)."""
+    from features.ingest.models import IngestBatch
+    from features.ingest.pipeline import process_batch
+
+    db = SessionLocal()
+    try:
+        batch_ids = [row[0] for row in db.query(IngestBatch.batch_id).filter(IngestBatch.status == "processing")]
+    finally:
+        db.close()
+    for batch_id in batch_ids:
+        process_batch(batch_id)
+    logger.info(f"Processed {len(batch_ids)} pending ingest batches")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Expense Logger maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrations = subparsers.add_parser("migrate", help="Upgrade the database schema to the latest migration")
+    migrations.set_defaults(func=migrate)
+
+    reindex = subparsers.add_parser("reindex-search", help="Rebuild invoice full-text search vectors")
+    reindex.add_argument("--batch-size", type=int, default=1000)
+    reindex.set_defaults(func=reindex_search)
+
+    rollups = subparsers.add_parser("rebuild-rollups", help="Backfill the monthly spend rollup tables")
+    rollups.add_argument("--user-id", type=int, help="Only this user's rollups (default: everyone)")
+    rollups.set_defaults(func=rebuild_rollups)
+
+    purge = subparsers.add_parser("purge-uploads", help="Delete stale resumable upload sessions")
+    purge.add_argument("--max-age-hours", type=int, default=RESUMABLE_UPLOAD_TTL_HOURS)
+    purge.set_defaults(func=purge_uploads)
+
+    keys = subparsers.add_parser("purge-idempotency-keys", help="Delete expired Idempotency-Key records")
+    keys.set_defaults(func=purge_idempotency_keys)
+
+    cache = subparsers.add_parser("purge-expense-cache", help="Delete stale cached expense results")
+    cache.add_argument("--older-than-days", type=int, default=7)
+    cache.set_defaults(func=purge_expense_cache)
+
+    batches = subparsers.add_parser("process-batches", help="Resume ingest batches left in processing state")
+    batches.set_defaults(func=process_batches)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,232 @@
+# utils/query_plans.py
+"""Check that the hot read queries use indexes rather than sequential scans.
+
+Seeds synthetic users, invoices, items, tags, categories and payments inside
+a transaction, runs the real service functions for the invoice list and
+detail, expense summaries and analytics, and EXPLAINs every statement they
+send. Exits with status 1 when a plan reads one of the large tables with a
+Seq Scan, e.g. after an index was dropped or a query stopped matching the
+partial indexes' is_deleted = false. The seed data is rolled back at the end.
+
+Meant for a local or CI database, e.g.:
+    DB_HOST=localhost python utils/query_plans.py
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import uuid
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+
+import main  # noqa: F401  (registers every model with SQLAlchemy)
+from core.database import engine
+from features.analytics.services import (
+    DEFAULT_PERCENTILES, get_largest_purchases, get_spend_percentiles, get_top_groups, spend_conditions
+)
+from features.expenses.services import (
+    expense_filter_conditions, get_expense_breakdown, get_expense_group_items, get_expense_group_totals,
+    get_expense_timeseries
+)
+from features.invoices.models import Invoice
+from features.invoices.schemas import InvoiceFilterParams
+from features.invoices.services import apply_invoice_sort, invoice_filter_conditions
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('query_plans')
+
+# Tables that grow with the number of invoices; a Seq Scan on these is a regression
+CHECKED_TABLES = ("invoices", "invoice_items", "invoice_tags", "invoice_categories", "payments")
+
+SEED_TABLES = ("users", "tags", "categories") + CHECKED_TABLES
+
+PERIOD = (date(2023, 1, 1), date(2023, 12, 31))
+
+
+def seed(connection, users: int, invoices_per_user: int) -> int:
+    """Insert the synthetic data set; returns the user whose queries are checked."""
+    run = uuid.uuid4().hex[:8]  # Keeps unique names and numbers clear of existing rows
+    params = {"run": run, "users": users, "per_user": invoices_per_user}
+
+    user_ids = connection.execute(sa.text(
+        "INSERT INTO users (username, email, password_hash, is_deleted, created_at, updated_at) "
+        "SELECT 'plans-' || :run || '-' || g, 'plans-' || :run || '-' || g || '@example.com', '', false, now(), now() "
+        "FROM generate_series(1, :users) g RETURNING user_id"
+    ), params).scalars().all()
+    params["user_ids"] = user_ids
+
+    tag_ids = connection.execute(sa.text(
+        "INSERT INTO tags (tag_name) SELECT 'plans-' || :run || '-tag-' || g FROM generate_series(1, 12) g "
+        "RETURNING tag_id"
+    ), params).scalars().all()
+    category_ids = connection.execute(sa.text(
+        "INSERT INTO categories (category_name) SELECT 'plans-' || :run || '-category-' || g "
+        "FROM generate_series(1, 8) g RETURNING category_id"
+    ), params).scalars().all()
+    params.update(tag_ids=tag_ids, category_ids=category_ids)
+
+    # About one invoice in ten is soft-deleted, so the partial indexes have something to leave out
+    connection.execute(sa.text(
+        "INSERT INTO invoices (user_id, merchant_name, order_number, purchase_date, payment_method, grand_total, "
+        "status, is_deleted, created_at, updated_at) "
+        "SELECT u, 'Merchant ' || (random() * 40)::int, 'PL-' || :run || '-' || u || '-' || g, "
+        "date '2021-01-01' + (random() * 1400)::int, (ARRAY['Visa', 'Amex', 'PayPal', 'Cash'])[1 + g % 4], "
+        "round((random() * 500)::numeric, 2), (ARRAY['Open', 'Paid', 'Returned'])[1 + g % 3], "
+        "random() < 0.1, now(), now() "
+        "FROM unnest(CAST(:user_ids AS int[])) u, generate_series(1, :per_user) g"
+    ), params)
+    connection.execute(sa.text(
+        "INSERT INTO invoice_items (invoice_id, product_name, quantity, unit_price, item_type) "
+        "SELECT invoice_id, 'Product ' || g, 1 + g % 3, round((random() * 100)::numeric, 2), "
+        "'Type ' || (random() * 30)::int "
+        "FROM invoices, generate_series(1, 3) g WHERE user_id = ANY(:user_ids)"
+    ), params)
+    connection.execute(sa.text(
+        "INSERT INTO invoice_tags (invoice_id, tag_id) "
+        "SELECT invoice_id, (CAST(:tag_ids AS int[]))[1 + invoice_id % 12] FROM invoices "
+        "WHERE user_id = ANY(:user_ids) AND invoice_id % 3 <> 0"
+    ), params)
+    connection.execute(sa.text(
+        "INSERT INTO invoice_categories (invoice_id, category_id) "
+        "SELECT invoice_id, (CAST(:category_ids AS int[]))[1 + invoice_id % 8] FROM invoices "
+        "WHERE user_id = ANY(:user_ids) AND invoice_id % 5 <> 0"
+    ), params)
+    connection.execute(sa.text(
+        "INSERT INTO payments (invoice_id, amount, transaction_id, payment_date) "
+        "SELECT invoice_id, grand_total, 'PL-' || :run || '-' || invoice_id, now() FROM invoices "
+        "WHERE user_id = ANY(:user_ids)"
+    ), params)
+
+    for table in SEED_TABLES:
+        connection.exec_driver_sql(f"ANALYZE {table}")
+    return user_ids[0]
+
+
+def hot_queries(user_id: int) -> List[Tuple[str, Callable[[Session], Any]]]:
+    """(name, run) pairs issuing the statements behind the most used endpoints."""
+    def invoice_list(**filters):
+        def run(db: Session):
+            params = InvoiceFilterParams(user_id=user_id, **filters)
+            query = db.query(Invoice).filter(*invoice_filter_conditions(params))
+            return apply_invoice_sort(query, params).limit(100).all()
+        return run
+
+    def invoice_detail(db: Session):
+        invoice_id = db.query(Invoice.invoice_id).filter(
+            Invoice.user_id == user_id, Invoice.is_deleted == False
+        ).order_by(Invoice.purchase_date.desc()).limit(1).scalar()
+        return db.query(Invoice).options(
+            selectinload(Invoice.items), selectinload(Invoice.tags),
+            selectinload(Invoice.categories), selectinload(Invoice.payments)
+        ).filter(Invoice.invoice_id == invoice_id, Invoice.is_deleted == False).first()
+
+    summary = expense_filter_conditions(user_id)
+    period = spend_conditions(user_id, *PERIOD)
+    return [
+        ("invoice list by date", invoice_list()),
+        ("invoice list by total, date range", invoice_list(sort_by="total", date_from="2023-01-01", date_to="2023-06-30")),
+        ("invoice list by status", invoice_list(status="Paid", sort_by="status")),
+        ("invoice list by merchant", invoice_list(merchant="Merchant 7")),
+        ("invoice detail", invoice_detail),
+        ("expense totals by category", lambda db: get_expense_group_totals(db, "category", summary)),
+        ("expense totals by tag", lambda db: get_expense_group_totals(db, "tag", summary)),
+        ("expense totals by item type", lambda db: get_expense_group_totals(db, "itemType", summary)),
+        ("expense breakdown by month and merchant", lambda db: get_expense_breakdown(db, ["month", "merchant"], summary)),
+        ("expense group items", lambda db: get_expense_group_items(db, "store", "Merchant 7", summary)),
+        ("expense timeseries", lambda db: get_expense_timeseries(db, *PERIOD, "month", summary)),
+        ("top merchants", lambda db: get_top_groups(db, "merchant", period)),
+        ("spend percentiles", lambda db: get_spend_percentiles(db, period, list(DEFAULT_PERCENTILES))),
+        ("largest purchases", lambda db: get_largest_purchases(db, period)),
+        ("largest purchases per category", lambda db: get_largest_purchases(db, period, per="category")),
+    ]
+
+
+def _plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def explain(connection, statement: str, parameters) -> Dict[str, Any]:
+    result = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Plan"]
+
+
+def check_plans(connection, user_id: int, verbose: bool = False) -> List[str]:
+    """EXPLAIN every SELECT the hot queries send; returns a description of each sequential scan found."""
+    captured: List[Tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    failures = []
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        for name, run in hot_queries(user_id):
+            captured.clear()
+            event.listen(connection, "before_cursor_execute", capture)
+            try:
+                run(db)
+            finally:
+                event.remove(connection, "before_cursor_execute", capture)
+
+            scans = set()
+            for statement, parameters in list(captured):
+                plan = explain(connection, statement, parameters)
+                for node in _plan_nodes(plan):
+                    relation = node.get("Relation Name")
+                    if relation in CHECKED_TABLES:
+                        scans.add(f"{node['Node Type']} on {relation}"
+                                  + (f" using {node['Index Name']}" if "Index Name" in node else ""))
+                    elif node["Node Type"] == "Bitmap Index Scan":
+                        scans.add(f"Bitmap Index Scan using {node['Index Name']}")
+                    if node["Node Type"] == "Seq Scan" and relation in CHECKED_TABLES:
+                        failures.append(f"{name}: Seq Scan on {relation}")
+                        if verbose:
+                            logger.info(json.dumps(plan, indent=2))
+            logger.info(f"{name}: {'; '.join(sorted(scans)) or 'no checked tables'}")
+    finally:
+        db.close()
+    return failures
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Fail when hot queries fall back to sequential scans")
+    # With much less data the planner rightly prefers scanning the small junction tables whole
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic users to seed")
+    parser.add_argument("--invoices-per-user", type=int, default=250)
+    parser.add_argument("--verbose", action="store_true", help="Print the full plan of every failing statement")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            user_id = seed(connection, args.users, args.invoices_per_user)
+            failures = check_plans(connection, user_id, verbose=args.verbose)
+        finally:
+            transaction.rollback()
+        # ANALYZE ran on the seeded rows; refresh the statistics without them
+        connection.execution_options(isolation_level="AUTOCOMMIT")
+        for table in SEED_TABLES:
+            connection.exec_driver_sql(f"ANALYZE {table}")
+
+    for failure in failures:
+        logger.error(failure)
+    if failures:
+        sys.exit(1)
+    logger.info("All hot queries use indexes")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,255 @@
+# utils/storage.py
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+import aiofiles
+import sqlalchemy as sa
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import UPLOAD_FOLDER, MAX_UPLOAD_SIZE, UPLOAD_CHUNK_SIZE
+from core.database import engine
+from features.invoices.models import FileBlob
+
+logger = logging.getLogger(__name__)
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Partially written uploads live next to the blobs so finished files can be moved into place atomically
+TEMP_FOLDER = UPLOAD_FOLDER / "tmp"
+
+# session.info key: {sha256: storage_path} of blob files that may be left
+# without a row when the transaction ends (released blobs, and files moved
+# into place by a savepoint or transaction that may still roll back)
+_CLEANUP_CANDIDATES = "blob_cleanup_candidates"
+
+
+@dataclass
+class StreamedFile:
+    """An upload written to disk, with the digest and size computed while streaming."""
+    path: Path
+    sha256: str
+    size_bytes: int
+
+
+def is_sha256(value: str) -> bool:
+    return bool(value) and bool(SHA256_PATTERN.match(value))
+
+
+def blob_path(sha256: str, extension: str = "") -> Path:
+    """Sharded on-disk location of a blob: uploads/ab/cd/<sha256><ext>.
+
+    Two levels of 256-way sharding keep directories small even with
+    millions of files. The extension is kept so OCR can tell PDFs from images.
+    """
+    return UPLOAD_FOLDER / sha256[:2] / sha256[2:4] / f"{sha256}{extension.lower()}"
+
+
+def get_blob(db: Session, sha256: str) -> Optional[FileBlob]:
+    return db.query(FileBlob).filter(FileBlob.sha256 == sha256).first()
+
+
+def _lock_blob(connection, sha256: str) -> None:
+    """Serialize adopting and unlinking the file of one blob until the transaction ends."""
+    connection.execute(sa.select(sa.func.pg_advisory_xact_lock(int(sha256[:15], 16))))
+
+
+def _take_reference(db: Session, sha256: str, size_bytes: int, storage_path: Path) -> FileBlob:
+    """Insert the blob row or bump its reference count, atomically across concurrent uploads."""
+    statement = (
+        pg_insert(FileBlob)
+        .values(sha256=sha256, size_bytes=size_bytes, storage_path=str(storage_path), ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[FileBlob.sha256],
+            set_={"ref_count": FileBlob.ref_count + 1}
+        )
+        .returning(FileBlob)
+    )
+    return db.scalars(statement, execution_options={"populate_existing": True}).one()
+
+
+def _adopt_file(db: Session, source: Path, sha256: str, size_bytes: int, filename: str) -> FileBlob:
+    """Move a fully written file into its blob location (or drop it if the blob exists) and take a reference."""
+    # Held until commit, so a released blob's file can't be unlinked after we decided to reuse it
+    _lock_blob(db, sha256)
+    existing = get_blob(db, sha256)
+    path = Path(existing.storage_path) if existing else blob_path(sha256, os.path.splitext(filename)[1])
+    if path.exists():
+        source.unlink(missing_ok=True)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, path)
+        db.info.setdefault(_CLEANUP_CANDIDATES, {})[sha256] = str(path)
+    return _take_reference(db, sha256, size_bytes, path)
+
+
+def store_bytes(db: Session, content: bytes, filename: str) -> FileBlob:
+    """Store in-memory content under its SHA-256 unless an identical blob already exists, and take a reference."""
+    TEMP_FOLDER.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary name first so a crash never leaves a truncated blob behind
+    fd, temp_name = tempfile.mkstemp(dir=TEMP_FOLDER, suffix=".part")
+    with os.fdopen(fd, "wb") as buffer:
+        buffer.write(content)
+    return _adopt_file(db, Path(temp_name), hashlib.sha256(content).hexdigest(), len(content), filename)
+
+
+def store_file(db: Session, streamed: StreamedFile, filename: str) -> FileBlob:
+    """Store a file already streamed to disk (see save_upload) and take a reference."""
+    return _adopt_file(db, streamed.path, streamed.sha256, streamed.size_bytes, filename)
+
+
+async def save_upload(
+    upload: UploadFile,
+    destination: Optional[Path] = None,
+    max_bytes: int = MAX_UPLOAD_SIZE,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StreamedFile:
+    """Stream an upload to disk in fixed-size chunks, hashing and counting bytes on the way.
+    
+    Memory use is one chunk regardless of file size. Raises HTTP 413 (and
+    removes the partial file) as soon as ``max_bytes`` is exceeded. Without a
+    destination the file goes to a temporary path under TEMP_FOLDER, keeping
+    the upload's extension.
+    """
+    if destination is None:
+        TEMP_FOLDER.mkdir(parents=True, exist_ok=True)
+        extension = os.path.splitext(upload.filename or "")[1].lower()
+        fd, temp_name = tempfile.mkstemp(dir=TEMP_FOLDER, suffix=extension)
+        os.close(fd)
+        destination = Path(temp_name)
+    
+    digest = hashlib.sha256()
+    size_bytes = 0
+    try:
+        async with aiofiles.open(destination, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size_bytes += len(chunk)
+                if size_bytes > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    
+    return StreamedFile(path=destination, sha256=digest.hexdigest(), size_bytes=size_bytes)
+
+
+def acquire_blob(db: Session, sha256: str) -> Optional[FileBlob]:
+    """Take another reference on an existing blob (e.g. when a client skips re-uploading known bytes)."""
+    statement = (
+        sa.update(FileBlob)
+        .where(FileBlob.sha256 == sha256)
+        .values(ref_count=FileBlob.ref_count + 1)
+        .returning(FileBlob)
+    )
+    return db.scalars(statement, execution_options={"populate_existing": True}).first()
+
+
+def release_blob(db: Session, sha256: Optional[str]) -> None:
+    """Drop a reference to a blob; the row is deleted when no InvoiceFile uses it any more.
+
+    The file is only removed once the transaction commits (see
+    _remove_unreferenced_files), so a rollback leaves row and file in place.
+    """
+    if not sha256:
+        return
+    db.execute(
+        sa.update(FileBlob)
+        .where(FileBlob.sha256 == sha256)
+        .values(ref_count=FileBlob.ref_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    removed = db.execute(
+        sa.delete(FileBlob)
+        .where(FileBlob.sha256 == sha256, FileBlob.ref_count <= 0)
+        .returning(FileBlob.storage_path)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if removed:
+        db.info.setdefault(_CLEANUP_CANDIDATES, {})[sha256] = removed.storage_path
+
+
+def _remove_unreferenced_files(candidates: Dict[str, str]) -> None:
+    # An upload of the same bytes may have re-created a released row
+    # (reusing the file) in the meantime, so only files whose row is absent
+    # are removed, under the lock _adopt_file takes
+    for sha256, storage_path in candidates.items():
+        try:
+            with engine.begin() as connection:
+                _lock_blob(connection, sha256)
+                if connection.execute(sa.select(FileBlob.sha256).where(FileBlob.sha256 == sha256)).first():
+                    continue
+                Path(storage_path).unlink(missing_ok=True)
+        except Exception as e:
+            # The row is already gone; an orphaned file only costs disk space
+            logger.warning(f"Could not remove unreferenced blob {sha256}: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _cleanup_after_commit(session: Session) -> None:
+    # Also fires when a savepoint is released; the outer transaction still
+    # holds the blob locks and its rows aren't visible to other connections
+    if session.in_nested_transaction():
+        return
+    # The session can't emit SQL any more, so the check uses its own connection
+    candidates = session.info.pop(_CLEANUP_CANDIDATES, None)
+    if candidates:
+        _remove_unreferenced_files(candidates)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _cleanup_after_rollback(session: Session, previous_transaction) -> None:
+    # Wait for the outer transaction: a rolled back savepoint doesn't undo
+    # what happened outside it. Released rows are back after a rollback, so
+    # only files adopted by the rolled back work are removed.
+    if not session.in_transaction():
+        candidates = session.info.pop(_CLEANUP_CANDIDATES, None)
+        if candidates:
+            _remove_unreferenced_files(candidates)
+
+
+def copy_to_temp(
+    source: BinaryIO,
+    filename: str,
+    max_bytes: int = MAX_UPLOAD_SIZE,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StreamedFile:
+    """Blocking counterpart of save_upload for non-HTTP sources (ZIP entries, folders, mail, WebDAV).
+    
+    Copies ``source`` to a temporary file in fixed-size chunks while hashing,
+    and raises ValueError (removing the partial copy) once max_bytes is exceeded.
+    """
+    TEMP_FOLDER.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=TEMP_FOLDER, suffix=os.path.splitext(filename)[1].lower())
+    destination = Path(temp_name)
+    
+    digest = hashlib.sha256()
+    size_bytes = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size_bytes += len(chunk)
+                if size_bytes > max_bytes:
+                    raise ValueError(f"{filename} exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    
+    return StreamedFile(path=destination, sha256=digest.hexdigest(), size_bytes=size_bytes)